@@ -0,0 +1,56 @@
+"""
+Shared setup for the backend benchmarks.
+
+Benchmarks run against MONGO_URL (default: local mongod) in a throwaway
+database. Pass --mongomock to run against the in-process mongomock stand-in
+instead (requires `pip install mongomock-motor`); absolute numbers are then
+only meaningful relative to each other.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def parse_args(description: str, **defaults) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--mongomock", action="store_true", help="use mongomock-motor instead of a real mongod")
+    parser.add_argument("--repeat", type=int, default=defaults.pop("repeat", 20), help="timed iterations per variant")
+    for name, value in defaults.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    return parser.parse_args()
+
+
+def load_server(args: argparse.Namespace):
+    """Import backend/server.py bound to the benchmark database."""
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "bizdesk365_bench")
+    if args.mongomock:
+        import motor.motor_asyncio
+        from mongomock_motor import AsyncMongoMockClient
+        motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+    sys.path.insert(0, str(BACKEND_DIR))
+    import server
+    return server
+
+
+async def reset_database(server) -> None:
+    for name in await server.db.list_collection_names():
+        await server.db.drop_collection(name)
+
+
+async def timed(label: str, repeat: int, func) -> list:
+    """Await func() `repeat` times and print latency percentiles in ms."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{label:<40} median {statistics.median(samples):8.2f} ms   p95 {p95:8.2f} ms   (n={repeat})")
+    return samples
@@ -0,0 +1,47 @@
+"""
+Benchmark requests/sec on GET /api/me with and without the verified-token cache.
+
+Drives the ASGI app in-process through httpx (pip install httpx), so the
+numbers isolate FastAPI + token verification from network overhead.
+
+    python backend/benchmarks/bench_auth_me.py --requests 5000
+"""
+import asyncio
+import logging
+import time
+
+import httpx
+
+from _common import load_server, parse_args
+
+
+async def requests_per_second(app, token: str, count: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        headers = {"Authorization": f"Bearer {token}"}
+        await http.get("/api/me", headers=headers)
+        start = time.perf_counter()
+        for _ in range(count):
+            response = await http.get("/api/me", headers=headers)
+            assert response.status_code == 200, response.text
+        return count / (time.perf_counter() - start)
+
+
+async def main():
+    args = parse_args(__doc__, requests=5000)
+    server = load_server(args)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    token = server.create_access_token({"sub": "bench-user", "email": "bench@bizdesk365.local", "tenant_id": "bench-tenant", "roles": ["user"]})
+
+    cached = server.token_cache
+    server.token_cache = server.MemoryCache(maxsize=0)
+    uncached_rps = await requests_per_second(server.app, token, args.requests)
+    server.token_cache = cached
+    cached_rps = await requests_per_second(server.app, token, args.requests)
+
+    print(f"{'GET /api/me without token cache':<40} {uncached_rps:8.0f} req/s")
+    print(f"{'GET /api/me with token cache':<40} {cached_rps:8.0f} req/s   ({cached_rps / uncached_rps:.2f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+"""
+Benchmark item writes for a replayed workshop session of acceptance-criteria toggles.
+
+Several participants tick criteria of the workshop's items in quick bursts,
+each toggle being one PATCH with an acceptance_state_patch. The session is
+replayed through WriteCoalescer with the window disabled (one write per
+toggle) and with --window-ms, and the number of item writes is compared.
+
+    python backend/benchmarks/bench_pp_coalescing.py --participants 6 --window-ms 50
+"""
+import asyncio
+import random
+
+from _common import load_server, parse_args, reset_database, timed
+
+
+def session_script(items: list, participants: int, toggles: int, rng: random.Random) -> list:
+    """[(participant, delay_s, item_id, {criterion: checked})]: bursts of toggles on one item each"""
+    script = []
+    for participant in range(participants):
+        item = rng.choice(items)
+        for _ in range(toggles):
+            if rng.random() < 0.2:
+                item = rng.choice(items)
+            criterion = rng.choice(item["acceptance_criteria"])
+            script.append((participant, rng.uniform(0.001, 0.03), item["item_id"], {criterion: rng.random() < 0.5}))
+    return script
+
+
+async def replay(server, coalescer, program_id: str, script: list, participants: int):
+    async def participant(number: int):
+        for who, delay, item_id, patch in script:
+            if who != number:
+                continue
+            await asyncio.sleep(delay)
+            update = server.item_update_data(server.PPItemInstanceUpdate(acceptance_state_patch=patch), "2024-01-01T00:00:00+00:00")
+            await coalescer.submit((program_id, item_id), update)
+
+    await asyncio.gather(*(participant(n) for n in range(participants)))
+
+
+async def main():
+    args = parse_args(__doc__, repeat=5, participants=6, toggles=40, workshop=1, window_ms=50.0)
+    server = load_server(args)
+    db = server.db
+    await reset_database(server)
+
+    program = await server.get_or_create_program("bench-tenant", "bench-user")
+    program_id = program["id"]
+    items = list(server.get_items_for_workshop(args.workshop))
+    script = session_script(items, args.participants, args.toggles, random.Random(42))
+
+    # Criteria toggled by one participant only have a deterministic final value
+    expected, owners = {}, {}
+    for who, _, item_id, patch in script:
+        for criterion, checked in patch.items():
+            owners.setdefault((item_id, criterion), set()).add(who)
+            expected[(item_id, criterion)] = checked
+    expected = {key: checked for key, checked in expected.items() if len(owners[key]) == 1}
+
+    print(f"workshop {args.workshop}: {len(items)} items, {args.participants} participants, {len(script)} toggles per replay")
+    for window_ms in [0, args.window_ms]:
+        coalescer = server.WriteCoalescer(window=window_ms / 1000, write=server._write_coalesced_item)
+        await timed(f"replay, window {window_ms:g} ms", args.repeat, lambda: replay(server, coalescer, program_id, script, args.participants))
+        await coalescer.drain()
+
+        for (item_id, criterion), checked in expected.items():
+            item = await db.pp_item_instances.find_one({"program_id": program_id, "item_id": item_id})
+            assert item["acceptance_state"].get(criterion) == checked, f"{item_id} lost a toggle of {criterion!r}"
+        stats = coalescer.stats()
+        print(f"{'':<40} {stats['writes']} writes for {stats['submitted']} toggles ({stats['writes'] / stats['submitted']:.2f} per toggle)")
+    await reset_database(server)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""
+Benchmark peak memory of GET /api/power-platform/export/actions.
+
+Compares the streaming export (async cursor -> encoded chunks) with buffering
+the whole history the way the list endpoints do (to_list + one JSON document).
+Peak Python heap allocations are measured with tracemalloc while each variant
+runs; the streaming peak should stay flat as --actions grows. Under
+--mongomock the mock sorts and copies the whole result set inside find(), so
+both peaks grow with --actions there; run against a real mongod for the
+memory comparison.
+
+    python backend/benchmarks/bench_pp_export.py --actions 1000000
+"""
+import asyncio
+import json
+import random
+import time
+import tracemalloc
+import uuid
+
+from _common import load_server, parse_args, reset_database
+
+INSERT_BATCH = 10000
+
+
+async def seed_actions(db, program_id: str, count: int) -> None:
+    rng = random.Random(42)
+    statuses = ["open", "in_progress", "done", "closed"]
+    for start in range(0, count, INSERT_BATCH):
+        await db.pp_actions.insert_many([
+            {"id": str(uuid.uuid4()), "program_id": program_id, "workshop_number": rng.randint(1, 10),
+             "title": f"Action {n}", "description": "Synthetic action for the export benchmark", "priority": "medium",
+             "status": rng.choice(statuses), "owner_user_id": None, "due_date": None,
+             "created_at": f"2024-01-01T00:00:{n % 60:02d}.{n:06d}+00:00", "updated_at": "2024-01-01T00:00:00+00:00"}
+            for n in range(start, min(start + INSERT_BATCH, count))
+        ])
+
+
+async def buffered_export(db, program_id: str) -> int:
+    rows = await db.pp_actions.find({"program_id": program_id}, {"_id": 0}).sort("created_at", 1).to_list(None)
+    return len(json.dumps(rows).encode())
+
+
+async def streaming_export(server, user, fmt: str, compress: bool) -> int:
+    response = await server.export_pp_collection(
+        "actions", format=fmt, gzip=compress, workshop_number=None, tenant_id=user.tenant_id, current_user=user
+    )
+    size = 0
+    async for chunk in response.body_iterator:
+        size += len(chunk)
+    return size
+
+
+async def measure(label: str, func) -> None:
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    size = await func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    print(f"{label:<28} peak heap {peak / 2**20:9.1f} MiB   {size / 2**20:9.1f} MiB out   {elapsed:7.1f} s")
+
+
+async def main():
+    args = parse_args(__doc__, repeat=1, actions=1000000)
+    server = load_server(args)
+    db = server.db
+    await reset_database(server)
+    await server.ensure_indexes(db)
+
+    user = server.UserInDB(id="bench-user", email="bench@bizdesk365.local", tenant_id="bench-tenant", roles=["admin"])
+    program = await server.get_or_create_program(user.tenant_id, user.id)
+    await seed_actions(db, program["id"], args.actions)
+    print(f"{args.actions} actions")
+
+    await measure("streaming ndjson", lambda: streaming_export(server, user, "ndjson", False))
+    await measure("streaming csv", lambda: streaming_export(server, user, "csv", False))
+    await measure("streaming ndjson + gzip", lambda: streaming_export(server, user, "ndjson", True))
+    await measure("buffered to_list + json", lambda: buffered_export(db, program["id"]))
+    await reset_database(server)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
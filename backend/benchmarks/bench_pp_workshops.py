@@ -0,0 +1,67 @@
+"""
+Benchmark the progress computation behind GET /api/power-platform/workshops.
+
+Compares the previous per-workshop fan-out (items, open actions and decisions
+fetched for each of the 10 workshops) with aggregate_workshop_progress.
+
+    python backend/benchmarks/bench_pp_workshops.py --actions 10000
+"""
+import asyncio
+import random
+import uuid
+
+from _common import load_server, parse_args, reset_database, timed
+
+
+async def legacy_workshop_progress(db, program_id: str, workshops: list) -> dict:
+    progress = {}
+    for ws in workshops:
+        items = await db.pp_item_instances.find({"program_id": program_id, "workshop_number": ws["workshop_number"]}, {"_id": 0}).to_list(100)
+        actions = await db.pp_actions.find(
+            {"program_id": program_id, "workshop_number": ws["workshop_number"], "status": {"$in": ["open", "in_progress"]}},
+            {"_id": 0}
+        ).to_list(1000)
+        decisions = await db.pp_decisions.find({"program_id": program_id, "workshop_number": ws["workshop_number"]}, {"_id": 0}).to_list(1000)
+        progress[ws["workshop_number"]] = {
+            "items_total": len(items),
+            "items_done": sum(1 for i in items if i["status"] in ["done", "validated"]),
+            "open_actions_count": len(actions),
+            "decisions_count": len(decisions)
+        }
+    return progress
+
+
+async def main():
+    args = parse_args(__doc__, actions=10000, decisions=2000)
+    server = load_server(args)
+    db = server.db
+    await reset_database(server)
+
+    program = await server.get_or_create_program("bench-tenant", "bench-user")
+    program_id = program["id"]
+    rng = random.Random(42)
+    statuses = ["open", "in_progress", "done", "closed"]
+    await db.pp_actions.insert_many([
+        {"id": str(uuid.uuid4()), "program_id": program_id, "workshop_number": rng.randint(1, 10), "title": f"Action {n}",
+         "priority": "medium", "status": rng.choice(statuses), "created_at": "2024-01-01T00:00:00+00:00"}
+        for n in range(args.actions)
+    ])
+    await db.pp_decisions.insert_many([
+        {"id": str(uuid.uuid4()), "program_id": program_id, "workshop_number": rng.randint(1, 10), "decision_text": f"Decision {n}",
+         "decided_at": "2024-01-01T00:00:00+00:00"}
+        for n in range(args.decisions)
+    ])
+    workshops = await db.pp_workshops.find({"program_id": program_id}, {"_id": 0}).to_list(100)
+
+    legacy = await legacy_workshop_progress(db, program_id, workshops)
+    current = await server.aggregate_workshop_progress(program_id)
+    assert legacy == {n: current.get(n) for n in legacy}, "aggregation disagrees with the legacy fan-out"
+
+    print(f"{args.actions} actions, {args.decisions} decisions, {len(workshops)} workshops")
+    await timed("legacy fan-out (31 queries)", args.repeat, lambda: legacy_workshop_progress(db, program_id, workshops))
+    await timed("aggregate_workshop_progress", args.repeat, lambda: server.aggregate_workshop_progress(program_id))
+    await reset_database(server)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
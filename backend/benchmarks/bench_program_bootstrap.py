@@ -0,0 +1,41 @@
+"""
+Benchmark first-visit latency: bootstrapping a tenant's Power Platform program.
+
+Compares the previous one-insert_one-per-document bootstrap (~77 round trips)
+with create_program, which writes workshops and items with ordered insert_many
+(inside a transaction when the deployment supports one).
+
+    python backend/benchmarks/bench_program_bootstrap.py
+    python backend/benchmarks/bench_program_bootstrap.py --mongomock
+"""
+import asyncio
+import itertools
+
+from _common import load_server, parse_args, reset_database, timed
+
+
+async def legacy_bootstrap(server, tenant_id: str, user_id: str) -> dict:
+    program, workshops, items = server.build_program_documents(tenant_id, user_id)
+    await server.db.pp_programs.insert_one(program)
+    for workshop in workshops:
+        await server.db.pp_workshops.insert_one(workshop)
+    for item in items:
+        await server.db.pp_item_instances.insert_one(item)
+    return program
+
+
+async def main():
+    args = parse_args(__doc__)
+    server = load_server(args)
+    await reset_database(server)
+    await server.db.pp_programs.create_index("tenant_id", unique=True)
+    tenants = (f"bench-tenant-{n}" for n in itertools.count())
+
+    await timed("legacy insert_one per document", args.repeat, lambda: legacy_bootstrap(server, next(tenants), "bench-user"))
+    await timed("create_program (insert_many)", args.repeat, lambda: server.create_program(next(tenants), "bench-user"))
+    print(f"transactions used: {bool(server._transactions_supported)}")
+    await reset_database(server)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,144 @@
+# Key/value caches for hot lookups that rarely change
+#
+# Two interchangeable backends:
+#   - MemoryCache: per-process TTL + LRU dictionary (default)
+#   - SQLiteCache: file-backed stand-in for a shared cache, so several uvicorn
+#     workers on the same host see each other's entries
+#
+# make_cache selects one with CACHE_BACKEND=memory|sqlite (and CACHE_SQLITE_PATH
+# for sqlite); values stored through it must be JSON-serializable so that both
+# backends behave the same. Process-local caches can use MemoryCache directly.
+
+from typing import Any, Optional
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+_MISSING = object()
+
+
+class CacheBackend(ABC):
+    """Interface shared by the cache backends."""
+
+    @abstractmethod
+    def get(self, key: str, default: Any = None) -> Any:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+
+class MemoryCache(CacheBackend):
+    """In-process cache bounded by entry count, with a per-entry time to live."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache(CacheBackend):
+    """Cache shared by the worker processes of one host through a SQLite file.
+
+    Entries are namespaced so several caches can share one file. When the
+    namespace grows past maxsize the entries closest to expiry are evicted.
+    """
+
+    def __init__(self, path: str, namespace: str, maxsize: int = 1024, ttl: float = 300):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (self.namespace, key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), expires_at)
+            )
+            self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+                " SELECT key FROM cache_entries WHERE namespace = ? ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.namespace, self.namespace, self.maxsize)
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+
+
+def make_cache(namespace: str, maxsize: int = 1024, ttl: float = 300) -> CacheBackend:
+    """Build the cache backend selected by CACHE_BACKEND for the given namespace."""
+    backend = os.environ.get("CACHE_BACKEND", "memory").lower()
+    if backend == "sqlite":
+        path = os.environ.get("CACHE_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "bizdesk365-cache.sqlite3"))
+        return SQLiteCache(path, namespace, maxsize=maxsize, ttl=ttl)
+    if backend != "memory":
+        raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
+    return MemoryCache(maxsize=maxsize, ttl=ttl)
@@ -0,0 +1,117 @@
+# Field-level $set helpers and server-side write coalescing
+#
+# Checkbox-style maps (acceptance_state, completion_criteria_state) are patched
+# with dotted $set keys such as "acceptance_state.<criterion>", so two users
+# ticking different boxes no longer overwrite each other. Only one level of
+# nesting is used: the keys are criterion labels, which contain no dots.
+#
+# WriteCoalescer holds the first write for a key (e.g. one item) for `window`
+# seconds. Writes for the same key arriving meanwhile are folded into it with
+# merge_set, and a single write goes to the database; every caller receives
+# its result. Writes for a key are applied in submission order: a batch waits
+# for the previous batch of the same key to finish before writing. Writes of
+# the same documents that bypass the coalescer call settle() first, so they
+# are not overtaken by a held write submitted before them.
+
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional
+import asyncio
+
+
+def merge_set(target: dict, fields: dict) -> dict:
+    """Fold $set fields into target as if both were applied in order, without conflicting paths"""
+    for path, value in fields.items():
+        root, _, key = path.partition(".")
+        if key and isinstance(target.get(root), dict):
+            target[root] = {**target[root], key: value}
+            continue
+        if not key:
+            # A whole-field $set supersedes pending dotted keys under it
+            for existing in [p for p in target if p.startswith(root + ".")]:
+                del target[existing]
+        target[path] = value
+    return target
+
+
+def apply_set(document: dict, fields: dict) -> dict:
+    """The document as written by {"$set": fields}"""
+    result = dict(document)
+    for path, value in fields.items():
+        root, _, key = path.partition(".")
+        if key:
+            result[root] = {**(result.get(root) or {}), key: value}
+        else:
+            result[path] = value
+    return result
+
+
+class _Batch:
+    def __init__(self, fields: dict, previous: Optional[asyncio.Task]):
+        self.fields = dict(fields)
+        self.previous = previous
+        self.future = asyncio.get_running_loop().create_future()
+        self.task: Optional[asyncio.Task] = None
+
+
+class WriteCoalescer:
+    def __init__(self, window: float, write: Callable[[Hashable, dict], Awaitable[Any]]):
+        self.window = window
+        self._write = write
+        self._open: Dict[Hashable, _Batch] = {}
+        self._last: Dict[Hashable, asyncio.Task] = {}
+        self.submitted = 0
+        self.merged = 0
+        self.writes = 0
+
+    async def submit(self, key: Hashable, fields: dict) -> Any:
+        """$set fields for key, possibly together with other writes of the same key; returns the write's result"""
+        self.submitted += 1
+        if self.window <= 0:
+            self.writes += 1
+            return await self._write(key, fields)
+        batch = self._open.get(key)
+        if batch is None:
+            previous = self._last.get(key)
+            batch = self._open[key] = _Batch(fields, previous if previous and not previous.done() else None)
+            batch.task = self._last[key] = asyncio.create_task(self._flush(key, batch))
+        else:
+            merge_set(batch.fields, fields)
+            self.merged += 1
+        # A caller going away must not cancel the write shared with the others
+        return await asyncio.shield(batch.future)
+
+    async def _flush(self, key: Hashable, batch: _Batch):
+        await asyncio.sleep(self.window)
+        if self._open.get(key) is batch:
+            del self._open[key]
+        if batch.previous:
+            await asyncio.wait([batch.previous])
+        self.writes += 1
+        try:
+            batch.future.set_result(await self._write(key, batch.fields))
+        except Exception as e:
+            batch.future.set_exception(e)
+        finally:
+            if self._last.get(key) is batch.task:
+                del self._last[key]
+
+    async def settle(self, keys: Iterable[Hashable]):
+        """Wait until the writes pending for keys are written, so that a write made directly
+        afterwards lands after them"""
+        tasks = [self._last[key] for key in keys if key in self._last]
+        if tasks:
+            await asyncio.wait(tasks)
+
+    async def drain(self):
+        """Wait for every pending write, e.g. before shutdown"""
+        tasks = list(self._last.values())
+        if tasks:
+            await asyncio.wait(tasks)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "submitted": self.submitted,
+            "merged": self.merged,
+            "writes": self.writes,
+            "pending": len(self._open),
+            "window_ms": round(self.window * 1000)
+        }
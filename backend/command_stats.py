@@ -0,0 +1,41 @@
+# Counts of the MongoDB commands sent by the process, per collection
+#
+# Registered on the Motor client as a pymongo command listener, so every
+# round trip (find, update, findAndModify, aggregate, ...) is counted under the
+# collection it targets. /admin/metrics exposes the counts; diffing them
+# around a request gives the number of round trips it costs.
+
+from typing import Dict
+from pymongo import monitoring
+import threading
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self.failures = 0
+        # Listeners are called from the driver's threads under Motor
+        self._lock = threading.Lock()
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        # getMore names its cursor id first; the collection follows
+        target = event.command.get("collection" if event.command_name == "getMore" else event.command_name)
+        collection = target if isinstance(target, str) else "$cmd"
+        with self._lock:
+            by_command = self._counts.setdefault(collection, {})
+            by_command[event.command_name] = by_command.get(event.command_name, 0) + 1
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        pass
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        with self._lock:
+            self.failures += 1
+
+    def stats(self) -> dict:
+        """{"collections": {collection: {command: count}}, "failures": count}"""
+        with self._lock:
+            return {
+                "collections": {collection: dict(by_command) for collection, by_command in self._counts.items()},
+                "failures": self.failures
+            }
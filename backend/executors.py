@@ -0,0 +1,55 @@
+# Dedicated thread pools for CPU-bound work that must stay off the event loop
+#
+# BoundedExecutor caps the work admitted to the pool (running + queued). Once the
+# cap is reached, run() fails fast with PoolSaturated so the caller can answer
+# 503 instead of letting requests pile up behind the pool.
+
+from typing import Any, Callable
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+
+
+class PoolSaturated(Exception):
+    """Raised when a BoundedExecutor already holds max_pending calls."""
+
+
+class BoundedExecutor:
+    def __init__(self, name: str, max_workers: int, max_pending: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max(max_pending, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        # Counters are only touched from the event loop thread
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        if self.in_flight >= self.max_pending:
+            self.rejected += 1
+            raise PoolSaturated(f"{self.name}: {self.in_flight} calls pending")
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "running": min(self.in_flight, self.max_workers),
+            "queue_depth": max(0, self.in_flight - self.max_workers),
+            "peak_in_flight": self.peak_in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,90 @@
+# Streaming exports of governance histories
+#
+# Rows are read from an async Motor cursor in batches and encoded as NDJSON or
+# CSV on the fly. Encoded lines are grouped into chunks of about CHUNK_SIZE
+# bytes and optionally gzip-compressed incrementally, so the memory used by an
+# export depends on the batch and chunk sizes, not on the number of rows.
+
+from typing import Any, AsyncIterator, Iterable, List, Optional
+import csv
+import io
+import json
+import zlib
+
+CHUNK_SIZE = 64 * 1024
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def _csv_cell(value: Any) -> Any:
+    # Lists and dicts (evidence_links, acceptance_state, ...) are embedded as JSON
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return "" if value is None else value
+
+
+class _CSVEncoder:
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def _take(self) -> str:
+        text = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return text
+
+    def header(self) -> str:
+        self._writer.writerow(self.columns)
+        return self._take()
+
+    def row(self, row: dict) -> str:
+        self._writer.writerow([_csv_cell(row.get(column)) for column in self.columns])
+        return self._take()
+
+
+def _ndjson_row(row: dict) -> str:
+    return json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+async def stream_export(
+    cursor: AsyncIterator[dict],
+    fmt: str,
+    columns: Iterable[str],
+    compress: bool = False,
+    chunk_size: int = CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    """Encode the rows of an async cursor as NDJSON or CSV chunks (gzip when compress)"""
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    pending: List[bytes] = []
+    pending_size = 0
+
+    def flush() -> Optional[bytes]:
+        nonlocal pending, pending_size
+        data = b"".join(pending)
+        pending, pending_size = [], 0
+        if compressor:
+            data = compressor.compress(data)
+        return data or None
+
+    if fmt == "csv":
+        encoder = _CSVEncoder(list(columns))
+        encode = encoder.row
+        pending.append(encoder.header().encode())
+    else:
+        encode = _ndjson_row
+
+    async for row in cursor:
+        line = encode(row).encode()
+        pending.append(line)
+        pending_size += len(line)
+        if pending_size >= chunk_size:
+            chunk = flush()
+            if chunk:
+                yield chunk
+
+    tail = flush() or b""
+    if compressor:
+        tail += compressor.flush()
+    if tail:
+        yield tail
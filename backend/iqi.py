@@ -0,0 +1,292 @@
+# Enterprise Brain Information Quality Index (IQI)
+#
+# IQI = 0.3 * validation rate + 0.5 * average confidence + 0.2 * freshness,
+# where a document is fresh when last_updated is less than FRESHNESS_DAYS old.
+#
+# One iqi_snapshots document per tenant holds the counters behind it (total,
+# validated, confidence sum, fresh). Every knowledge document write derives a
+# $inc delta from the document's before/after state, so GET
+# /enterprise-brain/quality is a single indexed read. Documents also stop
+# being fresh as time passes without any write: the daily sweep recomputes
+# each tenant's counters with one $group and records the day's IQI in
+# iqi_history for the trend chart. Until a tenant's next sweep, documents that
+# aged past the boundary since the last one still count as fresh, and a write
+# landing while the sweep recounts may be missed until the sweep after.
+#
+# Sweep, check or rebuild the snapshots from knowledge_documents:
+#
+#     python iqi.py sweep
+#     python iqi.py verify [--tenant-id ID]
+#     python iqi.py rebuild [--tenant-id ID]
+
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+logger = logging.getLogger(__name__)
+
+FRESHNESS_DAYS = 90
+VALIDATION_WEIGHT = 0.3
+CONFIDENCE_WEIGHT = 0.5
+FRESHNESS_WEIGHT = 0.2
+
+COUNTER_FIELDS = ["total", "validated", "confidence_sum", "fresh"]
+
+# Float sums of confidence scores accumulate rounding error; anything below this is not drift.
+CONFIDENCE_SUM_TOLERANCE = 1e-6
+
+
+def freshness_cutoff(now: Optional[datetime] = None) -> datetime:
+    """Documents updated after this instant are fresh"""
+    return (now or datetime.now(timezone.utc)) - timedelta(days=FRESHNESS_DAYS)
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def is_fresh(document: dict, now: Optional[datetime] = None) -> bool:
+    last_updated = parse_timestamp(document.get("last_updated"))
+    return last_updated is not None and last_updated > freshness_cutoff(now)
+
+
+def quality_pipeline(tenant_id: str, now: Optional[datetime] = None) -> List[dict]:
+    """$group computing total, validated, confidence sum and fresh counts for a tenant"""
+    # Unparseable or missing last_updated values are not fresh
+    last_updated = {"$dateFromString": {"dateString": "$last_updated", "onError": None, "onNull": None}}
+    return [
+        {"$match": {"tenant_id": tenant_id}},
+        {"$group": {
+            "_id": None,
+            "total": {"$sum": 1},
+            "validated": {"$sum": {"$cond": ["$validated", 1, 0]}},
+            "confidence_sum": {"$sum": {"$ifNull": ["$confidence_score", 0]}},
+            "fresh": {"$sum": {"$cond": [{"$gt": [last_updated, freshness_cutoff(now)]}, 1, 0]}}
+        }}
+    ]
+
+
+def quality_from_counts(total: int, validated: int, confidence_sum: float, fresh: int) -> Dict[str, Any]:
+    """Shape the aggregated counts as the QualityResponse payload"""
+    if total == 0:
+        return {
+            "iqi_global": 0.0,
+            "evidences": {"total_documents": 0, "validated_count": 0, "avg_confidence": 0.0, "freshness_score": 0.0}
+        }
+    validation_score = validated / total
+    avg_confidence = confidence_sum / total
+    freshness_score = fresh / total
+    iqi_global = (validation_score * VALIDATION_WEIGHT) + (avg_confidence * CONFIDENCE_WEIGHT) + (freshness_score * FRESHNESS_WEIGHT)
+    return {
+        "iqi_global": round(iqi_global, 2),
+        "evidences": {
+            "total_documents": total,
+            "validated_count": validated,
+            "validation_rate": round(validation_score * 100, 1),
+            "avg_confidence": round(avg_confidence * 100, 1),
+            "freshness_score": round(freshness_score * 100, 1),
+            "fresh_documents": fresh
+        }
+    }
+
+
+def quality_from_snapshot(snapshot: dict) -> Dict[str, Any]:
+    return quality_from_counts(*(snapshot.get(field, 0) for field in COUNTER_FIELDS))
+
+
+async def compute_counts(db, tenant_id: str, now: Optional[datetime] = None) -> Dict[str, float]:
+    rows = await db.knowledge_documents.aggregate(quality_pipeline(tenant_id, now)).to_list(1)
+    row = rows[0] if rows else {}
+    return {field: row.get(field, 0) for field in COUNTER_FIELDS}
+
+
+async def compute_quality(db, tenant_id: str, now: Optional[datetime] = None) -> Dict[str, Any]:
+    return quality_from_snapshot(await compute_counts(db, tenant_id, now))
+
+
+# ============== Incremental snapshot ==============
+
+def _add(delta: Dict[str, float], field: str, amount: float):
+    if amount:
+        delta[field] = delta.get(field, 0) + amount
+
+
+def document_delta(before: Optional[dict], after: Optional[dict], now: Optional[datetime] = None) -> Dict[str, float]:
+    """Counter changes for a document insert (before=None), update or delete (after=None)."""
+    delta: Dict[str, float] = {}
+    for doc, sign in ((before, -1), (after, 1)):
+        if doc is None:
+            continue
+        _add(delta, "total", sign)
+        _add(delta, "validated", sign * int(bool(doc.get("validated"))))
+        _add(delta, "confidence_sum", sign * (doc.get("confidence_score") or 0))
+        _add(delta, "fresh", sign * int(is_fresh(doc, now)))
+    return {k: v for k, v in delta.items() if v}
+
+
+async def apply_snapshot_delta(db, tenant_id: str, delta: Dict[str, float]):
+    """Atomically apply a counter delta. A missing snapshot is left for the next read to rebuild."""
+    if not delta:
+        return
+    await db.iqi_snapshots.update_one(
+        {"tenant_id": tenant_id},
+        {"$inc": delta, "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}}
+    )
+
+
+async def apply_document_changes(db, tenant_id: str, changes: List[tuple]):
+    """Apply the summed delta of (before, after) document pairs in one update"""
+    now = datetime.now(timezone.utc)
+    delta: Dict[str, float] = {}
+    for before, after in changes:
+        for field, amount in document_delta(before, after, now).items():
+            _add(delta, field, amount)
+    await apply_snapshot_delta(db, tenant_id, delta)
+
+
+async def rebuild_snapshot(db, tenant_id: str, now: Optional[datetime] = None) -> dict:
+    now = now or datetime.now(timezone.utc)
+    snapshot = await compute_counts(db, tenant_id, now)
+    snapshot.update({"tenant_id": tenant_id, "swept_on": now.date().isoformat(), "updated_at": now.isoformat()})
+    await db.iqi_snapshots.replace_one({"tenant_id": tenant_id}, snapshot, upsert=True)
+    snapshot.pop("_id", None)
+    return snapshot
+
+
+async def get_snapshot(db, tenant_id: str) -> dict:
+    """Read the snapshot, building it once for tenants that predate it."""
+    snapshot = await db.iqi_snapshots.find_one({"tenant_id": tenant_id}, {"_id": 0})
+    if snapshot is None:
+        snapshot = await rebuild_snapshot(db, tenant_id)
+        await record_history(db, tenant_id, snapshot, snapshot["swept_on"])
+    return snapshot
+
+
+async def get_quality(db, tenant_id: str) -> Dict[str, Any]:
+    return quality_from_snapshot(await get_snapshot(db, tenant_id))
+
+
+# ============== Daily sweep and history ==============
+
+async def record_history(db, tenant_id: str, snapshot: dict, day: str):
+    quality = quality_from_snapshot(snapshot)
+    await db.iqi_history.update_one(
+        {"tenant_id": tenant_id, "date": day},
+        {"$set": {"iqi_global": quality["iqi_global"], **quality["evidences"]}},
+        upsert=True
+    )
+
+
+async def sweep_tenant(db, tenant_id: str, now: Optional[datetime] = None) -> Optional[dict]:
+    """Recount a tenant's snapshot and record today's IQI, unless another worker already did today."""
+    now = now or datetime.now(timezone.utc)
+    today = now.date().isoformat()
+    claimed = await db.iqi_snapshots.find_one_and_update(
+        {"tenant_id": tenant_id, "swept_on": {"$ne": today}},
+        {"$set": {"swept_on": today}},
+        projection={"_id": 1}
+    )
+    if claimed is None:
+        return None
+    snapshot = await rebuild_snapshot(db, tenant_id, now)
+    await record_history(db, tenant_id, snapshot, today)
+    return snapshot
+
+
+async def sweep_all(db, now: Optional[datetime] = None) -> int:
+    """Sweep every tenant not yet swept today; returns the number swept"""
+    now = now or datetime.now(timezone.utc)
+    tenant_ids = await db.iqi_snapshots.distinct("tenant_id", {"swept_on": {"$ne": now.date().isoformat()}})
+    swept = 0
+    for tenant_id in tenant_ids:
+        if await sweep_tenant(db, tenant_id, now):
+            swept += 1
+    return swept
+
+
+async def run_daily_sweep(db, check_interval: float):
+    """Background loop: every check_interval seconds, sweep the tenants not yet swept today"""
+    while True:
+        try:
+            swept = await sweep_all(db)
+            if swept:
+                logger.info(f"IQI sweep refreshed {swept} tenant(s)")
+        except Exception as e:
+            logger.warning(f"IQI sweep failed: {e}")
+        await asyncio.sleep(check_interval)
+
+
+async def get_history(db, tenant_id: str, days: int) -> List[dict]:
+    """Daily IQI values for the last `days` days, oldest first"""
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).date().isoformat()
+    return await db.iqi_history.find(
+        {"tenant_id": tenant_id, "date": {"$gt": since}}, {"_id": 0, "tenant_id": 0}
+    ).sort("date", 1).to_list(None)
+
+
+async def verify_snapshot(db, tenant_id: str) -> Dict[str, Dict[str, Any]]:
+    """Compare the stored snapshot with a fresh recomputation; returns {field: {stored, actual}} for drifted fields."""
+    stored = await db.iqi_snapshots.find_one({"tenant_id": tenant_id}, {"_id": 0}) or {}
+    actual = await compute_counts(db, tenant_id)
+    drift = {}
+    for field in COUNTER_FIELDS:
+        stored_value, actual_value = stored.get(field), actual.get(field)
+        if field == "confidence_sum":
+            if abs((stored_value or 0) - actual_value) <= CONFIDENCE_SUM_TOLERANCE:
+                continue
+        elif stored_value == actual_value:
+            continue
+        drift[field] = {"stored": stored_value, "actual": actual_value}
+    return drift
+
+
+# ============== Command line ==============
+
+async def _run(command: str, tenant_id: Optional[str]) -> int:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        if command == "sweep":
+            print(f"{await sweep_all(db)} tenant(s) swept")
+            return 0
+
+        tenant_ids = [tenant_id] if tenant_id else await db.knowledge_documents.distinct("tenant_id")
+        drifted = 0
+        for tid in tenant_ids:
+            drift = await verify_snapshot(db, tid)
+            if drift:
+                drifted += 1
+                for field, values in drift.items():
+                    print(f"{tid}  {field}: stored={values['stored']} actual={values['actual']}")
+            if command == "rebuild":
+                await rebuild_snapshot(db, tid)
+        action = "rebuilt" if command == "rebuild" else "checked"
+        print(f"{len(tenant_ids)} tenant(s) {action}, {drifted} with drift")
+        return 1 if command == "verify" and drifted else 0
+    finally:
+        client.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Sweep, verify or rebuild the iqi_snapshots collection")
+    parser.add_argument("command", choices=["sweep", "verify", "rebuild"])
+    parser.add_argument("--tenant-id", help="limit verify/rebuild to one tenant (default: every tenant with documents)")
+    args = parser.parse_args(argv)
+    return asyncio.run(_run(args.command, args.tenant_id))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
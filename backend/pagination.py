@@ -0,0 +1,64 @@
+# Keyset (cursor) pagination for timestamp-ordered listings
+#
+# Pages are ordered by (sort_field desc, id desc). The cursor handed back to the
+# client is an opaque, URL-safe encoding of the last row's (timestamp, id);
+# the next page is "everything strictly before that key", which the
+# (program_id, ..., sort_field -1, id -1) indexes serve with a bounded index
+# scan, so deep pages cost the same as the first one.
+
+from typing import Any, Dict, List, Optional, Tuple
+import base64
+import json
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(timestamp: str, row_id: str) -> str:
+    raw = json.dumps([timestamp, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    if not isinstance(timestamp, str) or not isinstance(row_id, str):
+        raise InvalidCursor(cursor)
+    return timestamp, row_id
+
+
+def keyset_query(query: dict, sort_field: str, cursor: Optional[str]) -> dict:
+    """Restrict query to the rows that sort after the cursor"""
+    if not cursor:
+        return query
+    timestamp, row_id = decode_cursor(cursor)
+    return {
+        **query,
+        "$or": [
+            {sort_field: {"$lt": timestamp}},
+            {sort_field: timestamp, "id": {"$lt": row_id}}
+        ]
+    }
+
+
+async def fetch_page(
+    collection,
+    query: dict,
+    sort_field: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    projection: Optional[Dict[str, Any]] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """One page of rows and the cursor of the next page (None on the last page)"""
+    rows = await collection.find(
+        keyset_query(query, sort_field, cursor), projection if projection is not None else {"_id": 0}
+    ).sort([(sort_field, -1), ("id", -1)]).limit(limit + 1).to_list(limit + 1)
+
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1][sort_field], rows[-1]["id"])
@@ -0,0 +1,136 @@
+# Per-tenant cache of the AI usage policy thresholds
+#
+# Every authorization check needs min_iqi_authorized / min_iqi_assisted, which
+# change a few times a year, so each process keeps them in memory:
+#
+#   - PUT /settings/ai-policy writes through: the update bumps the policy's
+#     version and updated_at, and the returned document replaces the local entry.
+#   - Other worker processes poll ai_usage_policies every poll_interval seconds
+#     for documents updated since the last poll (one indexed query per process,
+#     whatever the number of tenants) and refresh the tenants they hold. That
+#     bounds the staleness of a remote change to about poll_interval.
+#   - Entries also expire after ttl as a backstop if polling stops.
+#
+# Entries are only ever replaced by a higher version, so a late poll result
+# never undoes a newer write-through.
+
+from typing import Dict, Optional
+from datetime import datetime, timedelta, timezone
+from pymongo import ReturnDocument
+import asyncio
+import logging
+
+from cache import MemoryCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AI_POLICY = {"min_iqi_authorized": 0.80, "min_iqi_assisted": 0.60}
+POLICY_FIELDS = {"_id": 0, "tenant_id": 1, "min_iqi_authorized": 1, "min_iqi_assisted": 1, "version": 1, "updated_at": 1}
+
+# Updates are re-read for this long after the watermark, so clock skew between writers cannot hide one
+POLL_OVERLAP = timedelta(seconds=30)
+
+
+def _policy_entry(document: Optional[dict]) -> dict:
+    document = document or {}
+    return {
+        "min_iqi_authorized": document.get("min_iqi_authorized", DEFAULT_AI_POLICY["min_iqi_authorized"]),
+        "min_iqi_assisted": document.get("min_iqi_assisted", DEFAULT_AI_POLICY["min_iqi_assisted"]),
+        "version": document.get("version", 0)
+    }
+
+
+class PolicyCache:
+    def __init__(self, poll_interval: float = 2.0, ttl: float = 300, maxsize: int = 4096):
+        self.poll_interval = poll_interval
+        self._entries = MemoryCache(maxsize=maxsize, ttl=ttl)
+        self._watermark = datetime.now(timezone.utc)
+        self._task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.polls = 0
+        self.refreshed = 0
+
+    async def get(self, db, tenant_id: str) -> dict:
+        """Thresholds for a tenant: {min_iqi_authorized, min_iqi_assisted, version}"""
+        entry = self._entries.get(tenant_id)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        entry = _policy_entry(await db.ai_usage_policies.find_one({"tenant_id": tenant_id}, POLICY_FIELDS))
+        return self.put(tenant_id, entry)
+
+    def put(self, tenant_id: str, policy: dict) -> dict:
+        """Store a policy unless a newer version is already held; returns the entry kept"""
+        entry = _policy_entry(policy)
+        current = self._entries.get(tenant_id)
+        if current is not None and current["version"] > entry["version"]:
+            return current
+        self._entries.set(tenant_id, entry)
+        return entry
+
+    async def update(self, db, tenant_id: str, min_iqi_authorized: float, min_iqi_assisted: float) -> dict:
+        """Write a tenant's thresholds with a new version and cache the result"""
+        document = await db.ai_usage_policies.find_one_and_update(
+            {"tenant_id": tenant_id},
+            {
+                "$set": {
+                    "min_iqi_authorized": min_iqi_authorized,
+                    "min_iqi_assisted": min_iqi_assisted,
+                    "updated_at": datetime.now(timezone.utc).isoformat()
+                },
+                "$inc": {"version": 1}
+            },
+            projection=POLICY_FIELDS,
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return self.put(tenant_id, document)
+
+    async def poll_once(self, db) -> int:
+        """Refresh cached tenants whose policy changed since the last poll; returns the number refreshed"""
+        since = (self._watermark - POLL_OVERLAP).isoformat()
+        self.polls += 1
+        refreshed = 0
+        async for document in db.ai_usage_policies.find({"updated_at": {"$gte": since}}, POLICY_FIELDS):
+            updated_at = datetime.fromisoformat(document["updated_at"])
+            if updated_at > self._watermark:
+                self._watermark = updated_at
+            current = self._entries.get(document["tenant_id"])
+            if current is not None and current["version"] < document.get("version", 0):
+                self.put(document["tenant_id"], document)
+                refreshed += 1
+        self.refreshed += refreshed
+        return refreshed
+
+    async def _poll_forever(self, db):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.poll_once(db)
+            except Exception as e:
+                logger.warning(f"AI policy poll failed: {e}")
+
+    def start(self, db):
+        if self._task is None and self.poll_interval > 0:
+            self._task = asyncio.create_task(self._poll_forever(db))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "tenants": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "polls": self.polls,
+            "refreshed": self.refreshed,
+            "poll_interval_seconds": self.poll_interval
+        }
@@ -0,0 +1,144 @@
+# "What-if" simulation of AI usage thresholds over a tenant's whole corpus
+#
+# The decision rules only look at two columns of a document, validated and
+# confidence_score, so each process keeps a columnar snapshot per tenant: the
+# sorted confidence scores of the validated documents and of the others. A
+# candidate policy then splits each column at its thresholds with a binary
+# search, and every confidence interval between two thresholds is classified
+# once with rescoring.classify (the vectorized decide_ai_usage). Evaluating one
+# policy, transitions from the current one included, costs a few searchsorted
+# calls whatever the number of documents, so a whole grid fits in one request.
+#
+# The snapshot is stamped with the updated_at of the tenant's IQI snapshot,
+# which every knowledge document write moves (see iqi.py); a request whose
+# stamp differs reloads the columns instead of serving stale scores.
+
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+import asyncio
+
+import numpy as np
+
+import iqi
+from cache import MemoryCache
+from rescoring import USAGE_STATUSES, classify
+
+SIMULATION_PROJECTION = {"_id": 0, "confidence_score": 1, "validated": 1}
+LOAD_CHUNK_SIZE = 50000
+MAX_SIMULATED_POLICIES = 10000
+
+
+class ScoreSnapshot:
+    """Sorted confidence scores of a tenant's documents, split on validated"""
+
+    def __init__(self, validated: np.ndarray, unvalidated: np.ndarray, stamp: Optional[str]):
+        self.columns = (np.sort(unvalidated), np.sort(validated))
+        self.stamp = stamp
+        self.loaded_at = datetime.now(timezone.utc).isoformat()
+
+    @property
+    def documents(self) -> int:
+        return sum(len(column) for column in self.columns)
+
+    def _status_counts(self, thresholds: List[float], policies: List[Tuple[float, float]]) -> np.ndarray:
+        """counts[p, old, new] over the policies, classifying documents per confidence interval"""
+        edges = np.unique(np.asarray(thresholds, dtype="float64"))
+        # Interval i holds the confidences in [edges[i-1], edges[i]); interval 0 is below every threshold
+        representatives = np.concatenate(([-np.inf], edges))
+        counts = np.zeros((len(policies), len(USAGE_STATUSES), len(USAGE_STATUSES)), dtype=np.int64)
+        for is_validated, column in enumerate(self.columns):
+            sizes = np.diff(np.concatenate(([0], np.searchsorted(column, edges, side="left"), [len(column)])))
+            flags = np.full(len(representatives), bool(is_validated))
+            statuses = [classify(representatives, flags, authorized, assisted) for authorized, assisted in policies]
+            for p, status in enumerate(statuses):
+                np.add.at(counts[p], (statuses[0], status), sizes)
+        return counts
+
+    def simulate(self, current: Tuple[float, float], candidates: List[Tuple[float, float]]) -> Tuple[dict, List[dict]]:
+        """Status counts under the current policy and each candidate, with the moves from current"""
+        policies = [current, *candidates]
+        counts = self._status_counts([t for policy in policies for t in policy], policies)
+        names = [str(s) for s in USAGE_STATUSES]
+
+        def totals(matrix: np.ndarray) -> Dict[str, int]:
+            return dict(zip(names, matrix.sum(axis=0).tolist()))
+
+        results = []
+        for (authorized, assisted), matrix in zip(candidates, counts[1:]):
+            moved = {
+                names[old]: {names[new]: int(matrix[old, new]) for new in range(len(names)) if new != old and matrix[old, new]}
+                for old in range(len(names))
+            }
+            results.append({
+                "min_iqi_authorized": authorized,
+                "min_iqi_assisted": assisted,
+                **totals(matrix),
+                "moved": {old: moves for old, moves in moved.items() if moves}
+            })
+        return totals(counts[0]), results
+
+
+async def load_snapshot(db, tenant_id: str, stamp: Optional[str]) -> ScoreSnapshot:
+    validated: List[np.ndarray] = []
+    unvalidated: List[np.ndarray] = []
+    cursor = db.knowledge_documents.find({"tenant_id": tenant_id}, SIMULATION_PROJECTION).batch_size(10000)
+    while documents := await cursor.to_list(LOAD_CHUNK_SIZE):
+        confidence = np.fromiter((d.get("confidence_score") or 0 for d in documents), dtype="float64", count=len(documents))
+        flags = np.fromiter((bool(d.get("validated")) for d in documents), dtype=bool, count=len(documents))
+        validated.append(confidence[flags])
+        unvalidated.append(confidence[~flags])
+    empty = np.empty(0, dtype="float64")
+    return ScoreSnapshot(np.concatenate(validated or [empty]), np.concatenate(unvalidated or [empty]), stamp)
+
+
+class ScoreSnapshotCache:
+    def __init__(self, ttl: float = 3600, maxsize: int = 64):
+        self._entries = MemoryCache(maxsize=maxsize, ttl=ttl)
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.hits = 0
+        self.loads = 0
+
+    async def get(self, db, tenant_id: str) -> ScoreSnapshot:
+        """The tenant's snapshot, reloaded when a document write moved the IQI snapshot since"""
+        stamp = (await iqi.get_snapshot(db, tenant_id)).get("updated_at")
+        snapshot = self._entries.get(tenant_id)
+        if snapshot is not None and snapshot.stamp == stamp:
+            self.hits += 1
+            return snapshot
+        # Concurrent simulations of one tenant share a single load
+        lock = self._locks.setdefault(tenant_id, asyncio.Lock())
+        async with lock:
+            snapshot = self._entries.get(tenant_id)
+            if snapshot is None or snapshot.stamp != stamp:
+                snapshot = await load_snapshot(db, tenant_id, stamp)
+                self._entries.set(tenant_id, snapshot)
+                self.loads += 1
+        # Only loads in progress keep a lock; a caller racing the removal at worst loads again
+        if self._locks.get(tenant_id) is lock and not lock.locked():
+            del self._locks[tenant_id]
+        return snapshot
+
+    def stats(self) -> Dict[str, int]:
+        return {"tenants": len(self._entries), "hits": self.hits, "loads": self.loads}
+
+
+def grid_size(authorized_values: List[float], assisted_values: List[float]) -> int:
+    """Upper bound on len(grid_policies(...)), computed without building the grid"""
+    return len(set(authorized_values)) * len(set(assisted_values))
+
+
+def grid_policies(authorized_values: List[float], assisted_values: List[float]) -> List[Tuple[float, float]]:
+    """Every valid (authorized, assisted) pair of the grid: authorized is never below assisted"""
+    return [(a, b) for a in sorted(set(authorized_values)) for b in sorted(set(assisted_values)) if a >= b]
+
+
+async def simulate_policies(db, cache: ScoreSnapshotCache, tenant_id: str, current: dict, candidates: List[Tuple[float, float]]) -> dict:
+    snapshot = await cache.get(db, tenant_id)
+    current_policy = (current["min_iqi_authorized"], current["min_iqi_assisted"])
+    current_counts, results = snapshot.simulate(current_policy, candidates)
+    return {
+        "documents": snapshot.documents,
+        "snapshot_loaded_at": snapshot.loaded_at,
+        "current": {"min_iqi_authorized": current_policy[0], "min_iqi_assisted": current_policy[1], **current_counts},
+        "results": results
+    }
@@ -1,6 +1,7 @@
 # Power Platform Governance Module - Seed Data and Business Logic
 
 from typing import List, Dict, Any, Optional
+from types import MappingProxyType
 from pydantic import BaseModel
 from datetime import datetime, timezone
 
@@ -220,6 +221,24 @@ ITEM_DEFINITIONS = [
     {"item_id": "A10-06", "workshop_number": 10, "title": "Programme Completion", "module_name": "Workshops Completion", "status_requirement": "OBLIGATOIRE", "user_story_fr": "En tant que Sponsor, je veux marquer le programme comme complété avec les livrables associés afin d'officialiser la transition vers le Run.", "acceptance_criteria": ["Ateliers marqués 'Completed'", "Livrables liés (preuves)", "Décision de transition Run enregistrée", "Backlog post-programme créé", "Date de clôture + sponsor validateur"]}
 ]
 
+# ============== Lookup Indexes ==============
+# Built once at import. The containers are read-only views so request handlers
+# cannot alter the shared tables; copy a definition before mutating it.
+
+WORKSHOP_DEFINITIONS_BY_NUMBER = MappingProxyType({d["workshop_number"]: d for d in WORKSHOP_DEFINITIONS})
+
+ITEM_DEFINITIONS_BY_ID = MappingProxyType({d["item_id"]: d for d in ITEM_DEFINITIONS})
+
+ITEM_DEFINITIONS_BY_WORKSHOP = MappingProxyType({
+    number: tuple(d for d in ITEM_DEFINITIONS if d["workshop_number"] == number)
+    for number in WORKSHOP_DEFINITIONS_BY_NUMBER
+})
+
+MANDATORY_ITEM_IDS_BY_WORKSHOP = MappingProxyType({
+    number: frozenset(d["item_id"] for d in items if d["status_requirement"] == "OBLIGATOIRE")
+    for number, items in ITEM_DEFINITIONS_BY_WORKSHOP.items()
+})
+
 def get_workshop_definitions():
     return WORKSHOP_DEFINITIONS
 
@@ -227,4 +246,4 @@ def get_item_definitions():
     return ITEM_DEFINITIONS
 
 def get_items_for_workshop(workshop_number: int):
-    return [item for item in ITEM_DEFINITIONS if item["workshop_number"] == workshop_number]
+    return ITEM_DEFINITIONS_BY_WORKSHOP.get(workshop_number, ())
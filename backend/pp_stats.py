@@ -0,0 +1,300 @@
+# Power Platform Governance Module - Program KPI rollup
+#
+# One pp_program_stats document per program holds the counters behind
+# GET /power-platform/kpis. Every write path in server.py derives a $inc delta
+# from the before/after state of the document it touched, so the KPI endpoint
+# reads a single document instead of scanning items, actions, decisions and
+# evidence.
+#
+# Rebuild or check the rollup from the source collections:
+#
+#     python pp_stats.py verify [--program-id ID]
+#     python pp_stats.py rebuild [--program-id ID]
+
+from typing import Dict, Any, Optional, List
+from datetime import datetime, timezone
+from pathlib import Path
+import argparse
+import asyncio
+import os
+import sys
+
+ITEM_STATUSES = ["not_started", "in_progress", "done", "validated"]
+OPEN_ACTION_STATUSES = ["open", "in_progress"]
+
+COUNTER_FIELDS = [
+    "workshops_completed",
+    "items_total",
+    *[f"items_{s}" for s in ITEM_STATUSES],
+    "items_without_owner",
+    "actions_open_count",
+    "actions_open_without_owner",
+    "actions_open_created_ts_sum",
+    "decisions_count",
+    "evidence_count",
+]
+
+# Float sums of epoch seconds accumulate rounding error; anything below this is not drift.
+TS_SUM_TOLERANCE_SECONDS = 1.0
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+
+def _add(delta: Dict[str, float], field: str, amount: float):
+    if amount:
+        delta[field] = delta.get(field, 0) + amount
+
+
+def item_delta(before: Optional[dict], after: Optional[dict]) -> Dict[str, float]:
+    """Counter changes for an item instance insert (before=None), update or delete (after=None)."""
+    delta: Dict[str, float] = {}
+    for doc, sign in ((before, -1), (after, 1)):
+        if doc is None:
+            continue
+        _add(delta, "items_total", sign)
+        if doc.get("status") in ITEM_STATUSES:
+            _add(delta, f"items_{doc['status']}", sign)
+        if not doc.get("owner_user_id"):
+            _add(delta, "items_without_owner", sign)
+    return {k: v for k, v in delta.items() if v}
+
+
+def action_delta(before: Optional[dict], after: Optional[dict]) -> Dict[str, float]:
+    """Counter changes for an action insert, update or delete. Only open actions are tracked."""
+    delta: Dict[str, float] = {}
+    for doc, sign in ((before, -1), (after, 1)):
+        if doc is None or doc.get("status") not in OPEN_ACTION_STATUSES:
+            continue
+        _add(delta, "actions_open_count", sign)
+        if not doc.get("owner_user_id"):
+            _add(delta, "actions_open_without_owner", sign)
+        _add(delta, "actions_open_created_ts_sum", sign * (parse_timestamp(doc.get("created_at")) or 0))
+    return {k: v for k, v in delta.items() if v}
+
+
+def workshop_delta(before: Optional[dict], after: Optional[dict]) -> Dict[str, float]:
+    was_completed = bool(before) and before.get("status") == "completed"
+    is_completed = bool(after) and after.get("status") == "completed"
+    return {"workshops_completed": int(is_completed) - int(was_completed)} if was_completed != is_completed else {}
+
+
+def leaves_open_set(before: Optional[dict], after: Optional[dict]) -> bool:
+    return bool(before) and before.get("status") in OPEN_ACTION_STATUSES and (
+        after is None or after.get("status") not in OPEN_ACTION_STATUSES
+    )
+
+
+def enters_open_set(before: Optional[dict], after: Optional[dict]) -> bool:
+    return bool(after) and after.get("status") in OPEN_ACTION_STATUSES and (
+        before is None or before.get("status") not in OPEN_ACTION_STATUSES
+    )
+
+
+def initial_program_stats(program_id: str, workshops: List[dict], items: List[dict]) -> dict:
+    """Stats document for a freshly bootstrapped program."""
+    stats = {field: 0 for field in COUNTER_FIELDS}
+    for ws in workshops:
+        for k, v in workshop_delta(None, ws).items():
+            stats[k] += v
+    for item in items:
+        for k, v in item_delta(None, item).items():
+            stats[k] += v
+    stats.update({
+        "program_id": program_id,
+        "actions_open_oldest_created_at": None,
+        "updated_at": datetime.now(timezone.utc).isoformat()
+    })
+    return stats
+
+
+async def apply_stats_delta(db, program_id: str, delta: Dict[str, float]):
+    """Atomically apply a counter delta. A missing rollup is left for the next read to rebuild."""
+    if not delta:
+        return
+    await db.pp_program_stats.update_one(
+        {"program_id": program_id},
+        {"$inc": delta, "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}}
+    )
+
+
+async def apply_action_change(db, program_id: str, before: Optional[dict], after: Optional[dict]):
+    """Apply the counter delta for an action write and keep the oldest open action current."""
+    await apply_stats_delta(db, program_id, action_delta(before, after))
+    if enters_open_set(before, after) and after.get("created_at"):
+        # Conditional $set rather than $min, which never replaces the null left when no action was open
+        await db.pp_program_stats.update_one(
+            {"program_id": program_id, "$or": [
+                {"actions_open_oldest_created_at": None},
+                {"actions_open_oldest_created_at": {"$gt": after["created_at"]}}
+            ]},
+            {"$set": {"actions_open_oldest_created_at": after["created_at"]}}
+        )
+    elif leaves_open_set(before, after):
+        oldest = await _oldest_open_action(db, program_id)
+        await db.pp_program_stats.update_one(
+            {"program_id": program_id, "actions_open_oldest_created_at": before.get("created_at")},
+            {"$set": {"actions_open_oldest_created_at": oldest}}
+        )
+
+
+async def _oldest_open_action(db, program_id: str) -> Optional[str]:
+    oldest = await db.pp_actions.find_one(
+        {"program_id": program_id, "status": {"$in": OPEN_ACTION_STATUSES}},
+        {"_id": 0, "created_at": 1},
+        sort=[("created_at", 1)]
+    )
+    return oldest["created_at"] if oldest else None
+
+
+async def compute_program_stats(db, program_id: str) -> dict:
+    """Recompute the rollup from the source collections."""
+    stats = {field: 0 for field in COUNTER_FIELDS}
+    stats["workshops_completed"] = await db.pp_workshops.count_documents({"program_id": program_id, "status": "completed"})
+
+    item_rows = await db.pp_item_instances.aggregate([
+        {"$match": {"program_id": program_id}},
+        {"$group": {
+            "_id": None,
+            "items_total": {"$sum": 1},
+            **{f"items_{s}": {"$sum": {"$cond": [{"$eq": ["$status", s]}, 1, 0]}} for s in ITEM_STATUSES},
+            "items_without_owner": {"$sum": {"$cond": [{"$in": [{"$ifNull": ["$owner_user_id", None]}, [None, ""]]}, 1, 0]}}
+        }}
+    ]).to_list(1)
+    if item_rows:
+        stats.update({k: v for k, v in item_rows[0].items() if k != "_id"})
+
+    # Open actions are streamed with a narrow projection so the rebuild stays in constant memory
+    oldest = None
+    cursor = db.pp_actions.find(
+        {"program_id": program_id, "status": {"$in": OPEN_ACTION_STATUSES}},
+        {"_id": 0, "status": 1, "owner_user_id": 1, "created_at": 1}
+    )
+    async for action in cursor:
+        for k, v in action_delta(None, action).items():
+            stats[k] += v
+        if action.get("created_at") and (oldest is None or action["created_at"] < oldest):
+            oldest = action["created_at"]
+
+    stats["decisions_count"] = await db.pp_decisions.count_documents({"program_id": program_id})
+    stats["evidence_count"] = await db.pp_evidence.count_documents({"program_id": program_id})
+    stats.update({
+        "program_id": program_id,
+        "actions_open_oldest_created_at": oldest,
+        "updated_at": datetime.now(timezone.utc).isoformat()
+    })
+    return stats
+
+
+async def rebuild_program_stats(db, program_id: str) -> dict:
+    stats = await compute_program_stats(db, program_id)
+    await db.pp_program_stats.replace_one({"program_id": program_id}, stats, upsert=True)
+    stats.pop("_id", None)
+    return stats
+
+
+async def get_program_stats(db, program_id: str) -> dict:
+    """Read the rollup, rebuilding it once for programs created before it existed."""
+    stats = await db.pp_program_stats.find_one({"program_id": program_id}, {"_id": 0})
+    if stats is None:
+        stats = await rebuild_program_stats(db, program_id)
+    return stats
+
+
+async def verify_program_stats(db, program_id: str) -> Dict[str, Dict[str, Any]]:
+    """Compare the stored rollup with a fresh recomputation; returns {field: {stored, actual}} for drifted fields."""
+    stored = await db.pp_program_stats.find_one({"program_id": program_id}, {"_id": 0}) or {}
+    actual = await compute_program_stats(db, program_id)
+    drift = {}
+    for field in COUNTER_FIELDS + ["actions_open_oldest_created_at"]:
+        stored_value, actual_value = stored.get(field), actual.get(field)
+        if field == "actions_open_created_ts_sum":
+            if abs((stored_value or 0) - actual_value) <= TS_SUM_TOLERANCE_SECONDS:
+                continue
+        elif stored_value == actual_value:
+            continue
+        drift[field] = {"stored": stored_value, "actual": actual_value}
+    return drift
+
+
+def kpis_from_stats(stats: dict, total_workshops: int, now: Optional[datetime] = None) -> dict:
+    """Shape a rollup document as the PPKPIs response."""
+    now = now or datetime.now(timezone.utc)
+    open_count = stats.get("actions_open_count", 0)
+    if open_count > 0:
+        avg_created = stats.get("actions_open_created_ts_sum", 0) / open_count
+        actions_ageing_avg_days = max(0.0, (now.timestamp() - avg_created) / 86400)
+    else:
+        actions_ageing_avg_days = 0
+    oldest = parse_timestamp(stats.get("actions_open_oldest_created_at"))
+    actions_ageing_max_days = (now - datetime.fromtimestamp(oldest, timezone.utc)).days if open_count > 0 and oldest else 0
+
+    items_total = stats.get("items_total", 0)
+    total_items_and_actions = items_total + open_count
+    missing = stats.get("items_without_owner", 0) + stats.get("actions_open_without_owner", 0)
+    ownership_missing_pct = (missing / total_items_and_actions * 100) if total_items_and_actions > 0 else 0
+    workshops_completed = stats.get("workshops_completed", 0)
+
+    return {
+        "workshop_completion_pct": round(workshops_completed / total_workshops * 100, 1),
+        "workshops_completed": workshops_completed,
+        "total_workshops": total_workshops,
+        "items_total": items_total,
+        "items_done": stats.get("items_done", 0),
+        "items_validated": stats.get("items_validated", 0),
+        "items_in_progress": stats.get("items_in_progress", 0),
+        "items_not_started": stats.get("items_not_started", 0),
+        "actions_open_count": open_count,
+        "actions_ageing_avg_days": round(actions_ageing_avg_days, 1),
+        "actions_ageing_max_days": actions_ageing_max_days,
+        "decisions_count": stats.get("decisions_count", 0),
+        "evidence_count": stats.get("evidence_count", 0),
+        "ownership_missing_pct": round(ownership_missing_pct, 1)
+    }
+
+
+# ============== Command line ==============
+
+async def _run(command: str, program_id: Optional[str]) -> int:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        if program_id:
+            program_ids = [program_id]
+        else:
+            program_ids = [p["id"] async for p in db.pp_programs.find({}, {"_id": 0, "id": 1})]
+
+        drifted = 0
+        for pid in program_ids:
+            drift = await verify_program_stats(db, pid)
+            if drift:
+                drifted += 1
+                for field, values in drift.items():
+                    print(f"{pid}  {field}: stored={values['stored']} actual={values['actual']}")
+            if command == "rebuild":
+                await rebuild_program_stats(db, pid)
+        action = "rebuilt" if command == "rebuild" else "checked"
+        print(f"{len(program_ids)} program(s) {action}, {drifted} with drift")
+        return 1 if command == "verify" and drifted else 0
+    finally:
+        client.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Verify or rebuild the pp_program_stats rollup")
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    parser.add_argument("--program-id", help="limit to one program (default: all programs)")
+    args = parser.parse_args(argv)
+    return asyncio.run(_run(args.command, args.program_id))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,27 +1,55 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, Query
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from pymongo import UpdateOne
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta, timezone
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import os
+import json
+import hashlib
+import asyncio
 import logging
 from pathlib import Path
 import uuid
+import time
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # Import Power Platform seed data
-from power_platform_seed import WORKSHOP_DEFINITIONS, ITEM_DEFINITIONS, get_items_for_workshop
+from power_platform_seed import (
+    WORKSHOP_DEFINITIONS, ITEM_DEFINITIONS, WORKSHOP_DEFINITIONS_BY_NUMBER, ITEM_DEFINITIONS_BY_ID,
+    get_items_for_workshop
+)
+import pp_stats
+import workshop_counters
+from coalescing import WriteCoalescer, apply_set, merge_set
+from cache import make_cache, MemoryCache
+from executors import BoundedExecutor, PoolSaturated
+from indexes import ensure_indexes, index_report
+from pagination import fetch_page, InvalidCursor
+from export import stream_export, EXPORT_FORMATS
+import usage_rollups
+import iqi
+from ingest import ingest_documents, INGEST_FORMATS, DEFAULT_BATCH_SIZE as INGEST_DEFAULT_BATCH_SIZE, MAX_BATCH_SIZE as INGEST_MAX_BATCH_SIZE
+from policy_cache import PolicyCache
+from rescoring import rescore_tenant
+from usage_log_writer import UsageLogWriter
+from policy_simulation import ScoreSnapshotCache, grid_policies, grid_size, simulate_policies, MAX_SIMULATED_POLICIES
+from command_stats import CommandCounter
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# Counts every command sent to MongoDB, per collection (see /admin/metrics)
+command_counter = CommandCounter()
+client = AsyncIOMotorClient(mongo_url, event_listeners=[command_counter])
 db = client[os.environ['DB_NAME']]
 
 # JWT Configuration
@@ -29,8 +57,48 @@ SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "bizdesk365-secret-key-change-in-p
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 480
 
-# Password hashing
+# Program per tenant: the id never changes once created, so it is cached across requests
+PROGRAM_CACHE_TTL_SECONDS = float(os.environ.get("PP_PROGRAM_CACHE_TTL_SECONDS", "300"))
+PROGRAM_CACHE_MAX_TENANTS = int(os.environ.get("PP_PROGRAM_CACHE_MAX_TENANTS", "1024"))
+
+# Verified tokens are cached per process until their exp claim; JWT_CACHE_SIZE=0 disables the cache
+TOKEN_CACHE_SIZE = int(os.environ.get("JWT_CACHE_SIZE", "4096"))
+
+# Keyset pagination of actions, decisions and evidence listings
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Streaming exports read the cursor in batches of this many rows
+EXPORT_BATCH_SIZE = int(os.environ.get("PP_EXPORT_BATCH_SIZE", "1000"))
+
+# AI policy thresholds are cached per process; changes made by other workers are polled for
+AI_POLICY_POLL_SECONDS = float(os.environ.get("AI_POLICY_POLL_SECONDS", "2"))
+AI_POLICY_CACHE_TTL_SECONDS = float(os.environ.get("AI_POLICY_CACHE_TTL_SECONDS", "300"))
+# Columnar score snapshots used by the policy simulation; reloaded earlier whenever a document changes
+AI_POLICY_SIMULATION_TTL_SECONDS = float(os.environ.get("AI_POLICY_SIMULATION_TTL_SECONDS", "3600"))
+
+# The IQI sweep checks this often for tenants not yet swept today; 0 disables it
+IQI_SWEEP_CHECK_SECONDS = float(os.environ.get("IQI_SWEEP_CHECK_SECONDS", "3600"))
+
+# Criteria toggles of one item arriving within this many milliseconds are merged into one write; 0 disables
+PP_ITEM_COALESCE_MS = float(os.environ.get("PP_ITEM_COALESCE_MS", "50"))
+
+# Upper bound on the items changed by one batch item update or validation
+MAX_ITEM_BATCH_SIZE = int(os.environ.get("PP_ITEM_BATCH_MAX_ITEMS", "500"))
+
+# Upper bound on the document ids accepted by one batch AI usage authorization call
+MAX_USAGE_BATCH_DOCUMENTS = int(os.environ.get("AI_USAGE_BATCH_MAX_DOCUMENTS", "1000"))
+
+# Usage logs are buffered and written every AI_USAGE_LOG_BATCH_SIZE entries or AI_USAGE_LOG_FLUSH_MS milliseconds
+AI_USAGE_LOG_BATCH_SIZE = int(os.environ.get("AI_USAGE_LOG_BATCH_SIZE", "500"))
+AI_USAGE_LOG_FLUSH_MS = float(os.environ.get("AI_USAGE_LOG_FLUSH_MS", "200"))
+AI_USAGE_LOG_QUEUE_SIZE = int(os.environ.get("AI_USAGE_LOG_QUEUE_SIZE", "10000"))
+AI_USAGE_LOG_PUT_TIMEOUT_MS = float(os.environ.get("AI_USAGE_LOG_PUT_TIMEOUT_MS", "100"))
+
+# Password hashing (bcrypt runs on a dedicated pool so it never blocks the event loop)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", "64"))
 security = HTTPBearer()
 
 # Create the main app
@@ -118,6 +186,20 @@ class Document(BaseModel):
     validated: bool
     owner: str
 
+class DocumentUpdate(BaseModel):
+    validated: Optional[bool] = None
+    confidence_score: Optional[float] = None
+
+class IQIHistoryPoint(BaseModel):
+    date: str
+    iqi_global: float
+    total_documents: int
+    validated_count: int
+    validation_rate: float = 0.0
+    avg_confidence: float
+    freshness_score: float
+    fresh_documents: int = 0
+
 class AIUsageResponse(BaseModel):
     document_id: str
     document_title: str
@@ -125,6 +207,14 @@ class AIUsageResponse(BaseModel):
     iqi_score: float
     reason: str
 
+class AIUsageBatchRequest(BaseModel):
+    document_ids: List[str]
+    intent: Optional[str] = None
+
+class AIUsageBatchResponse(BaseModel):
+    results: List[AIUsageResponse]
+    not_found: List[str]
+
 class CriticalAction(BaseModel):
     id: str
     title: str
@@ -139,6 +229,17 @@ class GovernanceSummary(BaseModel):
     critical_actions: List[CriticalAction]
     traceability: Dict[str, int]
 
+class UsageBucket(BaseModel):
+    bucket_start: str
+    authorized: int
+    assisted: int
+    forbidden: int
+    total: int
+
+class GovernanceTimeseries(BaseModel):
+    granularity: str
+    buckets: List[UsageBucket]
+
 class ISOProfile(BaseModel):
     iso_code: str
     name: str
@@ -151,6 +252,28 @@ class AIPolicy(BaseModel):
     min_iqi_authorized: float
     min_iqi_assisted: float
 
+class AIPolicyGrid(BaseModel):
+    min_iqi_authorized: List[float]
+    min_iqi_assisted: List[float]
+
+class AIPolicySimulationRequest(BaseModel):
+    candidates: List[AIPolicy] = []
+    grid: Optional[AIPolicyGrid] = None
+
+class AIPolicySimulationResult(BaseModel):
+    min_iqi_authorized: float
+    min_iqi_assisted: float
+    authorized: int
+    assisted: int
+    forbidden: int
+    moved: Dict[str, Dict[str, int]] = {}
+
+class AIPolicySimulationResponse(BaseModel):
+    documents: int
+    snapshot_loaded_at: str
+    current: AIPolicySimulationResult
+    results: List[AIPolicySimulationResult]
+
 class HealthStatus(BaseModel):
     status: str
     message: str
@@ -271,14 +394,28 @@ class PPItemInstanceUpdate(BaseModel):
     due_date: Optional[str] = None
     notes_markdown: Optional[str] = None
     acceptance_state: Optional[Dict[str, bool]] = None
+    # Individual criteria to set, leaving the others as they are
+    acceptance_state_patch: Optional[Dict[str, bool]] = None
     done_override: Optional[bool] = None
 
 class PPItemInstanceValidate(BaseModel):
     validated: bool
 
+class PPItemInstanceBatchEntry(PPItemInstanceUpdate):
+    item_id: str
+
+class PPItemInstanceBatchUpdate(BaseModel):
+    items: List[PPItemInstanceBatchEntry]
+
+class PPItemInstanceBatchValidate(BaseModel):
+    item_ids: List[str]
+    validated: bool
+
 class PPWorkshopUpdate(BaseModel):
     status: Optional[str] = None
     completion_criteria_state: Optional[Dict[str, bool]] = None
+    # Individual criteria to set, leaving the others as they are
+    completion_criteria_patch: Optional[Dict[str, bool]] = None
 
 class PPActionCreate(BaseModel):
     workshop_number: Optional[int] = None
@@ -318,33 +455,69 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+password_pool = BoundedExecutor("password-hash", max_workers=PASSWORD_HASH_WORKERS, max_pending=PASSWORD_HASH_MAX_PENDING)
+
+async def run_password_task(func, *args):
+    """Run a bcrypt call on password_pool; answers 503 when the pool is saturated"""
+    try:
+        return await password_pool.run(func, *args)
+    except PoolSaturated:
+        logger.warning(f"Password pool saturated: {password_pool.stats()}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service d'authentification saturé, veuillez réessayer",
+            headers={"Retry-After": "1"}
+        )
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire, "iat": datetime.now(timezone.utc), "iss": "bizdesk365"})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+token_cache = MemoryCache(maxsize=TOKEN_CACHE_SIZE, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> UserInDB:
+    """Resolve the user from the bearer token.
+
+    FastAPI caches dependency results per request, so endpoints that depend on both
+    get_current_user and get_tenant_id still resolve the token once; token_cache then
+    skips the signature check for tokens already verified by this process.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Identifiants invalides",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    token = credentials.credentials
+    user = token_cache.get(token)
+    if user is not None:
+        return user
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id = payload.get("sub")
         email = payload.get("email")
         tenant_id = payload.get("tenant_id")
         if user_id is None or tenant_id is None:
             raise credentials_exception
-        return UserInDB(id=user_id, email=email or "", tenant_id=tenant_id, roles=payload.get("roles", []))
+        user = UserInDB(id=user_id, email=email or "", tenant_id=tenant_id, roles=payload.get("roles", []))
     except JWTError:
         raise credentials_exception
+    # Only tokens that expire are cached, and never past their exp claim
+    if isinstance(payload.get("exp"), (int, float)):
+        remaining = payload["exp"] - time.time()
+        if remaining > 0:
+            token_cache.set(token, user, ttl=remaining)
+    return user
 
 def get_tenant_id(current_user: UserInDB = Depends(get_current_user)) -> str:
     return current_user.tenant_id
 
+def require_admin(current_user: UserInDB = Depends(get_current_user)) -> UserInDB:
+    if "admin" not in current_user.roles:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès réservé aux administrateurs")
+    return current_user
+
 # ============== Module Registry ==============
 
 MODULES: Dict[str, Module] = {
@@ -411,192 +584,356 @@ async def seed_database():
         "name": "Documentation Interne", "description": "Base documentaire SharePoint principale"
     })
     
-    await db.knowledge_documents.insert_many([
+    documents = [
         {"id": "doc-001", "tenant_id": demo_tenant_id, "source_id": source_id, "title": "Politique de Sécurité Informatique", "doc_type": "Politique", "url": "https://sharepoint.example.com/doc/001", "last_updated": "2024-01-10T14:30:00Z", "confidence_score": 0.92, "validated": True, "owner": "Jean Dupont"},
         {"id": "doc-002", "tenant_id": demo_tenant_id, "source_id": source_id, "title": "Procédure de Gestion des Incidents", "doc_type": "Procédure", "url": "https://sharepoint.example.com/doc/002", "last_updated": "2023-11-20T09:15:00Z", "confidence_score": 0.75, "validated": True, "owner": "Marie Martin"},
         {"id": "doc-003", "tenant_id": demo_tenant_id, "source_id": source_id, "title": "Guide d'Utilisation IA", "doc_type": "Guide", "url": "https://sharepoint.example.com/doc/003", "last_updated": "2024-01-05T16:45:00Z", "confidence_score": 0.88, "validated": False, "owner": "Pierre Durand"},
         {"id": "doc-004", "tenant_id": demo_tenant_id, "source_id": source_id, "title": "Charte Éthique IA", "doc_type": "Charte", "url": "https://sharepoint.example.com/doc/004", "last_updated": "2023-08-01T11:00:00Z", "confidence_score": 0.55, "validated": False, "owner": "Sophie Bernard"},
-    ])
+    ]
+    # Copies: insert_many adds an _id to each document it is given
+    await db.knowledge_documents.insert_many([dict(d) for d in documents])
+    await iqi.apply_document_changes(db, demo_tenant_id, [(None, d) for d in documents])
     
-    await db.ai_usage_logs.insert_many([
+    await usage_rollups.record_usage_logs(db, [
         {"tenant_id": demo_tenant_id, "document_id": "doc-001", "decision": "authorized", "checked_at": "2024-01-15T08:00:00Z", "intent": "Analyse de conformité"},
         {"tenant_id": demo_tenant_id, "document_id": "doc-002", "decision": "assisted", "checked_at": "2024-01-15T09:00:00Z", "intent": "Recherche procédure"},
         {"tenant_id": demo_tenant_id, "document_id": "doc-003", "decision": "authorized", "checked_at": "2024-01-15T10:00:00Z", "intent": "Formation utilisateur"},
         {"tenant_id": demo_tenant_id, "document_id": "doc-004", "decision": "forbidden", "checked_at": "2024-01-15T11:00:00Z", "intent": "Rédaction rapport"},
     ])
     
+    password_hash = await run_password_task(get_password_hash, "demo")
     await db.users.insert_one({
         "id": "user-001", "username": "demo@bizdesk365.local", "email": "demo@bizdesk365.local",
-        "password_hash": pwd_context.hash("demo"), "tenant_id": demo_tenant_id, "roles": ["admin", "user", "PlatformOwner"]
+        "password_hash": password_hash, "tenant_id": demo_tenant_id, "roles": ["admin", "user", "PlatformOwner"]
     })
     
     # Seed workshop and item definitions (global)
     existing_workshops = await db.pp_workshop_definitions.find_one()
     if not existing_workshops:
-        await db.pp_workshop_definitions.insert_many(WORKSHOP_DEFINITIONS)
-        await db.pp_item_definitions.insert_many(ITEM_DEFINITIONS)
+        # Insert copies: insert_many adds an _id to each document it is given
+        await db.pp_workshop_definitions.insert_many([dict(d) for d in WORKSHOP_DEFINITIONS])
+        await db.pp_item_definitions.insert_many([dict(d) for d in ITEM_DEFINITIONS])
         logger.info("Power Platform definitions seeded")
     
     logger.info("Database seeded successfully")
 
 # ============== Helper Functions for Power Platform ==============
 
+program_cache = make_cache("pp_programs", maxsize=PROGRAM_CACHE_MAX_TENANTS, ttl=PROGRAM_CACHE_TTL_SECONDS)
+_program_locks: Dict[str, asyncio.Lock] = {}
+
 async def get_or_create_program(tenant_id: str, user_id: str) -> dict:
     """Get or create a governance program for the tenant"""
-    program = await db.pp_programs.find_one({"tenant_id": tenant_id}, {"_id": 0})
-    
-    if not program:
-        now = datetime.now(timezone.utc).isoformat()
-        program = {
-            "id": str(uuid.uuid4()),
-            "tenant_id": tenant_id,
-            "name": "Programme de Gouvernance Power Platform",
-            "status": "not_started",
-            "start_date": None,
-            "end_date": None,
-            "created_by": user_id,
-            "created_at": now,
-            "updated_at": now
-        }
-        await db.pp_programs.insert_one(program)
-        
-        # Create workshop instances
-        for ws_def in WORKSHOP_DEFINITIONS:
-            criteria_state = {c: False for c in ws_def["completion_criteria"]}
-            workshop = {
-                "id": str(uuid.uuid4()),
-                "program_id": program["id"],
-                "workshop_number": ws_def["workshop_number"],
-                "status": "not_started",
-                "completion_criteria_state": criteria_state,
-                "started_at": None,
-                "completed_at": None
-            }
-            await db.pp_workshops.insert_one(workshop)
-        
-        # Create item instances
-        for item_def in ITEM_DEFINITIONS:
-            acceptance_state = {c: False for c in item_def["acceptance_criteria"]}
-            item = {
-                "id": str(uuid.uuid4()),
-                "program_id": program["id"],
-                "item_id": item_def["item_id"],
-                "workshop_number": item_def["workshop_number"],
-                "status": "not_started",
-                "owner_user_id": None,
-                "due_date": None,
-                "notes_markdown": None,
-                "acceptance_state": acceptance_state,
-                "done_override": False,
-                "validated_by": None,
-                "validated_at": None,
-                "created_at": now,
-                "updated_at": now
-            }
-            await db.pp_item_instances.insert_one(item)
-        
-        logger.info(f"Created new program for tenant {tenant_id}")
-    
+    program = program_cache.get(tenant_id)
+    if program:
+        return program
+    
+    # Serialize first requests per tenant so only one of them bootstraps the program
+    lock = _program_locks.setdefault(tenant_id, asyncio.Lock())
+    async with lock:
+        program = program_cache.get(tenant_id)
+        if not program:
+            program = await db.pp_programs.find_one({"tenant_id": tenant_id}, {"_id": 0})
+            if not program:
+                program = await create_program(tenant_id, user_id)
+            program_cache.set(tenant_id, program)
+    # The program exists now, so later requests only read it and need no lock
+    if _program_locks.get(tenant_id) is lock:
+        del _program_locks[tenant_id]
     return program
 
-async def calculate_pp_kpis(program_id: str) -> dict:
-    """Calculate KPIs for a program"""
-    now = datetime.now(timezone.utc)
-    
-    # Get workshops
-    workshops = await db.pp_workshops.find({"program_id": program_id}, {"_id": 0}).to_list(100)
-    workshops_completed = sum(1 for w in workshops if w["status"] == "completed")
-    
-    # Get items
-    items = await db.pp_item_instances.find({"program_id": program_id}, {"_id": 0}).to_list(1000)
-    items_total = len(items)
-    items_done = sum(1 for i in items if i["status"] == "done")
-    items_validated = sum(1 for i in items if i["status"] == "validated")
-    items_in_progress = sum(1 for i in items if i["status"] == "in_progress")
-    items_not_started = sum(1 for i in items if i["status"] == "not_started")
-    
-    # Get actions
-    actions = await db.pp_actions.find({"program_id": program_id}, {"_id": 0}).to_list(10000)
-    open_actions = [a for a in actions if a["status"] in ["open", "in_progress"]]
-    actions_open_count = len(open_actions)
-    
-    # Calculate ageing
-    ageing_days = []
-    for action in open_actions:
-        try:
-            created = datetime.fromisoformat(action["created_at"].replace("Z", "+00:00"))
-            days = (now - created).days
-            ageing_days.append(days)
-        except:
-            pass
-    
-    actions_ageing_avg_days = sum(ageing_days) / len(ageing_days) if ageing_days else 0
-    actions_ageing_max_days = max(ageing_days) if ageing_days else 0
+def build_program_documents(tenant_id: str, user_id: str):
+    """Build a program with its workshop and item instances in memory"""
+    now = datetime.now(timezone.utc).isoformat()
+    program = {
+        "id": str(uuid.uuid4()),
+        "tenant_id": tenant_id,
+        "name": "Programme de Gouvernance Power Platform",
+        "status": "not_started",
+        "start_date": None,
+        "end_date": None,
+        "created_by": user_id,
+        "created_at": now,
+        "updated_at": now
+    }
     
-    # Get decisions and evidence
-    decisions = await db.pp_decisions.find({"program_id": program_id}, {"_id": 0}).to_list(10000)
-    evidence = await db.pp_evidence.find({"program_id": program_id}, {"_id": 0}).to_list(10000)
+    workshops = [{
+        "id": str(uuid.uuid4()),
+        "program_id": program["id"],
+        "workshop_number": ws_def["workshop_number"],
+        "status": "not_started",
+        "completion_criteria_state": {c: False for c in ws_def["completion_criteria"]},
+        "started_at": None,
+        "completed_at": None
+    } for ws_def in WORKSHOP_DEFINITIONS]
+    
+    items = [{
+        "id": str(uuid.uuid4()),
+        "program_id": program["id"],
+        "item_id": item_def["item_id"],
+        "workshop_number": item_def["workshop_number"],
+        "status": "not_started",
+        "owner_user_id": None,
+        "due_date": None,
+        "notes_markdown": None,
+        "acceptance_state": {c: False for c in item_def["acceptance_criteria"]},
+        "done_override": False,
+        "validated_by": None,
+        "validated_at": None,
+        "created_at": now,
+        "updated_at": now
+    } for item_def in ITEM_DEFINITIONS]
     
-    # Calculate ownership missing
-    items_without_owner = sum(1 for i in items if not i.get("owner_user_id"))
-    actions_without_owner = sum(1 for a in open_actions if not a.get("owner_user_id"))
-    total_items_and_actions = items_total + len(open_actions)
-    ownership_missing_pct = ((items_without_owner + actions_without_owner) / total_items_and_actions * 100) if total_items_and_actions > 0 else 0
+    for workshop in workshops:
+        workshop.update(workshop_counters.initial_counters(workshop, items))
     
-    return {
-        "workshop_completion_pct": round(workshops_completed / 10 * 100, 1),
-        "workshops_completed": workshops_completed,
-        "total_workshops": 10,
-        "items_total": items_total,
-        "items_done": items_done,
-        "items_validated": items_validated,
-        "items_in_progress": items_in_progress,
-        "items_not_started": items_not_started,
-        "actions_open_count": actions_open_count,
-        "actions_ageing_avg_days": round(actions_ageing_avg_days, 1),
-        "actions_ageing_max_days": actions_ageing_max_days,
-        "decisions_count": len(decisions),
-        "evidence_count": len(evidence),
-        "ownership_missing_pct": round(ownership_missing_pct, 1)
-    }
+    return program, workshops, items
 
-async def check_workshop_completion(program_id: str, workshop_number: int):
-    """Check if workshop should be marked as completed"""
-    workshop = await db.pp_workshops.find_one(
-        {"program_id": program_id, "workshop_number": workshop_number},
-        {"_id": 0}
+# None until the first bootstrap finds out whether the deployment supports transactions
+_transactions_supported: Optional[bool] = None
+
+def _transactions_unavailable(exc: Exception) -> bool:
+    # IllegalOperation on a standalone mongod; NotImplementedError from in-process stand-ins
+    return isinstance(exc, NotImplementedError) or (isinstance(exc, OperationFailure) and exc.code == 20)
+
+async def _insert_program_documents(program: dict, workshops: List[dict], items: List[dict], session=None):
+    # The program goes in last: once it is visible, its workshops and items are too
+    await db.pp_workshops.insert_many(workshops, ordered=True, session=session)
+    await db.pp_item_instances.insert_many(items, ordered=True, session=session)
+    await db.pp_program_stats.insert_one(pp_stats.initial_program_stats(program["id"], workshops, items), session=session)
+    await db.pp_programs.insert_one(program, session=session)
+    program.pop("_id", None)
+
+async def _delete_program_documents(program_id: str):
+    await asyncio.gather(
+        db.pp_workshops.delete_many({"program_id": program_id}),
+        db.pp_item_instances.delete_many({"program_id": program_id}),
+        db.pp_program_stats.delete_many({"program_id": program_id})
     )
-    if not workshop:
-        return
-    
-    # Check all completion criteria are checked
-    criteria_all_checked = all(workshop.get("completion_criteria_state", {}).values())
-    
-    # Check all mandatory items are done or validated
-    items = await db.pp_item_instances.find(
-        {"program_id": program_id, "workshop_number": workshop_number},
-        {"_id": 0}
-    ).to_list(100)
-    
-    # Get item definitions to check mandatory status
-    item_defs = {item["item_id"]: item for item in ITEM_DEFINITIONS if item["workshop_number"] == workshop_number}
+
+async def write_program_documents(program: dict, workshops: List[dict], items: List[dict]):
+    """Write a bootstrapped program so that it exists fully or not at all.
+
+    Uses a transaction when the deployment supports one, otherwise removes the
+    partial write on failure.
+    """
+    global _transactions_supported
+    if _transactions_supported is not False:
+        try:
+            async with await client.start_session() as session:
+                async with session.start_transaction():
+                    await _insert_program_documents(program, workshops, items, session=session)
+            _transactions_supported = True
+            return
+        except (OperationFailure, NotImplementedError) as e:
+            if not _transactions_unavailable(e):
+                raise
+            _transactions_supported = False
+            logger.info("MongoDB transactions unavailable, bootstrapping programs without a session")
     
-    mandatory_items_complete = True
-    for item in items:
-        item_def = item_defs.get(item["item_id"])
-        if item_def and item_def["status_requirement"] == "OBLIGATOIRE":
-            if item["status"] not in ["done", "validated"]:
-                mandatory_items_complete = False
-                break
-    
-    if criteria_all_checked and mandatory_items_complete:
-        await db.pp_workshops.update_one(
-            {"program_id": program_id, "workshop_number": workshop_number},
-            {"$set": {
-                "status": "completed",
-                "completed_at": datetime.now(timezone.utc).isoformat()
-            }}
+    try:
+        await _insert_program_documents(program, workshops, items)
+    except Exception:
+        await _delete_program_documents(program["id"])
+        raise
+
+async def create_program(tenant_id: str, user_id: str, max_attempts: int = 3) -> dict:
+    """Create the program with its workshop and item instances.
+
+    The unique index on pp_programs.tenant_id settles races between workers: the loser
+    gets a DuplicateKeyError (or a transient transaction error, and retries into one)
+    and returns the program that won.
+    """
+    for attempt in range(max_attempts):
+        program, workshops, items = build_program_documents(tenant_id, user_id)
+        try:
+            await write_program_documents(program, workshops, items)
+        except DuplicateKeyError:
+            return await db.pp_programs.find_one({"tenant_id": tenant_id}, {"_id": 0})
+        except OperationFailure as e:
+            if not e.has_error_label("TransientTransactionError") or attempt == max_attempts - 1:
+                raise
+            continue
+        logger.info(f"Created new program for tenant {tenant_id}")
+        return program
+
+async def calculate_pp_kpis(program_id: str) -> dict:
+    """Calculate KPIs for a program from its pp_program_stats rollup"""
+    stats = await pp_stats.get_program_stats(db, program_id)
+    return pp_stats.kpis_from_stats(stats, total_workshops=len(WORKSHOP_DEFINITIONS))
+
+async def aggregate_workshop_progress(program_id: str) -> Dict[int, dict]:
+    """Per-workshop item, open action and decision counts for a program.
+
+    One $group per collection, run concurrently, instead of three queries per workshop.
+    """
+    items_pipeline = [
+        {"$match": {"program_id": program_id}},
+        {"$group": {
+            "_id": "$workshop_number",
+            "items_total": {"$sum": 1},
+            "items_done": {"$sum": {"$cond": [{"$in": ["$status", ["done", "validated"]]}, 1, 0]}}
+        }}
+    ]
+    actions_pipeline = [
+        {"$match": {"program_id": program_id, "status": {"$in": ["open", "in_progress"]}}},
+        {"$group": {"_id": "$workshop_number", "open_actions_count": {"$sum": 1}}}
+    ]
+    decisions_pipeline = [
+        {"$match": {"program_id": program_id}},
+        {"$group": {"_id": "$workshop_number", "decisions_count": {"$sum": 1}}}
+    ]
+    item_rows, action_rows, decision_rows = await asyncio.gather(
+        db.pp_item_instances.aggregate(items_pipeline).to_list(None),
+        db.pp_actions.aggregate(actions_pipeline).to_list(None),
+        db.pp_decisions.aggregate(decisions_pipeline).to_list(None)
+    )
+
+    progress: Dict[int, dict] = {}
+    for rows in (item_rows, action_rows, decision_rows):
+        for row in rows:
+            if row["_id"] is None:
+                continue
+            counts = progress.setdefault(row["_id"], {"items_total": 0, "items_done": 0, "open_actions_count": 0, "decisions_count": 0})
+            counts.update({k: v for k, v in row.items() if k != "_id"})
+    return progress
+
+# write_token marks the items written by one apply_item_updates call; it is not part of the API
+ITEM_PROJECTION = {"_id": 0, "write_token": 0}
+
+async def apply_item_update(program_id: str, item_id: str, update_data: dict) -> Optional[dict]:
+    """$set fields on an item instance and follow up on stats and the workshop counters.
+
+    One find_one_and_update returns the item as it was: its status and owner give the stats
+    delta, and since the update only sets fields, the item as written is that state with
+    update_data applied. Returns the updated item, or None when it does not exist.
+    """
+    before = await db.pp_item_instances.find_one_and_update(
+        {"program_id": program_id, "item_id": item_id},
+        {"$set": update_data},
+        projection=ITEM_PROJECTION
+    )
+    if not before:
+        return None
+    item = apply_set(before, update_data)
+    await pp_stats.apply_stats_delta(db, program_id, pp_stats.item_delta(before, item))
+    await workshop_counters.apply_item_change(db, program_id, before, item)
+    return item
+
+async def apply_item_updates(program_id: str, updates: Dict[str, dict]) -> Tuple[List[dict], List[str]]:
+    """$set fields on many item instances: one read of their current state, one bulk_write,
+    one stats delta and one counter pass per affected workshop.
+
+    Each write is conditional on the status and owner it was computed from and stamps the
+    items with a token of this call. Items left without the token were not matched, having
+    changed concurrently in between, and go through apply_item_update instead.
+    Returns (updated items in request order, ids of items that do not exist).
+    """
+    befores = {
+        item["item_id"]: item for item in await db.pp_item_instances.find(
+            {"program_id": program_id, "item_id": {"$in": list(updates)}}, ITEM_PROJECTION
+        ).to_list(None)
+    }
+    not_found = [item_id for item_id in updates if item_id not in befores]
+    found = [item_id for item_id in updates if item_id in befores]
+    if not found:
+        return [], not_found
+    
+    write_token = str(uuid.uuid4())
+    result = await db.pp_item_instances.bulk_write([
+        UpdateOne(
+            {"program_id": program_id, "item_id": item_id,
+             "status": befores[item_id].get("status"), "owner_user_id": befores[item_id].get("owner_user_id")},
+            {"$set": {**updates[item_id], "write_token": write_token}}
         )
+        for item_id in found
+    ], ordered=False)
+    
+    raced = set()
+    if result.matched_count < len(found):
+        # Only batch writes set write_token, so items written again since by other updates keep ours
+        applied = {
+            item["item_id"] for item in await db.pp_item_instances.find(
+                {"program_id": program_id, "item_id": {"$in": found}, "write_token": write_token},
+                {"_id": 0, "item_id": 1}
+            ).to_list(None)
+        }
+        raced = set(found) - applied
+    
+    items: Dict[str, dict] = {}
+    changes = []
+    for item_id in found:
+        if item_id not in raced:
+            items[item_id] = apply_set(befores[item_id], updates[item_id])
+            changes.append((befores[item_id], items[item_id]))
+    stats_delta: Dict[str, float] = {}
+    for before, after in changes:
+        for field, amount in pp_stats.item_delta(before, after).items():
+            stats_delta[field] = stats_delta.get(field, 0) + amount
+    await pp_stats.apply_stats_delta(db, program_id, {k: v for k, v in stats_delta.items() if v})
+    await workshop_counters.apply_item_changes(db, program_id, changes)
+    
+    for item_id in raced:
+        item = await apply_item_update(program_id, item_id, updates[item_id])
+        if item:
+            items[item_id] = item
+        else:
+            not_found.append(item_id)
+    return [items[item_id] for item_id in found if item_id in items], not_found
+
+async def _write_coalesced_item(key: Tuple[str, str], update_data: dict) -> Optional[dict]:
+    program_id, item_id = key
+    return await apply_item_update(program_id, item_id, update_data)
+
+item_coalescer = WriteCoalescer(window=PP_ITEM_COALESCE_MS / 1000, write=_write_coalesced_item)
+
+def add_ageing_days(actions: List[dict]) -> List[dict]:
+    """Set ageing_days (days since creation) on each action"""
+    now = datetime.now(timezone.utc)
+    for action in actions:
+        try:
+            created = datetime.fromisoformat(action["created_at"].replace("Z", "+00:00"))
+            action["ageing_days"] = (now - created).days
+        except:
+            action["ageing_days"] = 0
+    return actions
+
+async def paginated_listing(collection, query: dict, sort_field: str, limit: Optional[int], cursor: Optional[str]) -> dict:
+    """Keyset page of a listing, newest first: {"items": [...], "next_cursor": str | None}"""
+    try:
+        items, next_cursor = await fetch_page(collection, query, sort_field, limit or DEFAULT_PAGE_SIZE, cursor)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+    return {"items": items, "next_cursor": next_cursor}
+
+# ============== Static Responses ==============
+
+def encode_static_json(payload: Any) -> Tuple[bytes, str]:
+    """Serialize a payload that never changes during the process lifetime, with its strong ETag"""
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return body, '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison: a W/ prefix on the client's tag does not matter
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def static_json_response(request: Request, encoded: Tuple[bytes, str]) -> Response:
+    body, etag = encoded
+    headers = {"ETag": etag, "Cache-Control": "public, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+WORKSHOP_DEFINITIONS_RESPONSE = encode_static_json(WORKSHOP_DEFINITIONS)
+ITEM_DEFINITIONS_RESPONSE = encode_static_json(ITEM_DEFINITIONS)
+ITEM_DEFINITIONS_RESPONSES_BY_WORKSHOP = {
+    number: encode_static_json(list(get_items_for_workshop(number))) for number in WORKSHOP_DEFINITIONS_BY_NUMBER
+}
+EMPTY_LIST_RESPONSE = encode_static_json([])
 
 # ============== Routes ==============
 
@@ -607,7 +944,7 @@ async def health_check():
 @api_router.post("/auth/login", response_model=Token)
 async def login(request: LoginRequest):
     user = await db.users.find_one({"email": request.email}, {"_id": 0})
-    if not user or not verify_password(request.password, user.get("password_hash", "")):
+    if not user or not await run_password_task(verify_password, request.password, user.get("password_hash", "")):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Email ou mot de passe incorrect")
     access_token = create_access_token(data={"sub": user["id"], "email": user["email"], "tenant_id": user["tenant_id"], "roles": user.get("roles", [])})
     return Token(access_token=access_token, token_type="bearer")
@@ -616,6 +953,23 @@ async def login(request: LoginRequest):
 async def get_current_user_info(current_user: UserInDB = Depends(get_current_user)):
     return UserResponse(id=current_user.id, email=current_user.email, tenant_id=current_user.tenant_id, roles=current_user.roles)
 
+@api_router.get("/admin/metrics")
+async def get_admin_metrics(current_user: UserInDB = Depends(require_admin)):
+    """Runtime counters for the in-process pools and caches"""
+    return {
+        "password_pool": password_pool.stats(),
+        "ai_policy_cache": policy_cache.stats(),
+        "ai_policy_simulation": score_snapshots.stats(),
+        "ai_usage_log_writer": usage_log_writer.stats(),
+        "pp_item_coalescer": item_coalescer.stats(),
+        "mongo_commands": command_counter.stats()
+    }
+
+@api_router.get("/admin/indexes")
+async def get_admin_indexes(current_user: UserInDB = Depends(require_admin)):
+    """Registered indexes missing from the database, unused indexes and unregistered ones"""
+    return await index_report(db)
+
 @api_router.get("/modules", response_model=List[Module])
 async def get_modules(current_user: UserInDB = Depends(get_current_user)):
     return get_enabled_modules(current_user.tenant_id)
@@ -648,30 +1002,12 @@ async def get_maturity_score(tenant_id: str = Depends(get_tenant_id)):
 # Enterprise Brain endpoints
 @api_router.get("/enterprise-brain/quality", response_model=QualityResponse)
 async def get_quality_metrics(tenant_id: str = Depends(get_tenant_id)):
-    documents = await db.knowledge_documents.find({"tenant_id": tenant_id}, {"_id": 0}).to_list(1000)
-    if not documents:
-        return QualityResponse(iqi_global=0.0, evidences={"total_documents": 0, "validated_count": 0, "avg_confidence": 0.0, "freshness_score": 0.0})
-    
-    total = len(documents)
-    validated = sum(1 for d in documents if d.get("validated", False))
-    avg_confidence = sum(d.get("confidence_score", 0) for d in documents) / total
-    
-    now = datetime.now(timezone.utc)
-    fresh_count = 0
-    for doc in documents:
-        try:
-            last_updated = datetime.fromisoformat(doc["last_updated"].replace("Z", "+00:00"))
-            if (now - last_updated).days < 90: fresh_count += 1
-        except: pass
-    
-    freshness_score = fresh_count / total if total > 0 else 0
-    validation_score = validated / total if total > 0 else 0
-    iqi_global = (validation_score * 0.3) + (avg_confidence * 0.5) + (freshness_score * 0.2)
-    
-    return QualityResponse(iqi_global=round(iqi_global, 2), evidences={
-        "total_documents": total, "validated_count": validated, "validation_rate": round(validation_score * 100, 1),
-        "avg_confidence": round(avg_confidence * 100, 1), "freshness_score": round(freshness_score * 100, 1), "fresh_documents": fresh_count
-    })
+    return QualityResponse(**await iqi.get_quality(db, tenant_id))
+
+@api_router.get("/enterprise-brain/quality/history", response_model=List[IQIHistoryPoint])
+async def get_quality_history(days: int = Query(90, ge=1, le=730), tenant_id: str = Depends(get_tenant_id)):
+    """Daily IQI recorded by the sweep, oldest first"""
+    return await iqi.get_history(db, tenant_id, days)
 
 @api_router.get("/enterprise-brain/documents", response_model=List[Document])
 async def get_documents(tenant_id: str = Depends(get_tenant_id)):
@@ -684,14 +1020,17 @@ async def get_document(document_id: str, tenant_id: str = Depends(get_tenant_id)
     if not document: raise HTTPException(status_code=404, detail="Document non trouvé")
     return document
 
-@api_router.get("/ai/usage/document/{document_id}", response_model=AIUsageResponse)
-async def get_ai_usage_for_document(document_id: str, tenant_id: str = Depends(get_tenant_id)):
-    document = await db.knowledge_documents.find_one({"id": document_id, "tenant_id": tenant_id}, {"_id": 0})
-    if not document: raise HTTPException(status_code=404, detail="Document non trouvé")
-    
-    policy = await db.ai_usage_policies.find_one({"tenant_id": tenant_id}, {"_id": 0})
-    if not policy: policy = {"min_iqi_authorized": 0.80, "min_iqi_assisted": 0.60}
-    
+policy_cache = PolicyCache(poll_interval=AI_POLICY_POLL_SECONDS, ttl=AI_POLICY_CACHE_TTL_SECONDS)
+score_snapshots = ScoreSnapshotCache(ttl=AI_POLICY_SIMULATION_TTL_SECONDS)
+usage_log_writer = UsageLogWriter(
+    batch_size=AI_USAGE_LOG_BATCH_SIZE,
+    flush_interval=AI_USAGE_LOG_FLUSH_MS / 1000,
+    max_queue=AI_USAGE_LOG_QUEUE_SIZE,
+    put_timeout=AI_USAGE_LOG_PUT_TIMEOUT_MS / 1000
+)
+
+def decide_ai_usage(document: dict, policy: dict) -> AIUsageResponse:
+    """Apply the tenant's IQI thresholds to one document"""
     iqi_score = document.get("confidence_score", 0)
     is_validated = document.get("validated", False)
     
@@ -702,20 +1041,113 @@ async def get_ai_usage_for_document(document_id: str, tenant_id: str = Depends(g
     else:
         usage_status, reason = "forbidden", "Score IQI insuffisant ou document non validé"
     
-    return AIUsageResponse(document_id=document_id, document_title=document.get("title", ""), usage_status=usage_status, iqi_score=iqi_score, reason=reason)
+    return AIUsageResponse(document_id=document["id"], document_title=document.get("title", ""), usage_status=usage_status, iqi_score=iqi_score, reason=reason)
+
+async def get_ai_policy_thresholds(tenant_id: str) -> dict:
+    return await policy_cache.get(db, tenant_id)
+
+@api_router.patch("/enterprise-brain/document/{document_id}")
+async def update_document(document_id: str, update: DocumentUpdate, tenant_id: str = Depends(get_tenant_id)):
+    """Validate or re-score a document; the IQI snapshot follows the change"""
+    update_data = update.model_dump(exclude_none=True)
+    if not update_data:
+        raise HTTPException(status_code=400, detail="Aucune modification")
+    if "confidence_score" in update_data and not (0 <= update_data["confidence_score"] <= 1):
+        raise HTTPException(status_code=400, detail="Le score de confiance doit être compris entre 0 et 1")
+    before = await db.knowledge_documents.find_one_and_update(
+        {"id": document_id, "tenant_id": tenant_id},
+        {"$set": update_data},
+        projection={"_id": 0}
+    )
+    if not before: raise HTTPException(status_code=404, detail="Document non trouvé")
+    after = {**before, **update_data}
+    await iqi.apply_document_changes(db, tenant_id, [(before, after)])
+    return after
+
+@api_router.post("/enterprise-brain/sources/{source_id}/documents/import")
+async def import_documents(
+    source_id: str,
+    request: Request,
+    format: Optional[str] = None,
+    batch_size: int = Query(INGEST_DEFAULT_BATCH_SIZE, ge=1, le=INGEST_MAX_BATCH_SIZE),
+    current_user: UserInDB = Depends(require_admin)
+):
+    """Upsert a source's documents from a streamed NDJSON or CSV inventory; reports per-batch throughput and rejects"""
+    fmt = format or ("csv" if request.headers.get("content-type", "").startswith("text/csv") else "ndjson")
+    if fmt not in INGEST_FORMATS:
+        raise HTTPException(status_code=400, detail="Format d'import non supporté (ndjson ou csv)")
+    if not await db.knowledge_sources.find_one({"id": source_id, "tenant_id": current_user.tenant_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Source non trouvée")
+    return await ingest_documents(db, current_user.tenant_id, source_id, request.stream(), fmt, batch_size)
+
+@api_router.post("/enterprise-brain/rescore")
+async def rescore_documents(current_user: UserInDB = Depends(require_admin)):
+    """Recompute every document's iqi_score and usage_status for the tenant's current thresholds"""
+    policy = await get_ai_policy_thresholds(current_user.tenant_id)
+    return await rescore_tenant(db, current_user.tenant_id, policy)
+
+@api_router.get("/ai/usage/document/{document_id}", response_model=AIUsageResponse)
+async def get_ai_usage_for_document(document_id: str, tenant_id: str = Depends(get_tenant_id)):
+    document = await db.knowledge_documents.find_one({"id": document_id, "tenant_id": tenant_id}, {"_id": 0})
+    if not document: raise HTTPException(status_code=404, detail="Document non trouvé")
+    return decide_ai_usage(document, await get_ai_policy_thresholds(tenant_id))
+
+@api_router.post("/ai/usage/documents", response_model=AIUsageBatchResponse)
+async def get_ai_usage_for_documents(request: AIUsageBatchRequest, tenant_id: str = Depends(get_tenant_id)):
+    """Authorize many documents at once: one $in query and one policy read; the checks are logged through the buffered writer"""
+    document_ids = list(dict.fromkeys(request.document_ids))
+    if len(document_ids) > MAX_USAGE_BATCH_DOCUMENTS:
+        raise HTTPException(status_code=400, detail=f"Au plus {MAX_USAGE_BATCH_DOCUMENTS} documents par requête")
+    
+    documents, policy = await asyncio.gather(
+        db.knowledge_documents.find(
+            {"tenant_id": tenant_id, "id": {"$in": document_ids}},
+            {"_id": 0, "id": 1, "title": 1, "confidence_score": 1, "validated": 1}
+        ).to_list(None),
+        get_ai_policy_thresholds(tenant_id)
+    )
+    by_id = {d["id"]: d for d in documents}
+    results = [decide_ai_usage(by_id[doc_id], policy) for doc_id in document_ids if doc_id in by_id]
+    
+    checked_at = usage_rollups.format_timestamp(datetime.now(timezone.utc))
+    await usage_log_writer.submit([
+        {"tenant_id": tenant_id, "document_id": r.document_id, "decision": r.usage_status, "checked_at": checked_at, "intent": request.intent}
+        for r in results
+    ])
+    
+    return AIUsageBatchResponse(results=results, not_found=[doc_id for doc_id in document_ids if doc_id not in by_id])
 
 # AI Governance endpoints
+def usage_log_query(tenant_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> dict:
+    """Filter on a tenant's usage logs, optionally restricted to [start, end)"""
+    query = {"tenant_id": tenant_id}
+    window = {}
+    if start:
+        window["$gte"] = usage_rollups.format_timestamp(start)
+    if end:
+        window["$lt"] = usage_rollups.format_timestamp(end)
+    if window:
+        query["checked_at"] = window
+    return query
+
 @api_router.get("/governance/ai/summary", response_model=GovernanceSummary)
-async def get_governance_summary(tenant_id: str = Depends(get_tenant_id)):
-    usage_logs = await db.ai_usage_logs.find({"tenant_id": tenant_id}, {"_id": 0}).to_list(10000)
-    total = len(usage_logs)
+async def get_governance_summary(
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    tenant_id: str = Depends(get_tenant_id)
+):
+    counts = {row["_id"]: row["count"] async for row in db.ai_usage_logs.aggregate([
+        {"$match": usage_log_query(tenant_id, start, end)},
+        {"$group": {"_id": "$decision", "count": {"$sum": 1}}}
+    ])}
+    total = sum(counts.values())
     
     if total == 0:
         return GovernanceSummary(authorized_percentage=0, assisted_percentage=0, forbidden_percentage=0, total_usages=0, critical_actions=[], traceability={"logged": 0, "audited": 0, "anomalies": 0})
     
-    authorized = sum(1 for log in usage_logs if log.get("decision") == "authorized")
-    assisted = sum(1 for log in usage_logs if log.get("decision") == "assisted")
-    forbidden = sum(1 for log in usage_logs if log.get("decision") == "forbidden")
+    authorized = counts.get("authorized", 0)
+    assisted = counts.get("assisted", 0)
+    forbidden = counts.get("forbidden", 0)
     
     critical_actions = [
         CriticalAction(id="action-001", title="Revalider les documents avec IQI < 0.6", priority="high", status="pending"),
@@ -732,6 +1164,18 @@ async def get_governance_summary(tenant_id: str = Depends(get_tenant_id)):
         traceability={"logged": total, "audited": int(total * 0.85), "anomalies": forbidden}
     )
 
+@api_router.get("/governance/ai/timeseries", response_model=GovernanceTimeseries)
+async def get_governance_timeseries(
+    granularity: str = Query("day", pattern="^(hour|day)$"),
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    document_id: Optional[str] = None,
+    tenant_id: str = Depends(get_tenant_id)
+):
+    """Decision counts per hour or day, read from the ai_usage_rollups buckets"""
+    buckets = await usage_rollups.timeseries(db, tenant_id, granularity, start, end, document_id)
+    return GovernanceTimeseries(granularity=granularity, buckets=buckets)
+
 # Settings endpoints
 @api_router.get("/settings/iso", response_model=List[ISOProfile])
 async def get_iso_profiles(tenant_id: str = Depends(get_tenant_id)):
@@ -757,9 +1201,30 @@ async def update_ai_policy(policy: AIPolicy, tenant_id: str = Depends(get_tenant
         raise HTTPException(status_code=400, detail="Le seuil autorisé doit être supérieur au seuil assisté")
     if not (0 <= policy.min_iqi_authorized <= 1) or not (0 <= policy.min_iqi_assisted <= 1):
         raise HTTPException(status_code=400, detail="Les seuils doivent être compris entre 0 et 1")
-    await db.ai_usage_policies.update_one({"tenant_id": tenant_id}, {"$set": {"min_iqi_authorized": policy.min_iqi_authorized, "min_iqi_assisted": policy.min_iqi_assisted}}, upsert=True)
+    await policy_cache.update(db, tenant_id, policy.min_iqi_authorized, policy.min_iqi_assisted)
     return policy
 
+@api_router.post("/settings/ai-policy/simulate", response_model=AIPolicySimulationResponse)
+async def simulate_ai_policy(request: AIPolicySimulationRequest, tenant_id: str = Depends(get_tenant_id)):
+    """Document counts per usage status under candidate thresholds, and how many would move from the current policy"""
+    for policy in request.candidates:
+        if policy.min_iqi_authorized < policy.min_iqi_assisted:
+            raise HTTPException(status_code=400, detail="Le seuil autorisé doit être supérieur au seuil assisté")
+    candidates = [(p.min_iqi_authorized, p.min_iqi_assisted) for p in request.candidates]
+    # Checked before building the grid, whose size is the product of its axes
+    grid_count = grid_size(request.grid.min_iqi_authorized, request.grid.min_iqi_assisted) if request.grid else 0
+    if len(candidates) + grid_count > MAX_SIMULATED_POLICIES:
+        raise HTTPException(status_code=400, detail=f"Au plus {MAX_SIMULATED_POLICIES} politiques par simulation")
+    if request.grid:
+        candidates += grid_policies(request.grid.min_iqi_authorized, request.grid.min_iqi_assisted)
+    if not candidates:
+        raise HTTPException(status_code=400, detail="Aucune politique à simuler")
+    if any(not (0 <= threshold <= 1) for candidate in candidates for threshold in candidate):
+        raise HTTPException(status_code=400, detail="Les seuils doivent être compris entre 0 et 1")
+    
+    current = await get_ai_policy_thresholds(tenant_id)
+    return await simulate_policies(db, score_snapshots, tenant_id, current, candidates)
+
 # ============== Power Platform Governance Endpoints ==============
 
 @api_router.get("/power-platform/program")
@@ -792,33 +1257,16 @@ async def get_pp_workshops(
         {"program_id": program["id"]},
         {"_id": 0}
     ).sort("workshop_number", 1).to_list(100)
-    
+    progress = await aggregate_workshop_progress(program["id"])
+
     # Enrich with definitions and item progress
     result = []
     for ws in workshops:
-        ws_def = next((d for d in WORKSHOP_DEFINITIONS if d["workshop_number"] == ws["workshop_number"]), None)
-        
-        # Get items for this workshop
-        items = await db.pp_item_instances.find(
-            {"program_id": program["id"], "workshop_number": ws["workshop_number"]},
-            {"_id": 0}
-        ).to_list(100)
-        
-        items_total = len(items)
-        items_done = sum(1 for i in items if i["status"] in ["done", "validated"])
-        
-        # Get actions count for this workshop
-        actions = await db.pp_actions.find(
-            {"program_id": program["id"], "workshop_number": ws["workshop_number"], "status": {"$in": ["open", "in_progress"]}},
-            {"_id": 0}
-        ).to_list(1000)
-        
-        # Get decisions count for this workshop
-        decisions = await db.pp_decisions.find(
-            {"program_id": program["id"], "workshop_number": ws["workshop_number"]},
-            {"_id": 0}
-        ).to_list(1000)
-        
+        ws_def = WORKSHOP_DEFINITIONS_BY_NUMBER.get(ws["workshop_number"])
+        counts = progress.get(ws["workshop_number"], {})
+        items_total = counts.get("items_total", 0)
+        items_done = counts.get("items_done", 0)
+
         result.append({
             **ws,
             "title": ws_def["title"] if ws_def else "",
@@ -827,8 +1275,8 @@ async def get_pp_workshops(
             "items_total": items_total,
             "items_done": items_done,
             "items_progress_pct": round(items_done / items_total * 100, 1) if items_total > 0 else 0,
-            "open_actions_count": len(actions),
-            "decisions_count": len(decisions)
+            "open_actions_count": counts.get("open_actions_count", 0),
+            "decisions_count": counts.get("decisions_count", 0)
         })
     
     return result
@@ -850,17 +1298,17 @@ async def get_pp_workshop_detail(
     if not workshop:
         raise HTTPException(status_code=404, detail="Atelier non trouvé")
     
-    ws_def = next((d for d in WORKSHOP_DEFINITIONS if d["workshop_number"] == workshop_number), None)
+    ws_def = WORKSHOP_DEFINITIONS_BY_NUMBER.get(workshop_number)
     
     # Get items with definitions
     items = await db.pp_item_instances.find(
         {"program_id": program["id"], "workshop_number": workshop_number},
-        {"_id": 0}
+        ITEM_PROJECTION
     ).to_list(100)
     
     enriched_items = []
     for item in items:
-        item_def = next((d for d in ITEM_DEFINITIONS if d["item_id"] == item["item_id"]), None)
+        item_def = ITEM_DEFINITIONS_BY_ID.get(item["item_id"])
         enriched_items.append({
             **item,
             "title": item_def["title"] if item_def else "",
@@ -888,30 +1336,52 @@ async def update_pp_workshop(
     """Update workshop status or completion criteria"""
     program = await get_or_create_program(tenant_id, current_user.id)
     
+    ws_def = WORKSHOP_DEFINITIONS_BY_NUMBER.get(workshop_number)
+    if update.completion_criteria_patch:
+        check_criteria_patch(update.completion_criteria_patch, ws_def["completion_criteria"] if ws_def else [])
+    
+    workshop_filter = {"program_id": program["id"], "workshop_number": workshop_number}
     update_data = {}
     if update.status:
         update_data["status"] = update.status
-        if update.status == "in_progress" and not await db.pp_workshops.find_one(
-            {"program_id": program["id"], "workshop_number": workshop_number, "started_at": {"$ne": None}}
-        ):
-            update_data["started_at"] = datetime.now(timezone.utc).isoformat()
-    
     if update.completion_criteria_state:
         update_data["completion_criteria_state"] = update.completion_criteria_state
+    if update.completion_criteria_patch:
+        merge_set(update_data, {f"completion_criteria_state.{c}": checked for c, checked in update.completion_criteria_patch.items()})
     
     if update_data:
-        await db.pp_workshops.update_one(
-            {"program_id": program["id"], "workshop_number": workshop_number},
-            {"$set": update_data}
-        )
+        # Pipeline update so started_at is only set on the first start, within the same round trip
+        stages = [{"$set": {field: {"$literal": value} for field, value in update_data.items()}}]
+        now = datetime.now(timezone.utc).isoformat()
+        if update.status == "in_progress":
+            stages[0]["$set"]["started_at"] = {"$ifNull": ["$started_at", now]}
+        if update.completion_criteria_state or update.completion_criteria_patch:
+            # Recounted from the criteria as written, so concurrent patches of other criteria are included
+            stages.append({"$set": {"criteria_unchecked": {"$size": {"$filter": {
+                "input": {"$objectToArray": {"$ifNull": ["$completion_criteria_state", {}]}},
+                "cond": {"$not": ["$$this.v"]}
+            }}}}})
+        before = await db.pp_workshops.find_one_and_update(workshop_filter, stages, projection={"_id": 0})
+        if not before:
+            return None
+        workshop = apply_set(before, update_data)
+        if update.status == "in_progress":
+            workshop["started_at"] = before.get("started_at") or now
+        if len(stages) > 1:
+            workshop["criteria_unchecked"] = workshop_counters.count_unchecked(workshop.get("completion_criteria_state"))
+        await pp_stats.apply_stats_delta(db, program["id"], pp_stats.workshop_delta(before, workshop))
+    else:
+        workshop = await db.pp_workshops.find_one(workshop_filter, {"_id": 0})
+        if not workshop:
+            return None
     
-    # Check if workshop should be completed
-    await check_workshop_completion(program["id"], workshop_number)
+    # Complete the workshop once its counters are at 0
+    if workshop_counters.is_ready(workshop):
+        completion = await workshop_counters.complete_workshop(db, program["id"], workshop_number)
+        if completion:
+            workshop.update(completion)
     
-    return await db.pp_workshops.find_one(
-        {"program_id": program["id"], "workshop_number": workshop_number},
-        {"_id": 0}
-    )
+    return workshop
 
 @api_router.get("/power-platform/items")
 async def get_pp_items(
@@ -929,12 +1399,12 @@ async def get_pp_items(
     if status:
         query["status"] = status
     
-    items = await db.pp_item_instances.find(query, {"_id": 0}).to_list(1000)
+    items = await db.pp_item_instances.find(query, ITEM_PROJECTION).to_list(1000)
     
     # Enrich with definitions
     enriched_items = []
     for item in items:
-        item_def = next((d for d in ITEM_DEFINITIONS if d["item_id"] == item["item_id"]), None)
+        item_def = ITEM_DEFINITIONS_BY_ID.get(item["item_id"])
         enriched_items.append({
             **item,
             "title": item_def["title"] if item_def else "",
@@ -957,13 +1427,13 @@ async def get_pp_item(
     
     item = await db.pp_item_instances.find_one(
         {"program_id": program["id"], "item_id": item_id},
-        {"_id": 0}
+        ITEM_PROJECTION
     )
     
     if not item:
         raise HTTPException(status_code=404, detail="Item non trouvé")
     
-    item_def = next((d for d in ITEM_DEFINITIONS if d["item_id"] == item_id), None)
+    item_def = ITEM_DEFINITIONS_BY_ID.get(item_id)
     
     return {
         **item,
@@ -974,17 +1444,9 @@ async def get_pp_item(
         "acceptance_criteria": item_def["acceptance_criteria"] if item_def else []
     }
 
-@api_router.patch("/power-platform/items/{item_id}")
-async def update_pp_item(
-    item_id: str,
-    update: PPItemInstanceUpdate,
-    tenant_id: str = Depends(get_tenant_id),
-    current_user: UserInDB = Depends(get_current_user)
-):
-    """Update an item instance"""
-    program = await get_or_create_program(tenant_id, current_user.id)
-    
-    update_data = {"updated_at": datetime.now(timezone.utc).isoformat()}
+def item_update_data(update: PPItemInstanceUpdate, now: str) -> dict:
+    """Fields $set by an item update"""
+    update_data = {"updated_at": now}
     
     if update.status is not None:
         update_data["status"] = update.status
@@ -996,28 +1458,53 @@ async def update_pp_item(
         update_data["notes_markdown"] = update.notes_markdown
     if update.acceptance_state is not None:
         update_data["acceptance_state"] = update.acceptance_state
+    if update.acceptance_state_patch:
+        merge_set(update_data, {f"acceptance_state.{c}": checked for c, checked in update.acceptance_state_patch.items()})
     if update.done_override is not None:
         update_data["done_override"] = update.done_override
     
-    await db.pp_item_instances.update_one(
-        {"program_id": program["id"], "item_id": item_id},
-        {"$set": update_data}
-    )
-    
-    # Get item to check workshop completion
-    item = await db.pp_item_instances.find_one(
-        {"program_id": program["id"], "item_id": item_id},
-        {"_id": 0}
-    )
-    
-    if item:
-        await check_workshop_completion(program["id"], item["workshop_number"])
-    
-    return await db.pp_item_instances.find_one(
-        {"program_id": program["id"], "item_id": item_id},
-        {"_id": 0}
+    return update_data
+
+def is_criteria_toggle(update_data: dict) -> bool:
+    """Whether an item update only sets individual acceptance criteria, which is what gets coalesced"""
+    return any(path.startswith("acceptance_state.") for path in update_data) and all(
+        path == "updated_at" or path.startswith("acceptance_state.") for path in update_data
     )
 
+def check_criteria_patch(patch: Dict[str, bool], criteria: List[str]):
+    """Patched criteria become dotted $set paths, so only known criterion labels are accepted"""
+    unknown = [c for c in patch if c not in criteria]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Critère inconnu: {unknown[0]}")
+
+def check_item_update(item_id: str, update: PPItemInstanceUpdate):
+    if update.acceptance_state_patch:
+        item_def = ITEM_DEFINITIONS_BY_ID.get(item_id)
+        check_criteria_patch(update.acceptance_state_patch, item_def["acceptance_criteria"] if item_def else [])
+
+def validation_update_data(validated: bool, user_id: str, now: str) -> dict:
+    """Fields $set when an item is validated or unvalidated"""
+    if validated:
+        return {"status": "validated", "validated_by": user_id, "validated_at": now, "updated_at": now}
+    return {"status": "done", "validated_by": None, "validated_at": None, "updated_at": now}
+
+@api_router.patch("/power-platform/items/{item_id}")
+async def update_pp_item(
+    item_id: str,
+    update: PPItemInstanceUpdate,
+    tenant_id: str = Depends(get_tenant_id),
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """Update an item instance; rapid criteria toggles of the item are written together"""
+    check_item_update(item_id, update)
+    program = await get_or_create_program(tenant_id, current_user.id)
+    key = (program["id"], item_id)
+    update_data = item_update_data(update, datetime.now(timezone.utc).isoformat())
+    if is_criteria_toggle(update_data):
+        return await item_coalescer.submit(key, update_data)
+    await item_coalescer.settle([key])
+    return await apply_item_update(program["id"], item_id, update_data)
+
 @api_router.post("/power-platform/items/{item_id}/validate")
 async def validate_pp_item(
     item_id: str,
@@ -1027,38 +1514,44 @@ async def validate_pp_item(
 ):
     """Validate or unvalidate an item"""
     program = await get_or_create_program(tenant_id, current_user.id)
-    
+    update_data = validation_update_data(validation.validated, current_user.id, datetime.now(timezone.utc).isoformat())
+    await item_coalescer.settle([(program["id"], item_id)])
+    return await apply_item_update(program["id"], item_id, update_data)
+
+@api_router.patch("/power-platform/items:batch")
+async def update_pp_items_batch(
+    batch: PPItemInstanceBatchUpdate,
+    tenant_id: str = Depends(get_tenant_id),
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """Update many item instances in one write; entries for the same item are merged in order"""
+    program = await get_or_create_program(tenant_id, current_user.id)
     now = datetime.now(timezone.utc).isoformat()
-    
-    if validation.validated:
-        update_data = {
-            "status": "validated",
-            "validated_by": current_user.id,
-            "validated_at": now,
-            "updated_at": now
-        }
-    else:
-        update_data = {
-            "status": "done",
-            "validated_by": None,
-            "validated_at": None,
-            "updated_at": now
-        }
-    
-    await db.pp_item_instances.update_one(
-        {"program_id": program["id"], "item_id": item_id},
-        {"$set": update_data}
-    )
-    
-    item = await db.pp_item_instances.find_one(
-        {"program_id": program["id"], "item_id": item_id},
-        {"_id": 0}
-    )
-    
-    if item:
-        await check_workshop_completion(program["id"], item["workshop_number"])
-    
-    return item
+    updates: Dict[str, dict] = {}
+    for entry in batch.items:
+        check_item_update(entry.item_id, entry)
+        merge_set(updates.setdefault(entry.item_id, {}), item_update_data(entry, now))
+    if len(updates) > MAX_ITEM_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Au plus {MAX_ITEM_BATCH_SIZE} items par requête")
+    await item_coalescer.settle([(program["id"], item_id) for item_id in updates])
+    items, not_found = await apply_item_updates(program["id"], updates)
+    return {"items": items, "not_found": not_found}
+
+@api_router.post("/power-platform/items:validate-batch")
+async def validate_pp_items_batch(
+    batch: PPItemInstanceBatchValidate,
+    tenant_id: str = Depends(get_tenant_id),
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """Validate or unvalidate many items in one write"""
+    program = await get_or_create_program(tenant_id, current_user.id)
+    item_ids = list(dict.fromkeys(batch.item_ids))
+    if len(item_ids) > MAX_ITEM_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Au plus {MAX_ITEM_BATCH_SIZE} items par requête")
+    update_data = validation_update_data(batch.validated, current_user.id, datetime.now(timezone.utc).isoformat())
+    await item_coalescer.settle([(program["id"], item_id) for item_id in item_ids])
+    items, not_found = await apply_item_updates(program["id"], {item_id: dict(update_data) for item_id in item_ids})
+    return {"items": items, "not_found": not_found}
 
 # Actions CRUD
 @api_router.get("/power-platform/actions")
@@ -1067,10 +1560,12 @@ async def get_pp_actions(
     item_id: Optional[str] = None,
     status: Optional[str] = None,
     priority: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     tenant_id: str = Depends(get_tenant_id),
     current_user: UserInDB = Depends(get_current_user)
 ):
-    """Get actions with optional filters"""
+    """Get actions with optional filters; paginated when limit or cursor is given"""
     program = await get_or_create_program(tenant_id, current_user.id)
     
     query = {"program_id": program["id"]}
@@ -1083,18 +1578,12 @@ async def get_pp_actions(
     if priority:
         query["priority"] = priority
     
-    actions = await db.pp_actions.find(query, {"_id": 0}).sort("created_at", -1).to_list(10000)
+    if limit is None and cursor is None:
+        return add_ageing_days(await db.pp_actions.find(query, {"_id": 0}).sort([("created_at", -1), ("id", -1)]).to_list(10000))
     
-    # Calculate ageing for each action
-    now = datetime.now(timezone.utc)
-    for action in actions:
-        try:
-            created = datetime.fromisoformat(action["created_at"].replace("Z", "+00:00"))
-            action["ageing_days"] = (now - created).days
-        except:
-            action["ageing_days"] = 0
-    
-    return actions
+    page = await paginated_listing(db.pp_actions, query, "created_at", limit, cursor)
+    add_ageing_days(page["items"])
+    return page
 
 @api_router.post("/power-platform/actions")
 async def create_pp_action(
@@ -1124,6 +1613,7 @@ async def create_pp_action(
     await db.pp_actions.insert_one(new_action)
     # Remove MongoDB _id before returning
     new_action.pop("_id", None)
+    await pp_stats.apply_action_change(db, program["id"], None, new_action)
     return new_action
 
 @api_router.patch("/power-platform/actions/{action_id}")
@@ -1151,12 +1641,17 @@ async def update_pp_action(
     if update.due_date is not None:
         update_data["due_date"] = update.due_date
     
-    await db.pp_actions.update_one(
+    # The action as it was gives the stats delta; as written, it is that state merged with update_data
+    before = await db.pp_actions.find_one_and_update(
         {"id": action_id, "program_id": program["id"]},
-        {"$set": update_data}
+        {"$set": update_data},
+        projection={"_id": 0}
     )
-    
-    return await db.pp_actions.find_one({"id": action_id}, {"_id": 0})
+    if not before:
+        return None
+    action = {**before, **update_data}
+    await pp_stats.apply_action_change(db, program["id"], before, action)
+    return action
 
 @api_router.delete("/power-platform/actions/{action_id}")
 async def delete_pp_action(
@@ -1166,7 +1661,12 @@ async def delete_pp_action(
 ):
     """Delete an action"""
     program = await get_or_create_program(tenant_id, current_user.id)
-    await db.pp_actions.delete_one({"id": action_id, "program_id": program["id"]})
+    deleted = await db.pp_actions.find_one_and_delete(
+        {"id": action_id, "program_id": program["id"]},
+        projection={"_id": 0, "status": 1, "owner_user_id": 1, "created_at": 1}
+    )
+    if deleted:
+        await pp_stats.apply_action_change(db, program["id"], deleted, None)
     return {"deleted": True}
 
 # Decisions CRUD
@@ -1174,10 +1674,12 @@ async def delete_pp_action(
 async def get_pp_decisions(
     workshop_number: Optional[int] = None,
     item_id: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     tenant_id: str = Depends(get_tenant_id),
     current_user: UserInDB = Depends(get_current_user)
 ):
-    """Get decisions with optional filters"""
+    """Get decisions with optional filters; paginated when limit or cursor is given"""
     program = await get_or_create_program(tenant_id, current_user.id)
     
     query = {"program_id": program["id"]}
@@ -1186,7 +1688,10 @@ async def get_pp_decisions(
     if item_id:
         query["item_id"] = item_id
     
-    return await db.pp_decisions.find(query, {"_id": 0}).sort("decided_at", -1).to_list(10000)
+    if limit is None and cursor is None:
+        return await db.pp_decisions.find(query, {"_id": 0}).sort([("decided_at", -1), ("id", -1)]).to_list(10000)
+    
+    return await paginated_listing(db.pp_decisions, query, "decided_at", limit, cursor)
 
 @api_router.post("/power-platform/decisions")
 async def create_pp_decision(
@@ -1213,6 +1718,7 @@ async def create_pp_decision(
     await db.pp_decisions.insert_one(new_decision)
     # Remove MongoDB _id before returning
     new_decision.pop("_id", None)
+    await pp_stats.apply_stats_delta(db, program["id"], {"decisions_count": 1})
     return new_decision
 
 @api_router.delete("/power-platform/decisions/{decision_id}")
@@ -1223,7 +1729,8 @@ async def delete_pp_decision(
 ):
     """Delete a decision"""
     program = await get_or_create_program(tenant_id, current_user.id)
-    await db.pp_decisions.delete_one({"id": decision_id, "program_id": program["id"]})
+    result = await db.pp_decisions.delete_one({"id": decision_id, "program_id": program["id"]})
+    await pp_stats.apply_stats_delta(db, program["id"], {"decisions_count": -result.deleted_count})
     return {"deleted": True}
 
 # Evidence CRUD
@@ -1231,10 +1738,12 @@ async def delete_pp_decision(
 async def get_pp_evidence(
     workshop_number: Optional[int] = None,
     item_id: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     tenant_id: str = Depends(get_tenant_id),
     current_user: UserInDB = Depends(get_current_user)
 ):
-    """Get evidence with optional filters"""
+    """Get evidence with optional filters; paginated when limit or cursor is given"""
     program = await get_or_create_program(tenant_id, current_user.id)
     
     query = {"program_id": program["id"]}
@@ -1243,7 +1752,10 @@ async def get_pp_evidence(
     if item_id:
         query["item_id"] = item_id
     
-    return await db.pp_evidence.find(query, {"_id": 0}).sort("created_at", -1).to_list(10000)
+    if limit is None and cursor is None:
+        return await db.pp_evidence.find(query, {"_id": 0}).sort([("created_at", -1), ("id", -1)]).to_list(10000)
+    
+    return await paginated_listing(db.pp_evidence, query, "created_at", limit, cursor)
 
 @api_router.post("/power-platform/evidence")
 async def create_pp_evidence(
@@ -1272,6 +1784,7 @@ async def create_pp_evidence(
     await db.pp_evidence.insert_one(new_evidence)
     # Remove MongoDB _id before returning
     new_evidence.pop("_id", None)
+    await pp_stats.apply_stats_delta(db, program["id"], {"evidence_count": 1})
     return new_evidence
 
 @api_router.delete("/power-platform/evidence/{evidence_id}")
@@ -1282,30 +1795,82 @@ async def delete_pp_evidence(
 ):
     """Delete evidence"""
     program = await get_or_create_program(tenant_id, current_user.id)
-    await db.pp_evidence.delete_one({"id": evidence_id, "program_id": program["id"]})
+    result = await db.pp_evidence.delete_one({"id": evidence_id, "program_id": program["id"]})
+    await pp_stats.apply_stats_delta(db, program["id"], {"evidence_count": -result.deleted_count})
     return {"deleted": True}
 
-# Workshop definitions (static)
-@api_router.get("/power-platform/definitions/workshops")
-async def get_pp_workshop_definitions():
+# Streaming exports (complete histories, oldest first)
+EXPORT_COLLECTIONS = {
+    "actions": ("pp_actions", "created_at", list(PPAction.model_fields)),
+    "decisions": ("pp_decisions", "decided_at", list(PPDecision.model_fields)),
+    "evidence": ("pp_evidence", "created_at", list(PPEvidence.model_fields))
+}
+
+@api_router.get("/power-platform/export/{collection}")
+async def export_pp_collection(
+    collection: str,
+    format: str = "ndjson",
+    gzip: bool = False,
+    workshop_number: Optional[int] = None,
+    tenant_id: str = Depends(get_tenant_id),
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """Stream all actions, decisions or evidence of the program as NDJSON or CSV"""
+    if collection not in EXPORT_COLLECTIONS:
+        raise HTTPException(status_code=404, detail="Collection d'export inconnue")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Format d'export non supporté (ndjson ou csv)")
+    
+    program = await get_or_create_program(tenant_id, current_user.id)
+    collection_name, sort_field, columns = EXPORT_COLLECTIONS[collection]
+    query = {"program_id": program["id"]}
+    if workshop_number is not None:
+        query["workshop_number"] = workshop_number
+    
+    cursor = db[collection_name].find(query, {"_id": 0}).sort([(sort_field, 1), ("id", 1)]).batch_size(EXPORT_BATCH_SIZE)
+    filename = f"{collection}.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        stream_export(cursor, format, columns, compress=gzip),
+        media_type="application/gzip" if gzip else EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+# Workshop definitions (static, pre-encoded once with a strong ETag)
+@api_router.get("/power-platform/definitions/workshops", response_model=List[PPWorkshopDefinition])
+async def get_pp_workshop_definitions(request: Request):
     """Get workshop definitions"""
-    return WORKSHOP_DEFINITIONS
+    return static_json_response(request, WORKSHOP_DEFINITIONS_RESPONSE)
 
-@api_router.get("/power-platform/definitions/items")
-async def get_pp_item_definitions(workshop_number: Optional[int] = None):
+@api_router.get("/power-platform/definitions/items", response_model=List[PPItemDefinition])
+async def get_pp_item_definitions(request: Request, workshop_number: Optional[int] = None):
     """Get item definitions"""
     if workshop_number:
-        return get_items_for_workshop(workshop_number)
-    return ITEM_DEFINITIONS
+        return static_json_response(request, ITEM_DEFINITIONS_RESPONSES_BY_WORKSHOP.get(workshop_number, EMPTY_LIST_RESPONSE))
+    return static_json_response(request, ITEM_DEFINITIONS_RESPONSE)
 
 # Include the router
 app.include_router(api_router)
 
 # Events
+background_tasks: List[asyncio.Task] = []
+
 @app.on_event("startup")
 async def startup():
+    await ensure_indexes(db)
     await seed_database()
+    await workshop_counters.ensure_counters(db)
+    await usage_rollups.ensure_rollups(db)
+    policy_cache.start(db)
+    usage_log_writer.start(db)
+    if IQI_SWEEP_CHECK_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(iqi.run_daily_sweep(db, IQI_SWEEP_CHECK_SECONDS)))
 
 @app.on_event("shutdown")
 async def shutdown():
+    for task in background_tasks:
+        task.cancel()
+    await policy_cache.stop()
+    await usage_log_writer.stop()
+    await item_coalescer.drain()
+    password_pool.shutdown()
     client.close()
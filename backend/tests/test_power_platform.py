@@ -10,6 +10,12 @@ Tests for all Power Platform endpoints including:
 import pytest
 import requests
 import os
+import csv
+import gzip
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
 
@@ -28,6 +34,32 @@ class TestAuthentication:
         assert "token_type" in data, "No token_type in response"
         return data["access_token"]
 
+    def test_login_wrong_password(self):
+        """Test login rejects a wrong password"""
+        response = requests.post(f"{BASE_URL}/api/auth/login", json={
+            "email": "demo@bizdesk365.local",
+            "password": "wrong"
+        })
+        assert response.status_code == 401
+
+    def test_password_pool_metrics(self, auth_headers):
+        """GET /api/admin/metrics - Password pool counters are exposed to admins"""
+        response = requests.get(f"{BASE_URL}/api/admin/metrics", headers=auth_headers)
+        assert response.status_code == 200, f"Failed: {response.text}"
+        pool = response.json()["password_pool"]
+        assert pool["completed"] >= 1
+        assert pool["queue_depth"] >= 0
+        assert "rejected" in pool
+
+    def test_index_report(self, auth_headers):
+        """GET /api/admin/indexes - Registered indexes are provisioned at startup"""
+        response = requests.get(f"{BASE_URL}/api/admin/indexes", headers=auth_headers)
+        assert response.status_code == 200, f"Failed: {response.text}"
+        report = response.json()
+        assert report["pp_item_instances"]["missing"] == []
+        assert report["pp_actions"]["missing"] == []
+        assert report["ai_usage_logs"]["missing"] == []
+
 
 @pytest.fixture(scope="module")
 def auth_token():
@@ -58,6 +90,16 @@ class TestPowerPlatformProgram:
         assert "id" in data, "Program should have an id"
         assert "tenant_id" in data, "Program should have tenant_id"
         assert "status" in data, "Program should have status"
+        assert "_id" not in data
+
+    def test_get_program_concurrent_requests_share_program(self, auth_headers):
+        """GET /api/power-platform/program - Concurrent requests resolve to one program"""
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            responses = list(pool.map(
+                lambda _: requests.get(f"{BASE_URL}/api/power-platform/program", headers=auth_headers), range(5)
+            ))
+        assert all(r.status_code == 200 for r in responses)
+        assert len({r.json()["id"] for r in responses}) == 1
     
     def test_get_kpis(self, auth_headers):
         """GET /api/power-platform/kpis - Get KPIs"""
@@ -73,6 +115,28 @@ class TestPowerPlatformProgram:
         assert "actions_open_count" in data
         assert "decisions_count" in data
 
+    def test_kpis_track_action_and_decision_writes(self, auth_headers):
+        """GET /api/power-platform/kpis - Rollup follows create/update/delete"""
+        before = requests.get(f"{BASE_URL}/api/power-platform/kpis", headers=auth_headers).json()
+
+        action = requests.post(f"{BASE_URL}/api/power-platform/actions", headers=auth_headers,
+                               json={"title": "TEST_KPI_Action", "workshop_number": 1}).json()
+        decision = requests.post(f"{BASE_URL}/api/power-platform/decisions", headers=auth_headers,
+                                 json={"decision_text": "TEST_KPI_Decision", "workshop_number": 1}).json()
+        during = requests.get(f"{BASE_URL}/api/power-platform/kpis", headers=auth_headers).json()
+        assert during["actions_open_count"] == before["actions_open_count"] + 1
+        assert during["decisions_count"] == before["decisions_count"] + 1
+
+        requests.patch(f"{BASE_URL}/api/power-platform/actions/{action['id']}", headers=auth_headers, json={"status": "done"})
+        closed = requests.get(f"{BASE_URL}/api/power-platform/kpis", headers=auth_headers).json()
+        assert closed["actions_open_count"] == before["actions_open_count"]
+
+        requests.delete(f"{BASE_URL}/api/power-platform/actions/{action['id']}", headers=auth_headers)
+        requests.delete(f"{BASE_URL}/api/power-platform/decisions/{decision['id']}", headers=auth_headers)
+        after = requests.get(f"{BASE_URL}/api/power-platform/kpis", headers=auth_headers).json()
+        assert after["actions_open_count"] == before["actions_open_count"]
+        assert after["decisions_count"] == before["decisions_count"]
+
 
 class TestPowerPlatformWorkshops:
     """Test Power Platform workshops endpoints"""
@@ -92,7 +156,22 @@ class TestPowerPlatformWorkshops:
         assert "status" in ws
         assert "items_total" in ws
         assert "items_done" in ws
-    
+        assert "open_actions_count" in ws
+        assert "decisions_count" in ws
+
+    def test_workshops_list_counts_match_detail(self, auth_headers):
+        """GET /api/power-platform/workshops - Aggregated counts match per-workshop data"""
+        response = requests.get(f"{BASE_URL}/api/power-platform/workshops", headers=auth_headers)
+        assert response.status_code == 200, f"Failed: {response.text}"
+        ws = next(w for w in response.json() if w["workshop_number"] == 3)
+
+        items = requests.get(f"{BASE_URL}/api/power-platform/items?workshop_number=3", headers=auth_headers).json()
+        assert ws["items_total"] == len(items)
+        assert ws["items_done"] == sum(1 for i in items if i["status"] in ["done", "validated"])
+
+        actions = requests.get(f"{BASE_URL}/api/power-platform/actions?workshop_number=3", headers=auth_headers).json()
+        assert ws["open_actions_count"] == sum(1 for a in actions if a["status"] in ["open", "in_progress"])
+
     def test_get_workshop_detail(self, auth_headers):
         """GET /api/power-platform/workshops/1 - Get workshop detail"""
         response = requests.get(f"{BASE_URL}/api/power-platform/workshops/1", headers=auth_headers)
@@ -152,6 +231,28 @@ class TestPowerPlatformWorkshops:
             verify_data = verify_response.json()
             assert verify_data["completion_criteria_state"].get(criteria[0]) == True
 
+    def test_workshop_counters_follow_items(self, auth_headers):
+        """PATCH /api/power-platform/items/{id} - Workshop completion counters follow mandatory item status"""
+        def workshop():
+            return requests.get(f"{BASE_URL}/api/power-platform/workshops/3", headers=auth_headers).json()
+
+        ws = workshop()
+        mandatory = [i for i in ws["items"] if i["status_requirement"] == "OBLIGATOIRE"]
+        assert ws["mandatory_items_remaining"] == sum(1 for i in mandatory if i["status"] not in ["done", "validated"])
+        assert ws["criteria_unchecked"] == sum(1 for checked in ws["completion_criteria_state"].values() if not checked)
+
+        pending = [i for i in mandatory if i["status"] not in ["done", "validated"]]
+        if not pending or ws["mandatory_items_remaining"] == 1 and ws["criteria_unchecked"] == 0:
+            pytest.skip("No mandatory item to toggle without completing the workshop")
+        item = pending[0]
+        url = f"{BASE_URL}/api/power-platform/items/{item['item_id']}"
+        try:
+            requests.patch(url, headers=auth_headers, json={"status": "done"})
+            assert workshop()["mandatory_items_remaining"] == ws["mandatory_items_remaining"] - 1
+        finally:
+            requests.patch(url, headers=auth_headers, json={"status": item["status"]})
+        assert workshop()["mandatory_items_remaining"] == ws["mandatory_items_remaining"]
+
 
 class TestPowerPlatformItems:
     """Test Power Platform items endpoints"""
@@ -208,6 +309,155 @@ class TestPowerPlatformItems:
         verify_data = verify_response.json()
         assert verify_data["status"] == "in_progress"
 
+    def test_update_item_round_trips(self, auth_headers):
+        """PATCH /api/power-platform/items/{id} - A notes edit costs one Mongo command, a status change two"""
+        def pp_commands():
+            # Background tasks query other collections concurrently; only count the Power Platform ones
+            collections = requests.get(f"{BASE_URL}/api/admin/metrics", headers=auth_headers).json()["mongo_commands"]["collections"]
+            return sum(sum(by_command.values()) for name, by_command in collections.items() if name.startswith("pp_"))
+
+        url = f"{BASE_URL}/api/power-platform/items/A1-01"
+        original = requests.get(url, headers=auth_headers).json()
+        try:
+            start = pp_commands()
+            response = requests.patch(url, headers=auth_headers, json={"notes_markdown": "TEST round trips"})
+            assert response.status_code == 200, f"Failed: {response.text}"
+            assert response.json()["notes_markdown"] == "TEST round trips"
+            assert pp_commands() - start == 1
+
+            next_status = "not_started" if original["status"] != "not_started" else "in_progress"
+            start = pp_commands()
+            response = requests.patch(url, headers=auth_headers, json={"status": next_status})
+            assert response.json()["status"] == next_status
+            assert pp_commands() - start == 2
+        finally:
+            requests.patch(url, headers=auth_headers, json={"status": original["status"], "notes_markdown": original.get("notes_markdown") or ""})
+
+        verify = requests.get(url, headers=auth_headers).json()
+        assert verify["status"] == original["status"]
+
+    def test_batch_update_and_validate_items(self, auth_headers):
+        """PATCH /api/power-platform/items:batch and POST /api/power-platform/items:validate-batch - One write for many items"""
+        def item_commands():
+            collections = requests.get(f"{BASE_URL}/api/admin/metrics", headers=auth_headers).json()["mongo_commands"]["collections"]
+            return sum(collections.get("pp_item_instances", {}).values())
+
+        ids = ["A2-01", "A2-02", "A2-03"]
+        originals = {i: requests.get(f"{BASE_URL}/api/power-platform/items/{i}", headers=auth_headers).json() for i in ids}
+        kpis_before = requests.get(f"{BASE_URL}/api/power-platform/kpis", headers=auth_headers).json()
+        try:
+            start = item_commands()
+            response = requests.patch(
+                f"{BASE_URL}/api/power-platform/items:batch",
+                headers=auth_headers,
+                json={"items": [
+                    {"item_id": "A2-01", "status": "done", "notes_markdown": "TEST batch"},
+                    {"item_id": "A2-02", "status": "done"},
+                    {"item_id": "A2-03", "notes_markdown": "TEST batch"},
+                    {"item_id": "missing-item", "status": "done"}
+                ]}
+            )
+            assert response.status_code == 200, f"Failed: {response.text}"
+            data = response.json()
+            # One read of the current state and one bulk write
+            assert item_commands() - start == 2
+            assert [i["item_id"] for i in data["items"]] == ids
+            assert data["not_found"] == ["missing-item"]
+            assert data["items"][0]["status"] == "done"
+            assert data["items"][2]["notes_markdown"] == "TEST batch"
+            assert requests.get(f"{BASE_URL}/api/power-platform/items/A2-02", headers=auth_headers).json()["status"] == "done"
+
+            response = requests.post(
+                f"{BASE_URL}/api/power-platform/items:validate-batch",
+                headers=auth_headers, json={"item_ids": ["A2-01", "A2-02"], "validated": True}
+            )
+            assert response.status_code == 200, f"Failed: {response.text}"
+            assert all(i["status"] == "validated" and i["validated_by"] for i in response.json()["items"])
+        finally:
+            requests.patch(
+                f"{BASE_URL}/api/power-platform/items:batch",
+                headers=auth_headers,
+                json={"items": [
+                    {"item_id": i, "status": o["status"], "notes_markdown": o.get("notes_markdown") or ""} for i, o in originals.items()
+                ]}
+            )
+        kpis_after = requests.get(f"{BASE_URL}/api/power-platform/kpis", headers=auth_headers).json()
+        for field in ["items_done", "items_validated", "items_in_progress", "items_not_started"]:
+            assert kpis_after[field] == kpis_before[field]
+
+    def test_acceptance_state_patch(self, auth_headers):
+        """PATCH /api/power-platform/items/{id} - Concurrent patches of different criteria are all kept"""
+        item = requests.get(f"{BASE_URL}/api/power-platform/items/A1-01", headers=auth_headers).json()
+        criteria = item["acceptance_criteria"]
+        original = item.get("acceptance_state") or {}
+        if len(criteria) < 2:
+            pytest.skip("A1-01 needs at least two acceptance criteria")
+
+        def patch(criterion):
+            return requests.patch(
+                f"{BASE_URL}/api/power-platform/items/A1-01",
+                headers=auth_headers, json={"acceptance_state_patch": {criterion: not original.get(criterion, False)}}
+            )
+
+        coalescer_before = requests.get(f"{BASE_URL}/api/admin/metrics", headers=auth_headers).json()["pp_item_coalescer"]
+        try:
+            with ThreadPoolExecutor(max_workers=len(criteria)) as pool:
+                responses = list(pool.map(patch, criteria))
+            assert all(r.status_code == 200 for r in responses), [r.text for r in responses]
+            state = requests.get(f"{BASE_URL}/api/power-platform/items/A1-01", headers=auth_headers).json()["acceptance_state"]
+            for criterion in criteria:
+                assert state[criterion] == (not original.get(criterion, False))
+
+            coalescer = requests.get(f"{BASE_URL}/api/admin/metrics", headers=auth_headers).json()["pp_item_coalescer"]
+            assert coalescer["submitted"] - coalescer_before["submitted"] == len(criteria)
+            if coalescer["window_ms"] > 0:
+                # Toggles sent together share a write
+                assert coalescer["merged"] > coalescer_before["merged"]
+                assert coalescer["writes"] - coalescer_before["writes"] < len(criteria)
+
+            response = requests.patch(
+                f"{BASE_URL}/api/power-platform/items/A1-01",
+                headers=auth_headers, json={"acceptance_state_patch": {"TEST unknown criterion": True}}
+            )
+            assert response.status_code == 400
+        finally:
+            requests.patch(
+                f"{BASE_URL}/api/power-platform/items/A1-01",
+                headers=auth_headers, json={"acceptance_state": original}
+            )
+
+    def test_patch_then_validate_keeps_order(self, auth_headers):
+        """PATCH /api/power-platform/items/{id} then POST .../validate while the PATCH is in flight - The validation lands last"""
+        item = requests.get(f"{BASE_URL}/api/power-platform/items/A1-02", headers=auth_headers).json()
+        criterion = item["acceptance_criteria"][0]
+        original_state = item.get("acceptance_state") or {}
+        kpis_before = requests.get(f"{BASE_URL}/api/power-platform/kpis", headers=auth_headers).json()
+        try:
+            for patch in [{"status": "done"}, {"acceptance_state_patch": {criterion: True}}]:
+                with ThreadPoolExecutor(max_workers=1) as pool:
+                    patched = pool.submit(
+                        requests.patch, f"{BASE_URL}/api/power-platform/items/A1-02", headers=auth_headers, json=patch
+                    )
+                    time.sleep(0.01)
+                    validated = requests.post(
+                        f"{BASE_URL}/api/power-platform/items/A1-02/validate", headers=auth_headers, json={"validated": True}
+                    )
+                    assert patched.result().status_code == 200, f"Failed: {patched.result().text}"
+                assert validated.status_code == 200, f"Failed: {validated.text}"
+                stored = requests.get(f"{BASE_URL}/api/power-platform/items/A1-02", headers=auth_headers).json()
+                assert stored["status"] == "validated"
+                assert stored["validated_by"]
+            assert stored["acceptance_state"][criterion] is True
+        finally:
+            requests.patch(
+                f"{BASE_URL}/api/power-platform/items/A1-02",
+                headers=auth_headers,
+                json={"status": item["status"], "acceptance_state": original_state}
+            )
+        kpis_after = requests.get(f"{BASE_URL}/api/power-platform/kpis", headers=auth_headers).json()
+        for field in ["items_done", "items_validated", "items_in_progress", "items_not_started"]:
+            assert kpis_after[field] == kpis_before[field]
+
 
 class TestPowerPlatformActions:
     """Test Power Platform actions CRUD"""
@@ -220,7 +470,60 @@ class TestPowerPlatformActions:
         assert response.status_code == 200, f"Failed: {response.text}"
         data = response.json()
         assert isinstance(data, list)
-    
+
+    def test_actions_cursor_pagination(self, auth_headers):
+        """GET /api/power-platform/actions?limit= - Cursor pages cover the unpaginated list exactly once"""
+        for i in range(5):
+            requests.post(
+                f"{BASE_URL}/api/power-platform/actions",
+                headers=auth_headers,
+                json={"title": f"TEST_Page_Action_{i}", "priority": "low", "workshop_number": 3}
+            )
+        full = requests.get(f"{BASE_URL}/api/power-platform/actions?workshop_number=3", headers=auth_headers).json()
+
+        paged, cursor = [], None
+        while True:
+            params = {"workshop_number": 3, "limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = requests.get(f"{BASE_URL}/api/power-platform/actions", params=params, headers=auth_headers)
+            assert response.status_code == 200, f"Failed: {response.text}"
+            page = response.json()
+            assert len(page["items"]) <= 2
+            assert all("ageing_days" in a for a in page["items"])
+            paged.extend(page["items"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+
+        assert [a["id"] for a in paged] == [a["id"] for a in full]
+
+        invalid = requests.get(f"{BASE_URL}/api/power-platform/actions?cursor=not-a-cursor", headers=auth_headers)
+        assert invalid.status_code == 400
+
+    def test_export_actions(self, auth_headers):
+        """GET /api/power-platform/export/actions - NDJSON, CSV and gzip exports of every action"""
+        expected = requests.get(f"{BASE_URL}/api/power-platform/actions", headers=auth_headers).json()
+
+        ndjson = requests.get(f"{BASE_URL}/api/power-platform/export/actions", headers=auth_headers)
+        assert ndjson.status_code == 200, f"Failed: {ndjson.text}"
+        assert ndjson.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in ndjson.text.splitlines()]
+        assert sorted(r["id"] for r in rows) == sorted(a["id"] for a in expected)
+
+        csv_export = requests.get(f"{BASE_URL}/api/power-platform/export/actions?format=csv", headers=auth_headers)
+        assert csv_export.status_code == 200
+        csv_rows = list(csv.DictReader(io.StringIO(csv_export.text)))
+        assert len(csv_rows) == len(expected)
+        assert {"id", "title", "status", "created_at"} <= set(csv_rows[0])
+
+        gzipped = requests.get(f"{BASE_URL}/api/power-platform/export/actions?gzip=true", headers=auth_headers)
+        assert gzipped.headers["content-type"] == "application/gzip"
+        assert gzip.decompress(gzipped.content).decode() == ndjson.text
+
+        unknown = requests.get(f"{BASE_URL}/api/power-platform/export/programs", headers=auth_headers)
+        assert unknown.status_code == 404
+
     def test_create_action(self, auth_headers):
         """POST /api/power-platform/actions - Create new action"""
         response = requests.post(
@@ -376,6 +679,298 @@ class TestPowerPlatformDefinitions:
         for item in data:
             assert item["workshop_number"] == 1
 
+    def test_definitions_etag_not_modified(self, auth_headers):
+        """GET /api/power-platform/definitions/* - Strong ETag and If-None-Match -> 304"""
+        for path in ["definitions/workshops", "definitions/items", "definitions/items?workshop_number=2"]:
+            response = requests.get(f"{BASE_URL}/api/power-platform/{path}", headers=auth_headers)
+            assert response.status_code == 200, f"Failed: {response.text}"
+            etag = response.headers.get("ETag")
+            assert etag and not etag.startswith("W/"), "Should send a strong ETag"
+
+            cached = requests.get(f"{BASE_URL}/api/power-platform/{path}", headers={**auth_headers, "If-None-Match": etag})
+            assert cached.status_code == 304
+            assert cached.headers.get("ETag") == etag
+            assert cached.content == b""
+
+            stale = requests.get(f"{BASE_URL}/api/power-platform/{path}", headers={**auth_headers, "If-None-Match": '"stale"'})
+            assert stale.status_code == 200
+
+    def test_filtered_definitions_have_distinct_etag(self, auth_headers):
+        """GET /api/power-platform/definitions/items - Each variant has its own ETag"""
+        all_items = requests.get(f"{BASE_URL}/api/power-platform/definitions/items", headers=auth_headers)
+        ws_items = requests.get(f"{BASE_URL}/api/power-platform/definitions/items?workshop_number=1", headers=auth_headers)
+        assert all_items.headers["ETag"] != ws_items.headers["ETag"]
+
+
+class TestAIGovernance:
+    """AI governance summary tests"""
+
+    def test_summary_counts_decisions(self, auth_headers):
+        """GET /api/governance/ai/summary - Percentages are computed over all logs"""
+        response = requests.get(f"{BASE_URL}/api/governance/ai/summary", headers=auth_headers)
+        assert response.status_code == 200, f"Failed: {response.text}"
+        data = response.json()
+        assert data["total_usages"] >= 4
+        total_pct = data["authorized_percentage"] + data["assisted_percentage"] + data["forbidden_percentage"]
+        assert abs(total_pct - 100) <= 0.2
+
+    def test_summary_time_window(self, auth_headers):
+        """GET /api/governance/ai/summary?from=&to= - Only logs in [from, to) are counted"""
+        response = requests.get(
+            f"{BASE_URL}/api/governance/ai/summary",
+            params={"from": "2024-01-15T09:00:00Z", "to": "2024-01-15T11:00:00Z"},
+            headers=auth_headers
+        )
+        assert response.status_code == 200, f"Failed: {response.text}"
+        data = response.json()
+        assert data["total_usages"] == 2
+        assert data["forbidden_percentage"] == 0
+
+        empty = requests.get(
+            f"{BASE_URL}/api/governance/ai/summary", params={"from": "2000-01-01T00:00:00Z", "to": "2000-01-02T00:00:00Z"}, headers=auth_headers
+        )
+        assert empty.json()["total_usages"] == 0
+
+    def test_timeseries_matches_summary(self, auth_headers):
+        """GET /api/governance/ai/timeseries - Hourly and daily buckets add up to the summary"""
+        summary = requests.get(f"{BASE_URL}/api/governance/ai/summary", headers=auth_headers).json()
+        for granularity in ("hour", "day"):
+            response = requests.get(
+                f"{BASE_URL}/api/governance/ai/timeseries", params={"granularity": granularity}, headers=auth_headers
+            )
+            assert response.status_code == 200, f"Failed: {response.text}"
+            buckets = response.json()["buckets"]
+            assert sum(b["total"] for b in buckets) == summary["total_usages"]
+            assert [b["bucket_start"] for b in buckets] == sorted(b["bucket_start"] for b in buckets)
+
+    def test_timeseries_window(self, auth_headers):
+        """GET /api/governance/ai/timeseries?from=&to= - Seeded logs fall into their hour buckets"""
+        response = requests.get(
+            f"{BASE_URL}/api/governance/ai/timeseries",
+            params={"granularity": "hour", "from": "2024-01-15T09:30:00Z", "to": "2024-01-15T11:00:00Z"},
+            headers=auth_headers
+        )
+        assert response.status_code == 200, f"Failed: {response.text}"
+        buckets = {b["bucket_start"]: b for b in response.json()["buckets"]}
+        assert set(buckets) == {"2024-01-15T09:00:00Z", "2024-01-15T10:00:00Z"}
+        assert buckets["2024-01-15T09:00:00Z"]["assisted"] >= 1
+
+        invalid = requests.get(f"{BASE_URL}/api/governance/ai/timeseries", params={"granularity": "week"}, headers=auth_headers)
+        assert invalid.status_code == 422
+
+
+class TestEnterpriseBrain:
+    """Enterprise Brain quality tests"""
+
+    def test_quality_matches_documents(self, auth_headers):
+        """GET /api/enterprise-brain/quality - IQI counts agree with the document list"""
+        response = requests.get(f"{BASE_URL}/api/enterprise-brain/quality", headers=auth_headers)
+        assert response.status_code == 200, f"Failed: {response.text}"
+        data = response.json()
+        documents = requests.get(f"{BASE_URL}/api/enterprise-brain/documents", headers=auth_headers).json()
+        assert data["evidences"]["total_documents"] == len(documents)
+        assert data["evidences"]["validated_count"] == sum(1 for d in documents if d["validated"])
+        avg_confidence = sum(d["confidence_score"] for d in documents) / len(documents)
+        assert abs(data["evidences"]["avg_confidence"] - avg_confidence * 100) <= 0.1
+        assert 0 <= data["iqi_global"] <= 1
+
+    def test_quality_follows_validation(self, auth_headers):
+        """PATCH /api/enterprise-brain/document/{id} - The IQI snapshot follows validation and re-scoring"""
+        original = requests.get(f"{BASE_URL}/api/enterprise-brain/document/doc-003", headers=auth_headers).json()
+        before = requests.get(f"{BASE_URL}/api/enterprise-brain/quality", headers=auth_headers).json()["evidences"]
+        try:
+            response = requests.patch(
+                f"{BASE_URL}/api/enterprise-brain/document/doc-003",
+                json={"validated": not original["validated"]}, headers=auth_headers
+            )
+            assert response.status_code == 200, f"Failed: {response.text}"
+            during = requests.get(f"{BASE_URL}/api/enterprise-brain/quality", headers=auth_headers).json()["evidences"]
+            step = -1 if original["validated"] else 1
+            assert during["validated_count"] == before["validated_count"] + step
+        finally:
+            requests.patch(
+                f"{BASE_URL}/api/enterprise-brain/document/doc-003",
+                json={"validated": original["validated"], "confidence_score": original["confidence_score"]}, headers=auth_headers
+            )
+        after = requests.get(f"{BASE_URL}/api/enterprise-brain/quality", headers=auth_headers).json()["evidences"]
+        assert after == before
+
+        invalid = requests.patch(
+            f"{BASE_URL}/api/enterprise-brain/document/doc-003", json={"confidence_score": 1.5}, headers=auth_headers
+        )
+        assert invalid.status_code == 400
+
+    def test_import_documents_csv(self, auth_headers):
+        """POST /api/enterprise-brain/sources/{id}/documents/import - Rows are upserted by url, bad rows reported"""
+        body = (
+            "url,title,doc_type,last_updated,confidence_score,validated,owner\n"
+            "https://sharepoint.example.com/test/import-1,TEST Import 1,Guide,2024-03-01T10:00:00Z,0.7,true,QA\n"
+            "https://sharepoint.example.com/test/import-2,\"TEST Import, 2\",Guide,2024-03-02T10:00:00Z,0.4,false,QA\n"
+            "https://sharepoint.example.com/test/import-3,TEST Import 3,Guide,not-a-date,0.4,false,QA\n"
+        )
+        url = f"{BASE_URL}/api/enterprise-brain/sources/source-001/documents/import"
+        headers = {**auth_headers, "Content-Type": "text/csv"}
+        first = requests.post(url, data=body.encode(), params={"batch_size": 2}, headers=headers)
+        assert first.status_code == 200, f"Failed: {first.text}"
+        report = first.json()
+        assert report["rows"] == 3
+        assert report["rejected"] == 1
+        assert report["rejects"][0]["line"] == 4
+        assert len(report["batches"]) == 2
+
+        second = requests.post(url, data=body.encode(), headers=headers).json()
+        assert second["upserted"] == 0
+        documents = requests.get(f"{BASE_URL}/api/enterprise-brain/documents", headers=auth_headers).json()
+        assert sum(1 for d in documents if d["url"].startswith("https://sharepoint.example.com/test/import-")) == 2
+
+        missing = requests.post(f"{BASE_URL}/api/enterprise-brain/sources/missing/documents/import", data=b"", headers=headers)
+        assert missing.status_code == 404
+
+    def test_import_csv_recovers_after_stray_quote(self, auth_headers):
+        """POST /api/enterprise-brain/sources/{id}/documents/import - An unterminated quote rejects its row only"""
+        body = (
+            "url,title,doc_type,last_updated,confidence_score,validated,owner\n"
+            "https://sharepoint.example.com/test/quote-1,TEST Quote 1,Guide,2024-03-01T10:00:00Z,0.7,true,QA\n"
+            "https://sharepoint.example.com/test/quote-2,\"TEST Quote 2,Guide,2024-03-01T10:00:00Z,0.7,true,QA\n"
+            "https://sharepoint.example.com/test/quote-3,TEST Quote 3,Guide,2024-03-01T10:00:00Z,0.7,true,QA\n"
+            "https://sharepoint.example.com/test/quote-4,TEST Quote 4,Guide,2024-03-01T10:00:00Z,0.7,true,QA\n"
+        )
+        response = requests.post(
+            f"{BASE_URL}/api/enterprise-brain/sources/source-001/documents/import",
+            data=body.encode(), headers={**auth_headers, "Content-Type": "text/csv"}
+        )
+        assert response.status_code == 200, f"Failed: {response.text}"
+        report = response.json()
+        assert report["rows"] == 4
+        assert report["rejected"] == 1
+        assert report["rejects"][0]["line"] == 3
+        documents = requests.get(f"{BASE_URL}/api/enterprise-brain/documents", headers=auth_headers).json()
+        imported = {d["url"] for d in documents if d["url"].startswith("https://sharepoint.example.com/test/quote-")}
+        assert imported == {f"https://sharepoint.example.com/test/quote-{n}" for n in (1, 3, 4)}
+
+    def test_quality_history(self, auth_headers):
+        """GET /api/enterprise-brain/quality/history - Daily IQI points, oldest first"""
+        requests.get(f"{BASE_URL}/api/enterprise-brain/quality", headers=auth_headers)
+        response = requests.get(f"{BASE_URL}/api/enterprise-brain/quality/history", params={"days": 30}, headers=auth_headers)
+        assert response.status_code == 200, f"Failed: {response.text}"
+        points = response.json()
+        assert len(points) >= 1
+        assert [p["date"] for p in points] == sorted(p["date"] for p in points)
+
+    def test_rescore_matches_authorization(self, auth_headers):
+        """POST /api/enterprise-brain/rescore - Bulk statuses agree with the per-document decision"""
+        response = requests.post(f"{BASE_URL}/api/enterprise-brain/rescore", headers=auth_headers)
+        assert response.status_code == 200, f"Failed: {response.text}"
+        report = response.json()
+        documents = requests.get(f"{BASE_URL}/api/enterprise-brain/documents", headers=auth_headers).json()
+        assert report["documents"] == len(documents)
+        assert report["authorized"] + report["assisted"] + report["forbidden"] == len(documents)
+
+        authorization = requests.post(
+            f"{BASE_URL}/api/ai/usage/documents", json={"document_ids": [d["id"] for d in documents], "intent": "TEST rescore"}, headers=auth_headers
+        ).json()
+        for status in ["authorized", "assisted", "forbidden"]:
+            assert report[status] == sum(1 for r in authorization["results"] if r["usage_status"] == status)
+
+        quality = requests.get(f"{BASE_URL}/api/enterprise-brain/quality", headers=auth_headers).json()
+        assert abs(report["iqi_mean"] - quality["iqi_global"]) <= 0.01
+
+        again = requests.post(f"{BASE_URL}/api/enterprise-brain/rescore", headers=auth_headers).json()
+        assert again["updated"] == 0
+
+
+class TestAIUsageAuthorization:
+    """AI usage authorization tests"""
+
+    def test_single_document(self, auth_headers):
+        """GET /api/ai/usage/document/{id} - Decision for one document"""
+        response = requests.get(f"{BASE_URL}/api/ai/usage/document/doc-001", headers=auth_headers)
+        assert response.status_code == 200, f"Failed: {response.text}"
+        assert response.json()["usage_status"] in ["authorized", "assisted", "forbidden"]
+
+    def test_batch_matches_single_and_logs(self, auth_headers):
+        """POST /api/ai/usage/documents - Same decisions as the single endpoint, one log entry per check"""
+        before = requests.get(f"{BASE_URL}/api/governance/ai/summary", headers=auth_headers).json()["total_usages"]
+        ids = ["doc-001", "doc-002", "doc-003", "doc-004", "doc-001", "missing-doc"]
+        response = requests.post(
+            f"{BASE_URL}/api/ai/usage/documents", json={"document_ids": ids, "intent": "TEST batch"}, headers=auth_headers
+        )
+        assert response.status_code == 200, f"Failed: {response.text}"
+        data = response.json()
+        assert [r["document_id"] for r in data["results"]] == ["doc-001", "doc-002", "doc-003", "doc-004"]
+        assert data["not_found"] == ["missing-doc"]
+        for result in data["results"]:
+            single = requests.get(f"{BASE_URL}/api/ai/usage/document/{result['document_id']}", headers=auth_headers).json()
+            assert single["usage_status"] == result["usage_status"]
+
+        # Logs go through the buffered writer: they land within a flush interval
+        deadline = time.monotonic() + 5
+        while True:
+            after = requests.get(f"{BASE_URL}/api/governance/ai/summary", headers=auth_headers).json()["total_usages"]
+            if after - before >= 4 or time.monotonic() > deadline:
+                break
+            time.sleep(0.1)
+        assert after - before == 4
+
+        metrics = requests.get(f"{BASE_URL}/api/admin/metrics", headers=auth_headers).json()
+        assert metrics["ai_usage_log_writer"]["flushed"] >= 4
+        assert metrics["ai_usage_log_writer"]["dropped"] == 0
+
+    def test_policy_update_applies_immediately(self, auth_headers):
+        """PUT /api/settings/ai-policy - Cached thresholds are written through"""
+        original = requests.get(f"{BASE_URL}/api/settings/ai-policy", headers=auth_headers).json()
+        try:
+            response = requests.put(
+                f"{BASE_URL}/api/settings/ai-policy",
+                json={"min_iqi_authorized": 0.95, "min_iqi_assisted": 0.60}, headers=auth_headers
+            )
+            assert response.status_code == 200, f"Failed: {response.text}"
+            doc = requests.get(f"{BASE_URL}/api/ai/usage/document/doc-001", headers=auth_headers).json()
+            assert doc["usage_status"] == "assisted"
+        finally:
+            requests.put(f"{BASE_URL}/api/settings/ai-policy", json=original, headers=auth_headers)
+        doc = requests.get(f"{BASE_URL}/api/ai/usage/document/doc-001", headers=auth_headers).json()
+        assert doc["usage_status"] == "authorized"
+
+        metrics = requests.get(f"{BASE_URL}/api/admin/metrics", headers=auth_headers).json()
+        assert metrics["ai_policy_cache"]["hits"] >= 1
+
+    def test_policy_simulation(self, auth_headers):
+        """POST /api/settings/ai-policy/simulate - Counts match the live decisions; a grid is evaluated in one call"""
+        current = requests.get(f"{BASE_URL}/api/settings/ai-policy", headers=auth_headers).json()
+        response = requests.post(
+            f"{BASE_URL}/api/settings/ai-policy/simulate",
+            json={
+                "candidates": [current, {"min_iqi_authorized": 1.0, "min_iqi_assisted": 0.0}],
+                "grid": {"min_iqi_authorized": [0.7, 0.8, 0.9], "min_iqi_assisted": [0.5, 0.8]}
+            },
+            headers=auth_headers
+        )
+        assert response.status_code == 200, f"Failed: {response.text}"
+        data = response.json()
+
+        documents = requests.get(f"{BASE_URL}/api/enterprise-brain/documents", headers=auth_headers).json()
+        decisions = requests.post(
+            f"{BASE_URL}/api/ai/usage/documents", json={"document_ids": [d["id"] for d in documents], "intent": "TEST simulate"}, headers=auth_headers
+        ).json()["results"]
+        assert data["documents"] == len(documents)
+        for status in ["authorized", "assisted", "forbidden"]:
+            assert data["current"][status] == sum(1 for r in decisions if r["usage_status"] == status)
+
+        same, strict, *grid = data["results"]
+        assert same["moved"] == {} and same["authorized"] == data["current"]["authorized"]
+        assert strict["forbidden"] == 0
+        assert strict["authorized"] == sum(1 for d in documents if d["validated"] and d["confidence_score"] >= 1.0)
+        assert [(r["min_iqi_authorized"], r["min_iqi_assisted"]) for r in grid] == [(0.7, 0.5), (0.8, 0.5), (0.8, 0.8), (0.9, 0.5), (0.9, 0.8)]
+        for result in data["results"]:
+            assert result["authorized"] + result["assisted"] + result["forbidden"] == len(documents)
+
+        invalid = requests.post(
+            f"{BASE_URL}/api/settings/ai-policy/simulate",
+            json={"candidates": [{"min_iqi_authorized": 0.5, "min_iqi_assisted": 0.7}]}, headers=auth_headers
+        )
+        assert invalid.status_code == 400
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,126 @@
+# Buffered writer for ai_usage_logs
+#
+# Authorization checks hand their log entries to submit(), which only puts
+# them on a bounded in-process queue. A background task drains the queue and
+# writes each batch with record_usage_logs() (one unordered insert_many plus
+# the rollup bulk_write), as soon as batch_size entries are waiting or
+# flush_interval seconds after the first entry of the batch, whichever comes
+# first.
+#
+# When the queue is full, submit() waits up to put_timeout for room, which
+# slows callers down while the database catches up; entries that still do not
+# fit are dropped and counted rather than stalling the request. stop() flushes
+# everything still queued, so it belongs in the shutdown event before the Mongo
+# client is closed. Entries queued when the process dies are lost.
+
+from typing import Dict, List, Optional
+import asyncio
+import logging
+
+from usage_rollups import record_usage_logs
+
+logger = logging.getLogger(__name__)
+
+
+class UsageLogWriter:
+    def __init__(self, batch_size: int = 500, flush_interval: float = 0.2, max_queue: int = 10000, put_timeout: float = 0.1):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self.submitted = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+
+    async def submit(self, entries: List[dict]) -> int:
+        """Queue log entries for writing; returns how many were accepted"""
+        if self._closed or self._task is None:
+            self.dropped += len(entries)
+            return 0
+        for accepted, entry in enumerate(entries):
+            try:
+                self._queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                try:
+                    await asyncio.wait_for(self._queue.put(entry), self.put_timeout)
+                except asyncio.TimeoutError:
+                    rejected = len(entries) - accepted
+                    self.dropped += rejected
+                    self.submitted += accepted
+                    logger.warning(f"AI usage log queue full: dropped {rejected} entries")
+                    return accepted
+        self.submitted += len(entries)
+        return len(entries)
+
+    async def _collect(self) -> List[dict]:
+        """Next batch: up to batch_size entries, waiting at most flush_interval after the first one"""
+        loop = asyncio.get_running_loop()
+        batch: List[dict] = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                if deadline is None:
+                    deadline = loop.time() + self.flush_interval
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            if self._closed:
+                break
+            timeout = self.flush_interval if deadline is None else deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                if batch:
+                    break
+                continue
+            if deadline is None:
+                deadline = loop.time() + self.flush_interval
+        return batch
+
+    async def _write(self, db, batch: List[dict]):
+        try:
+            await record_usage_logs(db, batch)
+        except Exception as e:
+            self.failed_flushes += 1
+            self.dropped += len(batch)
+            logger.warning(f"AI usage log flush of {len(batch)} entries failed: {e}")
+        else:
+            self.flushes += 1
+            self.flushed += len(batch)
+
+    async def _run(self, db):
+        while not (self._closed and self._queue.empty()):
+            batch = await self._collect()
+            if batch:
+                await self._write(db, batch)
+
+    def start(self, db):
+        if self._task is None:
+            self._closed = False
+            self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self):
+        """Flush what is queued and stop the background task"""
+        if self._task is not None:
+            self._closed = True
+            await self._task
+            self._task = None
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "queued": self._queue.qsize(),
+            "submitted": self.submitted,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": round(self.flush_interval * 1000)
+        }
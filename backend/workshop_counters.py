@@ -0,0 +1,225 @@
+# Power Platform Governance Module - Workshop completion counters
+#
+# Each pp_workshops document carries two denormalized counters:
+#
+#   mandatory_items_remaining  mandatory items of the workshop not done or validated
+#   criteria_unchecked         false values in completion_criteria_state
+#
+# An item write moves the first with $inc when a mandatory item enters or
+# leaves done/validated; a criteria write sets the second along with the new
+# state. A workshop is then completed by one conditional update matching both
+# counters at 0, without reading its items. Each write sees the other's effect
+# atomically on the workshop document, so whichever of the last item and the
+# last criterion lands second completes the workshop.
+#
+# Rebuild or check the counters from the items and criteria:
+#
+#     python workshop_counters.py verify [--program-id ID]
+#     python workshop_counters.py rebuild [--program-id ID]
+
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timezone
+from pathlib import Path
+from pymongo import ReturnDocument, UpdateOne
+import argparse
+import asyncio
+import os
+import sys
+
+from power_platform_seed import MANDATORY_ITEM_IDS_BY_WORKSHOP
+import pp_stats
+
+COMPLETE_ITEM_STATUSES = ["done", "validated"]
+COUNTER_FIELDS = ["mandatory_items_remaining", "criteria_unchecked"]
+
+
+def is_mandatory(item: dict) -> bool:
+    return item.get("item_id") in MANDATORY_ITEM_IDS_BY_WORKSHOP.get(item.get("workshop_number"), frozenset())
+
+
+def counts_as_remaining(item: Optional[dict]) -> int:
+    return int(bool(item) and is_mandatory(item) and item.get("status") not in COMPLETE_ITEM_STATUSES)
+
+
+def count_unchecked(criteria_state: Optional[Dict[str, bool]]) -> int:
+    return sum(1 for checked in (criteria_state or {}).values() if not checked)
+
+
+def initial_counters(workshop: dict, items: List[dict]) -> Dict[str, int]:
+    """Counters for a workshop from its criteria state and the program's items"""
+    return {
+        "mandatory_items_remaining": sum(
+            counts_as_remaining(item) for item in items if item["workshop_number"] == workshop["workshop_number"]
+        ),
+        "criteria_unchecked": count_unchecked(workshop.get("completion_criteria_state"))
+    }
+
+
+def is_ready(workshop: dict) -> bool:
+    """Whether a workshop's counters allow completing it"""
+    return (
+        workshop.get("status") != "completed"
+        and workshop.get("mandatory_items_remaining") == 0
+        and workshop.get("criteria_unchecked") == 0
+    )
+
+
+async def complete_workshop(db, program_id: str, workshop_number: int) -> Optional[dict]:
+    """Mark the workshop completed if its counters are at 0; returns the fields set when this call did"""
+    completion = {"status": "completed", "completed_at": datetime.now(timezone.utc).isoformat()}
+    result = await db.pp_workshops.update_one(
+        {
+            "program_id": program_id,
+            "workshop_number": workshop_number,
+            "status": {"$ne": "completed"},
+            "mandatory_items_remaining": 0,
+            "criteria_unchecked": 0
+        },
+        {"$set": completion}
+    )
+    if not result.modified_count:
+        return None
+    await pp_stats.apply_stats_delta(db, program_id, {"workshops_completed": 1})
+    return completion
+
+
+async def apply_item_change(db, program_id: str, before: dict, after: dict) -> Optional[dict]:
+    """Move the workshop's remaining counter for an item status change, completing it on the last one"""
+    delta = counts_as_remaining(after) - counts_as_remaining(before)
+    if not delta:
+        return None
+    workshop = await db.pp_workshops.find_one_and_update(
+        {"program_id": program_id, "workshop_number": after["workshop_number"]},
+        {"$inc": {"mandatory_items_remaining": delta}},
+        projection={"_id": 0, "status": 1, **{field: 1 for field in COUNTER_FIELDS}},
+        return_document=ReturnDocument.AFTER
+    )
+    if workshop and is_ready(workshop):
+        return await complete_workshop(db, program_id, after["workshop_number"])
+    return None
+
+
+async def apply_item_changes(db, program_id: str, changes: List[tuple]) -> Dict[int, dict]:
+    """Counter moves for many (before, after) item pairs: one bulk $inc, then one completion
+    attempt per workshop left ready. Returns {workshop_number: fields set} for those completed."""
+    deltas: Dict[int, int] = {}
+    for before, after in changes:
+        delta = counts_as_remaining(after) - counts_as_remaining(before)
+        if delta:
+            deltas[after["workshop_number"]] = deltas.get(after["workshop_number"], 0) + delta
+    deltas = {number: delta for number, delta in deltas.items() if delta}
+    if not deltas:
+        return {}
+    await db.pp_workshops.bulk_write([
+        UpdateOne({"program_id": program_id, "workshop_number": number}, {"$inc": {"mandatory_items_remaining": delta}})
+        for number, delta in deltas.items()
+    ], ordered=False)
+
+    decreased = [number for number, delta in deltas.items() if delta < 0]
+    if not decreased:
+        return {}
+    ready = await db.pp_workshops.find(
+        {"program_id": program_id, "workshop_number": {"$in": decreased}, "status": {"$ne": "completed"},
+         "mandatory_items_remaining": 0, "criteria_unchecked": 0},
+        {"_id": 0, "workshop_number": 1}
+    ).to_list(None)
+    completed = {}
+    for workshop in ready:
+        completion = await complete_workshop(db, program_id, workshop["workshop_number"])
+        if completion:
+            completed[workshop["workshop_number"]] = completion
+    return completed
+
+
+# ============== Consistency ==============
+
+async def compute_counters(db, program_id: str) -> Dict[int, Dict[str, int]]:
+    """Recompute every workshop's counters from the items and criteria: {workshop_number: counters}"""
+    items = await db.pp_item_instances.find(
+        {"program_id": program_id}, {"_id": 0, "item_id": 1, "workshop_number": 1, "status": 1}
+    ).to_list(None)
+    workshops = await db.pp_workshops.find(
+        {"program_id": program_id}, {"_id": 0, "workshop_number": 1, "completion_criteria_state": 1}
+    ).to_list(None)
+    return {workshop["workshop_number"]: initial_counters(workshop, items) for workshop in workshops}
+
+
+async def rebuild_counters(db, program_id: str) -> Dict[int, Dict[str, int]]:
+    counters = await compute_counters(db, program_id)
+    if counters:
+        await db.pp_workshops.bulk_write([
+            UpdateOne({"program_id": program_id, "workshop_number": number}, {"$set": values})
+            for number, values in counters.items()
+        ], ordered=False)
+    return counters
+
+
+async def verify_counters(db, program_id: str) -> Dict[int, Dict[str, Dict[str, Any]]]:
+    """Compare stored counters with a recomputation; returns {workshop_number: {field: {stored, actual}}} for drifted ones"""
+    actual = await compute_counters(db, program_id)
+    stored = {
+        w["workshop_number"]: w for w in await db.pp_workshops.find(
+            {"program_id": program_id}, {"_id": 0, "workshop_number": 1, **{field: 1 for field in COUNTER_FIELDS}}
+        ).to_list(None)
+    }
+    drift = {}
+    for number, values in actual.items():
+        fields = {
+            field: {"stored": stored.get(number, {}).get(field), "actual": value}
+            for field, value in values.items() if stored.get(number, {}).get(field) != value
+        }
+        if fields:
+            drift[number] = fields
+    return drift
+
+
+async def ensure_counters(db) -> int:
+    """Build the counters of workshops created before they existed; returns the number of programs updated"""
+    program_ids = await db.pp_workshops.distinct("program_id", {"mandatory_items_remaining": {"$exists": False}})
+    for program_id in program_ids:
+        await rebuild_counters(db, program_id)
+    return len(program_ids)
+
+
+# ============== Command line ==============
+
+async def _run(command: str, program_id: Optional[str]) -> int:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        if program_id:
+            program_ids = [program_id]
+        else:
+            program_ids = [p["id"] async for p in db.pp_programs.find({}, {"_id": 0, "id": 1})]
+
+        drifted = 0
+        for pid in program_ids:
+            drift = await verify_counters(db, pid)
+            if drift:
+                drifted += 1
+                for number, fields in sorted(drift.items()):
+                    for field, values in fields.items():
+                        print(f"{pid}  workshop {number}  {field}: stored={values['stored']} actual={values['actual']}")
+            if command == "rebuild":
+                await rebuild_counters(db, pid)
+        action = "rebuilt" if command == "rebuild" else "checked"
+        print(f"{len(program_ids)} program(s) {action}, {drifted} with drift")
+        return 1 if command == "verify" and drifted else 0
+    finally:
+        client.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Verify or rebuild the pp_workshops completion counters")
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    parser.add_argument("--program-id", help="limit to one program (default: all programs)")
+    args = parser.parse_args(argv)
+    return asyncio.run(_run(args.command, args.program_id))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,8 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from typing import Optional
+from .usage_rollups import record_usage_logs
+from .iqi import apply_document_changes
 
 class Database:
     client: Optional[AsyncIOMotorClient] = None
@@ -131,7 +133,9 @@ async def seed_database():
             "owner": "Sophie Bernard"
         },
     ]
-    await database.knowledge_documents.insert_many(documents)
+    # Copies: insert_many adds an _id to each document it is given
+    await database.knowledge_documents.insert_many([dict(d) for d in documents])
+    await apply_document_changes(database, demo_tenant_id, [(None, d) for d in documents])
     
     # Seed AI usage logs
     ai_usage_logs = [
@@ -140,17 +144,16 @@ async def seed_database():
         {"tenant_id": demo_tenant_id, "document_id": "doc-003", "decision": "authorized", "checked_at": "2024-01-15T10:00:00Z", "intent": "Formation utilisateur"},
         {"tenant_id": demo_tenant_id, "document_id": "doc-004", "decision": "forbidden", "checked_at": "2024-01-15T11:00:00Z", "intent": "Rédaction rapport"},
     ]
-    await database.ai_usage_logs.insert_many(ai_usage_logs)
+    await record_usage_logs(database, ai_usage_logs)
     
     # Seed demo user
-    from passlib.context import CryptContext
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    from .security import get_password_hash, run_password_task
     
     await database.users.insert_one({
         "id": "user-001",
         "username": "demo@bizdesk365.local",
         "email": "demo@bizdesk365.local",
-        "password_hash": pwd_context.hash("demo"),
+        "password_hash": await run_password_task(get_password_hash, "demo"),
         "tenant_id": demo_tenant_id,
         "roles": ["admin", "user"]
     })
@@ -0,0 +1,108 @@
+# Index registry for the MongoDB collections used by the API
+#
+# Every tenant/program-scoped query filters on tenant_id or program_id first, so
+# each collection declares the compound indexes its queries need here.
+# ensure_indexes() applies the registry at startup; creating an index that
+# already exists with the same keys and options is a no-op, so it is safe to run
+# on every boot. index_report() backs the admin endpoint that lists missing,
+# unused and unregistered indexes.
+
+from typing import Dict, List, NamedTuple, Tuple
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class IndexSpec(NamedTuple):
+    collection: str
+    keys: Tuple[Tuple[str, int], ...]
+    unique: bool = False
+
+    @property
+    def name(self) -> str:
+        # Same naming scheme as MongoDB's default index names
+        return "_".join(f"{field}_{direction}" for field, direction in self.keys)
+
+
+INDEXES: List[IndexSpec] = [
+    IndexSpec("tenants", (("id", 1),), unique=True),
+    IndexSpec("users", (("email", 1),), unique=True),
+    IndexSpec("compliance_kpis", (("tenant_id", 1),)),
+    IndexSpec("tenant_iso_profiles", (("tenant_id", 1), ("iso_code", 1)), unique=True),
+    IndexSpec("ai_usage_policies", (("tenant_id", 1),), unique=True),
+    IndexSpec("ai_usage_policies", (("updated_at", 1),)),
+    IndexSpec("knowledge_sources", (("tenant_id", 1), ("id", 1)), unique=True),
+    IndexSpec("knowledge_documents", (("tenant_id", 1), ("id", 1)), unique=True),
+    IndexSpec("knowledge_documents", (("tenant_id", 1), ("source_id", 1), ("url", 1)), unique=True),
+    IndexSpec("iqi_snapshots", (("tenant_id", 1),), unique=True),
+    IndexSpec("iqi_history", (("tenant_id", 1), ("date", 1)), unique=True),
+    IndexSpec("ai_usage_logs", (("tenant_id", 1), ("checked_at", 1))),
+    IndexSpec(
+        "ai_usage_rollups",
+        (("tenant_id", 1), ("granularity", 1), ("bucket_start", 1), ("decision", 1), ("document_id", 1)),
+        unique=True
+    ),
+]
+
+
+def _by_collection(specs: List[IndexSpec]) -> Dict[str, List[IndexSpec]]:
+    grouped: Dict[str, List[IndexSpec]] = {}
+    for spec in specs:
+        grouped.setdefault(spec.collection, []).append(spec)
+    return grouped
+
+
+async def ensure_indexes(db, specs: List[IndexSpec] = INDEXES) -> Dict[str, List[str]]:
+    """Create the registered indexes; returns the index names created or confirmed per collection.
+
+    A conflicting index (same keys, other options) or duplicate data under a
+    unique index is logged and skipped so that startup is never blocked.
+    """
+    applied: Dict[str, List[str]] = {}
+    for collection, collection_specs in _by_collection(specs).items():
+        for spec in collection_specs:
+            model = IndexModel(list(spec.keys), name=spec.name, unique=spec.unique)
+            try:
+                await db[collection].create_indexes([model])
+            except OperationFailure as e:
+                logger.warning(f"Index {collection}.{spec.name} not created: {e}")
+                continue
+            applied.setdefault(collection, []).append(spec.name)
+    return applied
+
+
+async def _index_usage(collection) -> Dict[str, int]:
+    """Operations served by each index since the mongod started, when $indexStats is available"""
+    try:
+        stats = await collection.aggregate([{"$indexStats": {}}]).to_list(None)
+    except (OperationFailure, NotImplementedError):
+        return {}
+    return {s["name"]: s["accesses"]["ops"] for s in stats}
+
+
+async def index_report(db, specs: List[IndexSpec] = INDEXES) -> Dict[str, dict]:
+    """Compare the registry with the live database.
+
+    Per collection: registered indexes that are missing, indexes with no recorded
+    use, and indexes present in the database but absent from the registry.
+    """
+    grouped = _by_collection(specs)
+    report: Dict[str, dict] = {}
+    for collection in sorted(set(grouped) | set(await db.list_collection_names())):
+        existing = await db[collection].index_information()
+        existing_keys = {name: tuple((f, int(d)) for f, d in info["key"]) for name, info in existing.items()}
+        registered = grouped.get(collection, [])
+        registered_keys = {spec.keys for spec in registered}
+        usage = await _index_usage(db[collection])
+
+        report[collection] = {
+            "missing": [spec.name for spec in registered if spec.keys not in existing_keys.values()],
+            "unused": sorted(name for name, ops in usage.items() if ops == 0 and name != "_id_"),
+            "unregistered": sorted(
+                name for name, keys in existing_keys.items() if name != "_id_" and keys not in registered_keys
+            ),
+            "usage_available": bool(usage)
+        }
+    return report
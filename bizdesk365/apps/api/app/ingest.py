@@ -0,0 +1,338 @@
+# Bulk ingestion of knowledge_documents from source inventories
+#
+# Reads an NDJSON or CSV export (e.g. a SharePoint inventory) as a stream of
+# byte chunks, validates rows in batches of batch_size and upserts each batch
+# with one unordered bulk_write keyed on (tenant_id, source_id, url). Only the
+# current batch and the one being written are held in memory, so files larger
+# than memory go through. Parsing of the next batch overlaps the write of the
+# previous one.
+#
+# The IQI snapshot of the tenant is recomputed once at the end rather than
+# per row, since an upsert does not tell what the document looked like before.
+#
+#     python -m app.ingest --tenant-id T --source-id S inventory.csv [--format csv] [--batch-size 1000]
+
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+
+from . import iqi
+
+logger = logging.getLogger(__name__)
+
+INGEST_FORMATS = ["ndjson", "csv"]
+DEFAULT_BATCH_SIZE = 1000
+MAX_BATCH_SIZE = 10000
+# Rejected rows beyond this many are counted but not listed in the report
+MAX_REPORTED_REJECTS = 100
+READ_CHUNK_SIZE = 64 * 1024
+# A quoted CSV field may span lines, up to these bounds; beyond them the quote
+# is taken as unterminated and parsing resumes on the record's second line
+MAX_RECORD_LINES = 1000
+MAX_RECORD_BYTES = 1024 * 1024
+
+TRUE_VALUES = {"true", "1", "yes", "oui", "y"}
+FALSE_VALUES = {"false", "0", "no", "non", "n", ""}
+
+
+class RowError(ValueError):
+    """A row that cannot be ingested; the message is reported to the caller."""
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream into decoded lines without their line terminators"""
+    pending = b""
+    first = True
+    async for chunk in chunks:
+        if first:
+            chunk = chunk.removeprefix(b"\xef\xbb\xbf")
+            first = False
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r").decode("utf-8", errors="replace")
+    if pending:
+        yield pending.rstrip(b"\r").decode("utf-8", errors="replace")
+
+
+async def iter_records(lines: AsyncIterator[str], fmt: str) -> AsyncIterator[Tuple[int, Any]]:
+    """(line number, dict or RowError) for each record of an NDJSON or CSV stream"""
+    line_no = 0
+    if fmt == "ndjson":
+        async for line in lines:
+            line_no += 1
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_no, RowError(f"JSON invalide: {e}")
+                continue
+            yield line_no, row if isinstance(row, dict) else RowError("La ligne doit être un objet JSON")
+        return
+
+    header: Optional[List[str]] = None
+    # Lines of the record being read, and lines to read again after an unterminated quote
+    record: List[Tuple[int, str]] = []
+    replay: Deque[Tuple[int, str]] = deque()
+    quotes = size = 0
+    source = lines.__aiter__()
+    exhausted = False
+    while True:
+        if replay:
+            number, line = replay.popleft()
+        elif not exhausted:
+            try:
+                line = await source.__anext__()
+            except StopAsyncIteration:
+                exhausted = True
+                continue
+            line_no += 1
+            number = line_no
+        elif record:
+            # End of file inside a quoted field
+            yield record[0][0], RowError("Guillemet non fermé en fin de fichier")
+            replay.extend(record[1:])
+            record, quotes, size = [], 0, 0
+            continue
+        else:
+            break
+
+        record.append((number, line))
+        quotes += line.count('"')
+        size += len(line) + 1
+        # A quoted field may span lines: the record is complete once its quotes are balanced
+        if quotes % 2:
+            if len(record) >= MAX_RECORD_LINES or size > MAX_RECORD_BYTES:
+                yield record[0][0], RowError("Guillemet non fermé: enregistrement trop long")
+                replay.extendleft(reversed(record[1:]))
+                record, quotes, size = [], 0, 0
+            continue
+        text, start = "\n".join(l for _, l in record), record[0][0]
+        record, quotes, size = [], 0, 0
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [h.strip() for h in values]
+            continue
+        if len(values) != len(header):
+            yield start, RowError(f"{len(values)} colonnes au lieu de {len(header)}")
+            continue
+        yield start, dict(zip(header, values))
+
+
+def _parse_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise RowError(f"validated invalide: {value!r}")
+
+
+def validate_row(row: dict) -> dict:
+    """Normalize one inventory row into the knowledge_documents fields it sets"""
+    url = str(row.get("url") or "").strip()
+    title = str(row.get("title") or "").strip()
+    if not url:
+        raise RowError("url manquante")
+    if not title:
+        raise RowError("title manquant")
+
+    try:
+        confidence_score = float(row.get("confidence_score", 0) or 0)
+    except (TypeError, ValueError):
+        raise RowError(f"confidence_score invalide: {row.get('confidence_score')!r}")
+    if not 0 <= confidence_score <= 1:
+        raise RowError("confidence_score doit être compris entre 0 et 1")
+
+    last_updated = iqi.parse_timestamp(str(row.get("last_updated") or ""))
+    if last_updated is None:
+        raise RowError(f"last_updated invalide: {row.get('last_updated')!r}")
+
+    return {
+        "url": url,
+        "title": title,
+        "doc_type": str(row.get("doc_type") or "Document").strip(),
+        "owner": str(row.get("owner") or "").strip(),
+        # Same UTC second-precision format as the rest of the collection
+        "last_updated": last_updated.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "confidence_score": confidence_score,
+        "validated": _parse_bool(row.get("validated", False))
+    }
+
+
+class IngestReport:
+    def __init__(self):
+        self.batches: List[dict] = []
+        self.rejects: List[dict] = []
+        self.rows = 0
+        self.rejected = 0
+        self.upserted = 0
+        self.modified = 0
+        self.started = time.perf_counter()
+
+    def reject(self, line: int, error: str):
+        self.rejected += 1
+        if len(self.rejects) < MAX_REPORTED_REJECTS:
+            self.rejects.append({"line": line, "error": error})
+
+    def as_dict(self) -> dict:
+        seconds = time.perf_counter() - self.started
+        return {
+            "rows": self.rows,
+            "upserted": self.upserted,
+            "modified": self.modified,
+            "rejected": self.rejected,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(self.rows / seconds, 1) if seconds > 0 else 0.0,
+            "batches": self.batches,
+            "rejects": self.rejects
+        }
+
+
+async def _write_batch(db, tenant_id: str, source_id: str, number: int, rows: List[Tuple[int, dict]], rejected: int, report: IngestReport):
+    started = time.perf_counter()
+    now = datetime.now(timezone.utc).isoformat()
+    operations = [
+        UpdateOne(
+            {"tenant_id": tenant_id, "source_id": source_id, "url": fields["url"]},
+            {"$set": {**fields, "ingested_at": now}, "$setOnInsert": {"id": str(uuid.uuid4())}},
+            upsert=True
+        )
+        for _, fields in rows
+    ]
+    upserted = modified = failed = 0
+    if operations:
+        try:
+            result = await db.knowledge_documents.bulk_write(operations, ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+            for error in details.get("writeErrors", []):
+                report.reject(rows[error["index"]][0], error.get("errmsg", "erreur d'écriture"))
+            failed = len(details.get("writeErrors", []))
+        upserted, modified = details.get("nUpserted", 0), details.get("nModified", 0)
+
+    seconds = time.perf_counter() - started
+    report.upserted += upserted
+    report.modified += modified
+    report.batches.append({
+        "batch": number,
+        "rows": len(rows) + rejected,
+        "upserted": upserted,
+        "modified": modified,
+        "rejected": rejected + failed,
+        "write_seconds": round(seconds, 3),
+        "rows_per_second": round(len(rows) / seconds, 1) if seconds > 0 else 0.0
+    })
+    logger.info(f"Ingest {tenant_id}/{source_id} batch {number}: {len(rows)} rows in {seconds:.3f}s, {rejected + failed} rejected")
+
+
+async def ingest_documents(
+    db, tenant_id: str, source_id: str, chunks: AsyncIterator[bytes], fmt: str, batch_size: int = DEFAULT_BATCH_SIZE
+) -> dict:
+    """Validate and upsert the rows of a byte stream; returns the ingestion report"""
+    report = IngestReport()
+    batch: Dict[str, Tuple[int, dict]] = {}
+    batch_rejected = 0
+    number = 0
+    pending_write: Optional[asyncio.Task] = None
+
+    async def flush():
+        nonlocal batch, batch_rejected, number, pending_write
+        rows, rejected = list(batch.values()), batch_rejected
+        batch, batch_rejected = {}, 0
+        number += 1
+        # At most one write in flight: parsing the next batch overlaps it
+        if pending_write:
+            await pending_write
+        pending_write = asyncio.create_task(_write_batch(db, tenant_id, source_id, number, rows, rejected, report))
+
+    try:
+        async for line, row in iter_records(iter_lines(chunks), fmt):
+            report.rows += 1
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                fields = validate_row(row)
+            except RowError as e:
+                report.reject(line, str(e))
+                batch_rejected += 1
+            else:
+                if fields["url"] in batch:
+                    # The later row wins; one upsert per key keeps the unordered batch free of races
+                    report.reject(batch[fields["url"]][0], f"url en double, remplacée par la ligne {line}")
+                    batch_rejected += 1
+                batch[fields["url"]] = (line, fields)
+            if len(batch) + batch_rejected >= batch_size:
+                await flush()
+        if batch or batch_rejected:
+            await flush()
+    finally:
+        if pending_write:
+            await pending_write
+
+    if report.upserted or report.modified:
+        await iqi.rebuild_snapshot(db, tenant_id)
+    return report.as_dict()
+
+
+# ============== Command line ==============
+
+async def _read_file(path: str) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        while chunk := await asyncio.to_thread(f.read, READ_CHUNK_SIZE):
+            yield chunk
+
+
+async def _run(path: str, tenant_id: str, source_id: str, fmt: str, batch_size: int) -> int:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent.parent / '.env')
+    client = AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    db = client[os.environ.get("DB_NAME", "bizdesk365")]
+    try:
+        report = await ingest_documents(db, tenant_id, source_id, _read_file(path), fmt, batch_size)
+    finally:
+        client.close()
+    for batch in report["batches"]:
+        print(f"batch {batch['batch']:>5}  {batch['rows']:>6} rows  {batch['rejected']:>5} rejected  {batch['rows_per_second']:>10} rows/s")
+    for reject in report["rejects"]:
+        print(f"line {reject['line']}: {reject['error']}")
+    print(f"{report['rows']} rows, {report['upserted']} inserted, {report['modified']} updated, "
+          f"{report['rejected']} rejected in {report['seconds']}s ({report['rows_per_second']} rows/s)")
+    return 1 if report["rejected"] else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Upsert knowledge_documents from an NDJSON or CSV inventory")
+    parser.add_argument("path")
+    parser.add_argument("--tenant-id", required=True)
+    parser.add_argument("--source-id", required=True)
+    parser.add_argument("--format", choices=INGEST_FORMATS, help="default: from the file extension")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    logging.basicConfig(level=logging.WARNING)
+    return asyncio.run(_run(args.path, args.tenant_id, args.source_id, fmt, min(args.batch_size, MAX_BATCH_SIZE)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
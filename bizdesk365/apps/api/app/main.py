@@ -11,13 +11,22 @@ ROOT_DIR = Path(__file__).parent.parent
 load_dotenv(ROOT_DIR / '.env')
 
 from app.db import connect_to_mongo, close_mongo_connection, get_database, seed_database
+from app.indexes import ensure_indexes, index_report
 from app.security import (
     get_current_user, 
+    require_admin,
     UserInDB, 
     create_access_token, 
     verify_password,
+    run_password_task,
+    password_pool,
     Token
 )
+from app.policy_cache import policy_cache
+from app.policy_simulation import score_snapshots
+from app.usage_log_writer import usage_log_writer
+from app.usage_rollups import ensure_rollups
+from app.iqi import run_daily_sweep
 from app.modules.registry import get_enabled_modules, Module
 from app.modules.compliance import router as compliance_router
 from app.modules.enterprise_brain import router as eb_router, ai_router
@@ -26,6 +35,10 @@ from app.modules.settings import router as settings_router
 from app.modules.power_platform import router as pp_router
 
 from datetime import timedelta
+import asyncio
+
+# The IQI sweep checks this often for tenants not yet swept today; 0 disables it
+IQI_SWEEP_CHECK_SECONDS = float(os.environ.get("IQI_SWEEP_CHECK_SECONDS", "3600"))
 
 # Create FastAPI app
 app = FastAPI(
@@ -73,7 +86,7 @@ async def login(request: LoginRequest):
         {"_id": 0}
     )
     
-    if not user or not verify_password(request.password, user.get("password_hash", "")):
+    if not user or not await run_password_task(verify_password, request.password, user.get("password_hash", "")):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email ou mot de passe incorrect",
@@ -103,6 +116,21 @@ async def get_current_user_info(current_user: UserInDB = Depends(get_current_use
         roles=current_user.roles
     )
 
+@api_router.get("/admin/metrics")
+async def get_admin_metrics(current_user: UserInDB = Depends(require_admin)):
+    """Runtime counters for the in-process pools and caches"""
+    return {
+        "password_pool": password_pool.stats(),
+        "ai_policy_cache": policy_cache.stats(),
+        "ai_policy_simulation": score_snapshots.stats(),
+        "ai_usage_log_writer": usage_log_writer.stats()
+    }
+
+@api_router.get("/admin/indexes")
+async def get_admin_indexes(current_user: UserInDB = Depends(require_admin)):
+    """Registered indexes missing from the database, unused indexes and unregistered ones"""
+    return await index_report(await get_database())
+
 @api_router.get("/modules", response_model=List[Module])
 async def get_modules(current_user: UserInDB = Depends(get_current_user)):
     """Get enabled modules for the current tenant"""
@@ -120,11 +148,24 @@ api_router.include_router(pp_router)
 app.include_router(api_router)
 
 # Startup and shutdown events
+background_tasks: List[asyncio.Task] = []
+
 @app.on_event("startup")
 async def startup():
     await connect_to_mongo()
+    await ensure_indexes(await get_database())
     await seed_database()
+    await ensure_rollups(await get_database())
+    policy_cache.start(await get_database())
+    usage_log_writer.start(await get_database())
+    if IQI_SWEEP_CHECK_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(run_daily_sweep(await get_database(), IQI_SWEEP_CHECK_SECONDS)))
 
 @app.on_event("shutdown")
 async def shutdown():
+    for task in background_tasks:
+        task.cancel()
+    await policy_cache.stop()
+    await usage_log_writer.stop()
+    password_pool.shutdown()
     await close_mongo_connection()
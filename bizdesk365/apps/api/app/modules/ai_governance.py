@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends
-from typing import Dict, Any, List
+from fastapi import APIRouter, Depends, Query
+from typing import Dict, Any, List, Optional
+from datetime import datetime
 from pydantic import BaseModel
 from ..security import get_current_user, get_tenant_id, UserInDB
 from ..db import get_database
+from .. import usage_rollups
 
 router = APIRouter(prefix="/governance/ai", tags=["AI Governance"])
 
@@ -20,21 +22,46 @@ class GovernanceSummary(BaseModel):
     critical_actions: List[CriticalAction]
     traceability: Dict[str, int]
 
+class UsageBucket(BaseModel):
+    bucket_start: str
+    authorized: int
+    assisted: int
+    forbidden: int
+    total: int
+
+class GovernanceTimeseries(BaseModel):
+    granularity: str
+    buckets: List[UsageBucket]
+
+def usage_log_query(tenant_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> dict:
+    """Filter on a tenant's usage logs, optionally restricted to [start, end)"""
+    query = {"tenant_id": tenant_id}
+    window = {}
+    if start:
+        window["$gte"] = usage_rollups.format_timestamp(start)
+    if end:
+        window["$lt"] = usage_rollups.format_timestamp(end)
+    if window:
+        query["checked_at"] = window
+    return query
+
 @router.get("/summary", response_model=GovernanceSummary)
 async def get_governance_summary(
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
     tenant_id: str = Depends(get_tenant_id),
     current_user: UserInDB = Depends(get_current_user)
 ):
     """Get executive AI governance summary"""
     database = await get_database()
     
-    # Get all AI usage logs for tenant
-    usage_logs = await database.ai_usage_logs.find(
-        {"tenant_id": tenant_id},
-        {"_id": 0}
-    ).to_list(10000)
+    # Count AI usage logs by decision type
+    counts = {row["_id"]: row["count"] async for row in database.ai_usage_logs.aggregate([
+        {"$match": usage_log_query(tenant_id, start, end)},
+        {"$group": {"_id": "$decision", "count": {"$sum": 1}}}
+    ])}
     
-    total = len(usage_logs)
+    total = sum(counts.values())
     
     if total == 0:
         return GovernanceSummary(
@@ -46,10 +73,9 @@ async def get_governance_summary(
             traceability={"logged": 0, "audited": 0, "anomalies": 0}
         )
     
-    # Count by decision type
-    authorized = sum(1 for log in usage_logs if log.get("decision") == "authorized")
-    assisted = sum(1 for log in usage_logs if log.get("decision") == "assisted")
-    forbidden = sum(1 for log in usage_logs if log.get("decision") == "forbidden")
+    authorized = counts.get("authorized", 0)
+    assisted = counts.get("assisted", 0)
+    forbidden = counts.get("forbidden", 0)
     
     # Calculate percentages
     authorized_pct = round((authorized / total) * 100, 1)
@@ -93,3 +119,19 @@ async def get_governance_summary(
         critical_actions=critical_actions,
         traceability=traceability
     )
+
+@router.get("/timeseries", response_model=GovernanceTimeseries)
+async def get_governance_timeseries(
+    granularity: str = Query("day", pattern="^(hour|day)$"),
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    document_id: Optional[str] = None,
+    tenant_id: str = Depends(get_tenant_id),
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """Get AI usage decision counts per hour or day"""
+    database = await get_database()
+    
+    buckets = await usage_rollups.timeseries(database, tenant_id, granularity, start, end, document_id)
+    
+    return GovernanceTimeseries(granularity=granularity, buckets=buckets)
@@ -1,8 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
-from ..security import get_current_user, get_tenant_id, UserInDB
+from ..security import get_current_user, get_tenant_id, require_admin, UserInDB
 from ..db import get_database
+from ..usage_rollups import format_timestamp
+from ..usage_log_writer import usage_log_writer
+from ..policy_cache import policy_cache
+from .. import iqi
+from ..rescoring import rescore_tenant
+from ..ingest import ingest_documents, INGEST_FORMATS, DEFAULT_BATCH_SIZE, MAX_BATCH_SIZE
+from datetime import datetime, timezone
+import asyncio
+import os
 
 router = APIRouter(prefix="/enterprise-brain", tags=["Enterprise Brain"])
 
@@ -24,6 +33,20 @@ class DocumentDetail(Document):
     source_id: str
     tenant_id: str
 
+class DocumentUpdate(BaseModel):
+    validated: Optional[bool] = None
+    confidence_score: Optional[float] = None
+
+class IQIHistoryPoint(BaseModel):
+    date: str
+    iqi_global: float
+    total_documents: int
+    validated_count: int
+    validation_rate: float = 0.0
+    avg_confidence: float
+    freshness_score: float
+    fresh_documents: int = 0
+
 class AIUsageResponse(BaseModel):
     document_id: str
     document_title: str
@@ -31,6 +54,14 @@ class AIUsageResponse(BaseModel):
     iqi_score: float
     reason: str
 
+class AIUsageBatchRequest(BaseModel):
+    document_ids: List[str]
+    intent: Optional[str] = None
+
+class AIUsageBatchResponse(BaseModel):
+    results: List[AIUsageResponse]
+    not_found: List[str]
+
 @router.get("/quality", response_model=QualityResponse)
 async def get_quality_metrics(
     tenant_id: str = Depends(get_tenant_id),
@@ -39,58 +70,19 @@ async def get_quality_metrics(
     """Get Information Quality Index (IQI) global score and breakdown"""
     database = await get_database()
     
-    # Get all documents for tenant
-    documents = await database.knowledge_documents.find(
-        {"tenant_id": tenant_id},
-        {"_id": 0}
-    ).to_list(1000)
-    
-    if not documents:
-        return QualityResponse(
-            iqi_global=0.0,
-            evidences={
-                "total_documents": 0,
-                "validated_count": 0,
-                "avg_confidence": 0.0,
-                "freshness_score": 0.0
-            }
-        )
+    # Single read of the tenant's materialized IQI snapshot
+    return QualityResponse(**await iqi.get_quality(database, tenant_id))
+
+@router.get("/quality/history", response_model=List[IQIHistoryPoint])
+async def get_quality_history(
+    days: int = Query(90, ge=1, le=730),
+    tenant_id: str = Depends(get_tenant_id),
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """Get the daily IQI recorded by the sweep, oldest first"""
+    database = await get_database()
     
-    # Calculate IQI components
-    total = len(documents)
-    validated = sum(1 for d in documents if d.get("validated", False))
-    avg_confidence = sum(d.get("confidence_score", 0) for d in documents) / total
-    
-    # Calculate freshness (simplified: based on last_updated dates)
-    from datetime import datetime, timezone
-    now = datetime.now(timezone.utc)
-    fresh_count = 0
-    for doc in documents:
-        try:
-            last_updated = datetime.fromisoformat(doc["last_updated"].replace("Z", "+00:00"))
-            days_old = (now - last_updated).days
-            if days_old < 90:  # Less than 90 days old = fresh
-                fresh_count += 1
-        except:
-            pass
-    
-    freshness_score = fresh_count / total if total > 0 else 0
-    
-    # IQI = weighted combination
-    validation_score = validated / total if total > 0 else 0
-    iqi_global = (validation_score * 0.3) + (avg_confidence * 0.5) + (freshness_score * 0.2)
-    
-    return QualityResponse(
-        iqi_global=round(iqi_global, 2),
-        evidences={
-            "total_documents": total,
-            "validated_count": validated,
-            "validation_rate": round(validation_score * 100, 1),
-            "avg_confidence": round(avg_confidence * 100, 1),
-            "freshness_score": round(freshness_score * 100, 1),
-            "fresh_documents": fresh_count
-        }
-    )
+    return await iqi.get_history(database, tenant_id, days)
 
 @router.get("/documents", response_model=List[Document])
 async def get_documents(
@@ -126,36 +118,85 @@ async def get_document(
     
     return document
 
-# AI Usage endpoint (under /api prefix but related to documents)
-ai_router = APIRouter(prefix="/ai", tags=["AI"])
-
-@ai_router.get("/usage/document/{document_id}", response_model=AIUsageResponse)
-async def get_ai_usage_for_document(
+@router.patch("/document/{document_id}", response_model=DocumentDetail)
+async def update_document(
     document_id: str,
+    update: DocumentUpdate,
     tenant_id: str = Depends(get_tenant_id),
     current_user: UserInDB = Depends(get_current_user)
 ):
-    """Get AI usage authorization status for a document"""
+    """Validate or re-score a document"""
     database = await get_database()
     
-    # Get document
-    document = await database.knowledge_documents.find_one(
+    update_data = update.model_dump(exclude_none=True)
+    if not update_data:
+        raise HTTPException(status_code=400, detail="Aucune modification")
+    
+    if "confidence_score" in update_data and not (0 <= update_data["confidence_score"] <= 1):
+        raise HTTPException(
+            status_code=400,
+            detail="Le score de confiance doit être compris entre 0 et 1"
+        )
+    
+    before = await database.knowledge_documents.find_one_and_update(
         {"id": document_id, "tenant_id": tenant_id},
-        {"_id": 0}
+        {"$set": update_data},
+        projection={"_id": 0}
     )
     
-    if not document:
+    if not before:
         raise HTTPException(status_code=404, detail="Document non trouvé")
     
-    # Get AI policy thresholds
-    policy = await database.ai_usage_policies.find_one(
-        {"tenant_id": tenant_id},
-        {"_id": 0}
+    # Keep the IQI snapshot in step with the change
+    after = {**before, **update_data}
+    await iqi.apply_document_changes(database, tenant_id, [(before, after)])
+    
+    return after
+
+@router.post("/sources/{source_id}/documents/import")
+async def import_documents(
+    source_id: str,
+    request: Request,
+    format: Optional[str] = None,
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=MAX_BATCH_SIZE),
+    current_user: UserInDB = Depends(require_admin)
+):
+    """Upsert a source's documents from a streamed NDJSON or CSV inventory"""
+    database = await get_database()
+    
+    fmt = format or ("csv" if request.headers.get("content-type", "").startswith("text/csv") else "ndjson")
+    if fmt not in INGEST_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail="Format d'import non supporté (ndjson ou csv)"
+        )
+    
+    source = await database.knowledge_sources.find_one(
+        {"id": source_id, "tenant_id": current_user.tenant_id},
+        {"_id": 1}
     )
     
-    if not policy:
-        policy = {"min_iqi_authorized": 0.80, "min_iqi_assisted": 0.60}
+    if not source:
+        raise HTTPException(status_code=404, detail="Source non trouvée")
     
+    # The body is read chunk by chunk, so the inventory never has to fit in memory
+    return await ingest_documents(database, current_user.tenant_id, source_id, request.stream(), fmt, batch_size)
+
+@router.post("/rescore")
+async def rescore_documents(current_user: UserInDB = Depends(require_admin)):
+    """Recompute every document's iqi_score and usage_status for the tenant's current thresholds"""
+    database = await get_database()
+    policy = await get_ai_policy_thresholds(database, current_user.tenant_id)
+    return await rescore_tenant(database, current_user.tenant_id, policy)
+
+# AI Usage endpoint (under /api prefix but related to documents)
+ai_router = APIRouter(prefix="/ai", tags=["AI"])
+
+# Upper bound on the document ids accepted by one batch authorization call
+MAX_USAGE_BATCH_DOCUMENTS = int(os.environ.get("AI_USAGE_BATCH_MAX_DOCUMENTS", "1000"))
+
+def decide_ai_usage(document: Dict[str, Any], policy: Dict[str, float]) -> AIUsageResponse:
+    """Apply the tenant's IQI thresholds to one document"""
     iqi_score = document.get("confidence_score", 0)
     is_validated = document.get("validated", False)
     
@@ -171,9 +212,78 @@ async def get_ai_usage_for_document(
         reason = "Score IQI insuffisant ou document non validé"
     
     return AIUsageResponse(
-        document_id=document_id,
+        document_id=document["id"],
         document_title=document.get("title", ""),
         usage_status=usage_status,
         iqi_score=iqi_score,
         reason=reason
     )
+
+async def get_ai_policy_thresholds(database, tenant_id: str) -> Dict[str, float]:
+    """Get AI policy thresholds from the per-process policy cache"""
+    return await policy_cache.get(database, tenant_id)
+
+@ai_router.get("/usage/document/{document_id}", response_model=AIUsageResponse)
+async def get_ai_usage_for_document(
+    document_id: str,
+    tenant_id: str = Depends(get_tenant_id),
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """Get AI usage authorization status for a document"""
+    database = await get_database()
+    
+    # Get document
+    document = await database.knowledge_documents.find_one(
+        {"id": document_id, "tenant_id": tenant_id},
+        {"_id": 0}
+    )
+    
+    if not document:
+        raise HTTPException(status_code=404, detail="Document non trouvé")
+    
+    return decide_ai_usage(document, await get_ai_policy_thresholds(database, tenant_id))
+
+@ai_router.post("/usage/documents", response_model=AIUsageBatchResponse)
+async def get_ai_usage_for_documents(
+    request: AIUsageBatchRequest,
+    tenant_id: str = Depends(get_tenant_id),
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """Get AI usage authorization status for many documents, logging every check"""
+    database = await get_database()
+    
+    document_ids = list(dict.fromkeys(request.document_ids))
+    if len(document_ids) > MAX_USAGE_BATCH_DOCUMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Au plus {MAX_USAGE_BATCH_DOCUMENTS} documents par requête"
+        )
+    
+    # One query for all documents and one for the policy
+    documents, policy = await asyncio.gather(
+        database.knowledge_documents.find(
+            {"tenant_id": tenant_id, "id": {"$in": document_ids}},
+            {"_id": 0, "id": 1, "title": 1, "confidence_score": 1, "validated": 1}
+        ).to_list(None),
+        get_ai_policy_thresholds(database, tenant_id)
+    )
+    by_id = {d["id"]: d for d in documents}
+    results = [decide_ai_usage(by_id[doc_id], policy) for doc_id in document_ids if doc_id in by_id]
+    
+    # Queue every check for the buffered usage log writer
+    checked_at = format_timestamp(datetime.now(timezone.utc))
+    await usage_log_writer.submit([
+        {
+            "tenant_id": tenant_id,
+            "document_id": result.document_id,
+            "decision": result.usage_status,
+            "checked_at": checked_at,
+            "intent": request.intent
+        }
+        for result in results
+    ])
+    
+    return AIUsageBatchResponse(
+        results=results,
+        not_found=[doc_id for doc_id in document_ids if doc_id not in by_id]
+    )
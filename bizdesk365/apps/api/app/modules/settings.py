@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 from ..security import get_current_user, get_tenant_id, UserInDB
 from ..db import get_database
+from ..policy_cache import policy_cache
+from ..policy_simulation import score_snapshots, grid_policies, grid_size, simulate_policies, MAX_SIMULATED_POLICIES
 
 router = APIRouter(prefix="/settings", tags=["Settings"])
 
@@ -18,6 +20,28 @@ class AIPolicy(BaseModel):
     min_iqi_authorized: float
     min_iqi_assisted: float
 
+class AIPolicyGrid(BaseModel):
+    min_iqi_authorized: List[float]
+    min_iqi_assisted: List[float]
+
+class AIPolicySimulationRequest(BaseModel):
+    candidates: List[AIPolicy] = []
+    grid: Optional[AIPolicyGrid] = None
+
+class AIPolicySimulationResult(BaseModel):
+    min_iqi_authorized: float
+    min_iqi_assisted: float
+    authorized: int
+    assisted: int
+    forbidden: int
+    moved: Dict[str, Dict[str, int]] = {}
+
+class AIPolicySimulationResponse(BaseModel):
+    documents: int
+    snapshot_loaded_at: str
+    current: AIPolicySimulationResult
+    results: List[AIPolicySimulationResult]
+
 @router.get("/iso", response_model=List[ISOProfile])
 async def get_iso_profiles(
     tenant_id: str = Depends(get_tenant_id),
@@ -102,13 +126,50 @@ async def update_ai_policy(
             detail="Les seuils doivent être compris entre 0 et 1"
         )
     
-    await database.ai_usage_policies.update_one(
-        {"tenant_id": tenant_id},
-        {"$set": {
-            "min_iqi_authorized": policy.min_iqi_authorized,
-            "min_iqi_assisted": policy.min_iqi_assisted
-        }},
-        upsert=True
+    # Write through the policy cache: bumps the version other workers poll for
+    await policy_cache.update(
+        database,
+        tenant_id,
+        policy.min_iqi_authorized,
+        policy.min_iqi_assisted
     )
     
     return policy
+
+@router.post("/ai-policy/simulate", response_model=AIPolicySimulationResponse)
+async def simulate_ai_policy(
+    request: AIPolicySimulationRequest,
+    tenant_id: str = Depends(get_tenant_id),
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """Document counts per usage status under candidate thresholds, and how many would move from the current policy"""
+    database = await get_database()
+    
+    for policy in request.candidates:
+        if policy.min_iqi_authorized < policy.min_iqi_assisted:
+            raise HTTPException(
+                status_code=400,
+                detail="Le seuil autorisé doit être supérieur au seuil assisté"
+            )
+    
+    candidates = [(p.min_iqi_authorized, p.min_iqi_assisted) for p in request.candidates]
+    # Checked before building the grid, whose size is the product of its axes
+    grid_count = grid_size(request.grid.min_iqi_authorized, request.grid.min_iqi_assisted) if request.grid else 0
+    if len(candidates) + grid_count > MAX_SIMULATED_POLICIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Au plus {MAX_SIMULATED_POLICIES} politiques par simulation"
+        )
+    if request.grid:
+        candidates += grid_policies(request.grid.min_iqi_authorized, request.grid.min_iqi_assisted)
+    
+    if not candidates:
+        raise HTTPException(status_code=400, detail="Aucune politique à simuler")
+    if any(not (0 <= threshold <= 1) for candidate in candidates for threshold in candidate):
+        raise HTTPException(
+            status_code=400,
+            detail="Les seuils doivent être compris entre 0 et 1"
+        )
+    
+    current = await policy_cache.get(database, tenant_id)
+    return await simulate_policies(database, score_snapshots, tenant_id, current, candidates)
@@ -0,0 +1,178 @@
+# Bulk IQI re-scoring of a tenant's knowledge documents
+#
+# Documents are pulled in chunks with a narrow projection into NumPy arrays
+# (confidence, validated, age in days). Each chunk is scored in one vectorized
+# pass:
+#
+#   iqi_score    = 0.3 * validated + 0.5 * confidence + 0.2 * fresh
+#                  (the per-document form of the global IQI, whose mean over
+#                  the tenant is iqi_global)
+#   usage_status = the AI usage decision of decide_ai_usage() for the tenant's
+#                  thresholds, applied to the whole array
+#
+# Only documents whose stored iqi_score or usage_status changed are written
+# back, grouped into one update_many per distinct (iqi_score, usage_status)
+# within the chunk, so a re-run over an unchanged corpus writes nothing.
+#
+#     python -m app.rescoring [--tenant-id ID] [--chunk-size 50000]
+
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+from pathlib import Path
+from pymongo import UpdateMany
+import argparse
+import asyncio
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+from . import iqi
+
+USAGE_STATUSES = np.array(["forbidden", "assisted", "authorized"])
+DEFAULT_CHUNK_SIZE = 50000
+SCORE_DECIMALS = 4
+
+# A timestamp whose first 19 characters are its UTC time: Z, +00:00 or no offset
+_UTC_TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?(Z|\+00:00)?")
+
+RESCORE_PROJECTION = {"_id": 1, "confidence_score": 1, "validated": 1, "last_updated": 1, "iqi_score": 1, "usage_status": 1}
+
+
+def parse_ages(last_updated: List[Optional[str]], now: datetime) -> np.ndarray:
+    """Age in days of each last_updated string; NaN where it cannot be parsed"""
+    now64 = np.datetime64(now.astimezone(timezone.utc).replace(tzinfo=None), "s")
+    try:
+        # Fast path: the collection stores UTC "YYYY-MM-DDTHH:MM:SSZ" strings. Cutting at the
+        # seconds drops the offset, so it is only taken when every value is in UTC
+        if not all(_UTC_TIMESTAMP.fullmatch(value) for value in last_updated):
+            raise ValueError("last_updated not all in UTC")
+        stamps = np.array([value[:19] for value in last_updated], dtype="datetime64[s]")
+    except (TypeError, ValueError):
+        parsed = [iqi.parse_timestamp(value) for value in last_updated]
+        stamps = np.array(
+            [np.datetime64(p.astimezone(timezone.utc).replace(tzinfo=None), "s") if p else np.datetime64("NaT") for p in parsed],
+            dtype="datetime64[s]"
+        )
+    ages = (now64 - stamps).astype("float64") / 86400
+    ages[np.isnat(stamps)] = np.nan
+    return ages
+
+
+def classify(confidence: np.ndarray, validated: np.ndarray, min_iqi_authorized: float, min_iqi_assisted: float) -> np.ndarray:
+    """Vectorized decide_ai_usage(): index into USAGE_STATUSES for each document"""
+    return np.where(
+        validated & (confidence >= min_iqi_authorized), 2,
+        np.where(confidence >= min_iqi_assisted, 1, 0)
+    ).astype(np.int8)
+
+
+def score(confidence: np.ndarray, validated: np.ndarray, ages: np.ndarray) -> np.ndarray:
+    # NaN ages (unparseable dates) compare False, so those documents are not fresh
+    fresh = np.less(ages, iqi.FRESHNESS_DAYS, where=~np.isnan(ages), out=np.zeros(len(ages), dtype=bool))
+    scores = iqi.VALIDATION_WEIGHT * validated + iqi.CONFIDENCE_WEIGHT * confidence + iqi.FRESHNESS_WEIGHT * fresh
+    return np.round(scores, SCORE_DECIMALS)
+
+
+def chunk_arrays(documents: List[dict]) -> Tuple[np.ndarray, np.ndarray, List[Optional[str]]]:
+    confidence = np.fromiter((d.get("confidence_score") or 0 for d in documents), dtype="float64", count=len(documents))
+    validated = np.fromiter((bool(d.get("validated")) for d in documents), dtype=bool, count=len(documents))
+    return confidence, validated, [d.get("last_updated") for d in documents]
+
+
+def changed_updates(documents: List[dict], scores: np.ndarray, statuses: np.ndarray, scored_at: str) -> List[UpdateMany]:
+    """One update_many per distinct (score, status) among the documents whose stored values differ"""
+    groups: Dict[Tuple[float, str], list] = {}
+    for doc, doc_score, status_code in zip(documents, scores.tolist(), statuses.tolist()):
+        status = str(USAGE_STATUSES[status_code])
+        if doc.get("iqi_score") == doc_score and doc.get("usage_status") == status:
+            continue
+        groups.setdefault((doc_score, status), []).append(doc["_id"])
+    return [
+        UpdateMany({"_id": {"$in": ids}}, {"$set": {"iqi_score": doc_score, "usage_status": status, "scored_at": scored_at}})
+        for (doc_score, status), ids in groups.items()
+    ]
+
+
+async def rescore_tenant(db, tenant_id: str, policy: dict, chunk_size: int = DEFAULT_CHUNK_SIZE, now: Optional[datetime] = None) -> dict:
+    """Re-score every document of a tenant; returns counts per status and timings"""
+    now = now or datetime.now(timezone.utc)
+    scored_at = now.isoformat()
+    started = time.perf_counter()
+    totals = {"documents": 0, "updated": 0, "write_ops": 0, "score_sum": 0.0, **{str(s): 0 for s in USAGE_STATUSES}}
+    compute_seconds = write_seconds = 0.0
+
+    cursor = db.knowledge_documents.find({"tenant_id": tenant_id}, RESCORE_PROJECTION).batch_size(min(chunk_size, 10000))
+    while True:
+        documents = await cursor.to_list(chunk_size)
+        if not documents:
+            break
+
+        t0 = time.perf_counter()
+        confidence, validated, last_updated = chunk_arrays(documents)
+        scores = score(confidence, validated, parse_ages(last_updated, now))
+        statuses = classify(confidence, validated, policy["min_iqi_authorized"], policy["min_iqi_assisted"])
+        updates = changed_updates(documents, scores, statuses, scored_at)
+        compute_seconds += time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        if updates:
+            result = await db.knowledge_documents.bulk_write(updates, ordered=False)
+            totals["updated"] += result.modified_count
+            totals["write_ops"] += len(updates)
+        write_seconds += time.perf_counter() - t0
+
+        totals["documents"] += len(documents)
+        totals["score_sum"] += float(scores.sum())
+        for code, count in enumerate(np.bincount(statuses, minlength=len(USAGE_STATUSES)).tolist()):
+            totals[str(USAGE_STATUSES[code])] += count
+
+    documents = totals.pop("documents")
+    score_sum = totals.pop("score_sum")
+    return {
+        "tenant_id": tenant_id,
+        "documents": documents,
+        "iqi_mean": round(score_sum / documents, 4) if documents else 0.0,
+        "policy": {"min_iqi_authorized": policy["min_iqi_authorized"], "min_iqi_assisted": policy["min_iqi_assisted"]},
+        **totals,
+        "compute_seconds": round(compute_seconds, 3),
+        "write_seconds": round(write_seconds, 3),
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+# ============== Command line ==============
+
+async def _run(tenant_id: Optional[str], chunk_size: int) -> int:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from .policy_cache import PolicyCache
+
+    load_dotenv(Path(__file__).parent.parent / '.env')
+    client = AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    db = client[os.environ.get("DB_NAME", "bizdesk365")]
+    policies = PolicyCache(poll_interval=0)
+    try:
+        tenant_ids = [tenant_id] if tenant_id else await db.knowledge_documents.distinct("tenant_id")
+        for tid in tenant_ids:
+            report = await rescore_tenant(db, tid, await policies.get(db, tid), chunk_size)
+            print(f"{tid}  {report['documents']} documents, {report['updated']} updated in {report['seconds']}s "
+                  f"(compute {report['compute_seconds']}s, write {report['write_seconds']}s)  "
+                  f"authorized={report['authorized']} assisted={report['assisted']} forbidden={report['forbidden']}")
+        return 0
+    finally:
+        client.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Re-score the IQI and AI usage status of knowledge documents")
+    parser.add_argument("--tenant-id", help="limit to one tenant (default: every tenant with documents)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+    return asyncio.run(_run(args.tenant_id, args.chunk_size))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,14 +6,22 @@ from datetime import datetime, timedelta, timezone
 from typing import Optional
 from pydantic import BaseModel
 import os
+import time
+from .cache import MemoryCache
+from .executors import BoundedExecutor, PoolSaturated
 
 # Configuration
 SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "bizdesk365-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-# Password hashing
+# Verified tokens are cached per process until their exp claim; JWT_CACHE_SIZE=0 disables the cache
+TOKEN_CACHE_SIZE = int(os.environ.get("JWT_CACHE_SIZE", "4096"))
+
+# Password hashing (bcrypt runs on a dedicated pool so it never blocks the event loop)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", "64"))
 
 # Bearer token scheme
 security = HTTPBearer()
@@ -39,6 +47,23 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+password_pool = BoundedExecutor(
+    "password-hash",
+    max_workers=PASSWORD_HASH_WORKERS,
+    max_pending=PASSWORD_HASH_MAX_PENDING
+)
+
+async def run_password_task(func, *args):
+    """Run a bcrypt call on password_pool; answers 503 when the pool is saturated"""
+    try:
+        return await password_pool.run(func, *args)
+    except PoolSaturated:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service d'authentification saturé, veuillez réessayer",
+            headers={"Retry-After": "1"},
+        )
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -54,15 +79,27 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+token_cache = MemoryCache(maxsize=TOKEN_CACHE_SIZE, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> UserInDB:
+    """Resolve the user from the bearer token.
+
+    FastAPI caches dependency results per request, so endpoints that depend on both
+    get_current_user and get_tenant_id still resolve the token once; token_cache then
+    skips the signature check for tokens already verified by this process.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Identifiants invalides",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    token = credentials.credentials
+    cached_user = token_cache.get(token)
+    if cached_user is not None:
+        return cached_user
+    
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         email: str = payload.get("email")
@@ -71,7 +108,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         if user_id is None or tenant_id is None:
             raise credentials_exception
             
-        return UserInDB(
+        user = UserInDB(
             id=user_id,
             email=email or "",
             tenant_id=tenant_id,
@@ -79,7 +116,23 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         )
     except JWTError:
         raise credentials_exception
+    
+    # Only tokens that expire are cached, and never past their exp claim
+    expires_at = payload.get("exp")
+    if isinstance(expires_at, (int, float)) and expires_at > time.time():
+        token_cache.set(token, user, ttl=expires_at - time.time())
+    
+    return user
 
 def get_tenant_id(current_user: UserInDB = Depends(get_current_user)) -> str:
     """Extract tenant_id from current user for tenant isolation"""
     return current_user.tenant_id
+
+def require_admin(current_user: UserInDB = Depends(get_current_user)) -> UserInDB:
+    """Restrict an endpoint to tenant administrators"""
+    if "admin" not in current_user.roles:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Accès réservé aux administrateurs",
+        )
+    return current_user
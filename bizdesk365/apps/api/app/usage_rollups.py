@@ -0,0 +1,250 @@
+# AI usage rollups - hourly and daily counters behind the governance trend charts
+#
+# One ai_usage_rollups document per (tenant_id, granularity, bucket_start,
+# decision, document_id) holds the number of usage logs in that bucket.
+# record_usage_logs() writes logs and increments their hour and day buckets in
+# one unordered bulk_write, so GET /governance/ai/timeseries sums a few rollup
+# documents per bucket instead of scanning ai_usage_logs.
+#
+# Logs written before the rollups existed are backfilled once, at startup
+# before the usage log writer starts: ensure_rollups() claims a marker document
+# in the migrations collection, so concurrent startups do not run it twice.
+# The read path never writes rollups.
+#
+# Backfill or check the rollups from ai_usage_logs (run the backfill while no
+# logs are being written for the tenant, otherwise those writes may be counted
+# twice or lost):
+#
+#     python -m app.usage_rollups verify [--tenant-id ID]
+#     python -m app.usage_rollups backfill [--tenant-id ID]
+
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+from pathlib import Path
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+import argparse
+import asyncio
+import os
+import sys
+
+DECISIONS = ["authorized", "assisted", "forbidden"]
+
+BACKFILL_MARKER_ID = "ai_usage_rollups_backfill"
+
+# checked_at is a UTC ISO-8601 string: the bucket is a prefix of it, padded back to a full timestamp
+GRANULARITIES: Dict[str, Tuple[int, str]] = {
+    "hour": (13, ":00:00Z"),
+    "day": (10, "T00:00:00Z"),
+}
+
+RollupKey = Tuple[str, str, str, str, Optional[str]]
+
+
+def bucket_start(checked_at: str, granularity: str) -> str:
+    """Start of the hour or day bucket holding a checked_at timestamp"""
+    length, suffix = GRANULARITIES[granularity]
+    return checked_at[:length] + suffix
+
+
+def format_timestamp(value: datetime) -> str:
+    """Same format as ai_usage_logs.checked_at: a UTC ISO-8601 string with second precision,
+    so range filters on the string follow time order and use the (tenant_id, checked_at) index"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def rollup_counts(entries: List[dict]) -> Dict[RollupKey, int]:
+    """Number of log entries per rollup key, for every granularity"""
+    counts: Dict[RollupKey, int] = {}
+    for entry in entries:
+        for granularity in GRANULARITIES:
+            key = (
+                entry["tenant_id"], granularity, bucket_start(entry["checked_at"], granularity),
+                entry["decision"], entry.get("document_id")
+            )
+            counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def rollup_updates(entries: List[dict]) -> List[UpdateOne]:
+    now = datetime.now(timezone.utc).isoformat()
+    return [
+        UpdateOne(
+            {"tenant_id": tenant_id, "granularity": granularity, "bucket_start": start, "decision": decision, "document_id": document_id},
+            {"$inc": {"count": count}, "$set": {"updated_at": now}},
+            upsert=True
+        )
+        for (tenant_id, granularity, start, decision, document_id), count in rollup_counts(entries).items()
+    ]
+
+
+async def apply_rollups(db, entries: List[dict]):
+    """Add already-written log entries to their rollup buckets"""
+    updates = rollup_updates(entries)
+    if updates:
+        await db.ai_usage_rollups.bulk_write(updates, ordered=False)
+
+
+async def record_usage_logs(db, entries: List[dict]):
+    """Write usage log entries and count them in their rollup buckets"""
+    if not entries:
+        return
+    # Copies: insert_many adds an _id to each document it is given
+    await db.ai_usage_logs.insert_many([dict(e) for e in entries], ordered=False)
+    await apply_rollups(db, entries)
+
+
+async def timeseries(
+    db, tenant_id: str, granularity: str,
+    start: Optional[datetime] = None, end: Optional[datetime] = None, document_id: Optional[str] = None
+) -> List[dict]:
+    """Per-bucket decision counts, oldest bucket first.
+
+    A bucket is included when it starts in [floor(start), end), so the first
+    and last buckets cover the whole hour or day holding start and end.
+    """
+    query = {"tenant_id": tenant_id, "granularity": granularity}
+    window = {}
+    if start:
+        window["$gte"] = bucket_start(format_timestamp(start), granularity)
+    if end:
+        window["$lt"] = format_timestamp(end)
+    if window:
+        query["bucket_start"] = window
+    if document_id:
+        query["document_id"] = document_id
+
+    rows = await db.ai_usage_rollups.aggregate([
+        {"$match": query},
+        {"$group": {"_id": {"bucket_start": "$bucket_start", "decision": "$decision"}, "count": {"$sum": "$count"}}},
+        {"$sort": {"_id.bucket_start": 1}}
+    ]).to_list(None)
+
+    buckets: Dict[str, dict] = {}
+    for row in rows:
+        start_key = row["_id"]["bucket_start"]
+        bucket = buckets.setdefault(start_key, {"bucket_start": start_key, **{d: 0 for d in DECISIONS}, "total": 0})
+        if row["_id"]["decision"] in DECISIONS:
+            bucket[row["_id"]["decision"]] += row["count"]
+        bucket["total"] += row["count"]
+    return list(buckets.values())
+
+
+async def has_rollups(db, tenant_id: str) -> bool:
+    return await db.ai_usage_rollups.find_one({"tenant_id": tenant_id}, {"_id": 1}) is not None
+
+
+def _backfill_pipeline(tenant_id: str, granularity: str) -> List[dict]:
+    length, suffix = GRANULARITIES[granularity]
+    return [
+        {"$match": {"tenant_id": tenant_id}},
+        {"$group": {
+            "_id": {
+                "bucket_start": {"$concat": [{"$substrCP": ["$checked_at", 0, length]}, suffix]},
+                "decision": "$decision",
+                "document_id": {"$ifNull": ["$document_id", None]}
+            },
+            "count": {"$sum": 1}
+        }},
+        {"$project": {
+            "_id": 0,
+            "tenant_id": {"$literal": tenant_id},
+            "granularity": {"$literal": granularity},
+            "bucket_start": "$_id.bucket_start",
+            "decision": "$_id.decision",
+            "document_id": "$_id.document_id",
+            "count": 1,
+            "updated_at": {"$literal": datetime.now(timezone.utc).isoformat()}
+        }}
+    ]
+
+
+async def backfill_tenant(db, tenant_id: str):
+    """Rebuild a tenant's rollups from ai_usage_logs, entirely inside the database"""
+    await db.ai_usage_rollups.delete_many({"tenant_id": tenant_id})
+    for granularity in GRANULARITIES:
+        # The rollups were just cleared, so every grouped row is a new document
+        await db.ai_usage_logs.aggregate(
+            _backfill_pipeline(tenant_id, granularity) + [{"$merge": {"into": "ai_usage_rollups", "whenMatched": "fail"}}]
+        ).to_list(None)
+
+
+async def ensure_rollups(db) -> int:
+    """Backfill the tenants having logs but no rollups, once per database; returns the number of tenants backfilled.
+
+    An interrupted backfill leaves the marker claimed: finish it with the backfill command.
+    """
+    try:
+        await db.migrations.insert_one({"_id": BACKFILL_MARKER_ID, "started_at": datetime.now(timezone.utc).isoformat()})
+    except DuplicateKeyError:
+        return 0
+    backfilled = 0
+    for tenant_id in await db.ai_usage_logs.distinct("tenant_id"):
+        if not await has_rollups(db, tenant_id):
+            await backfill_tenant(db, tenant_id)
+            backfilled += 1
+    await db.migrations.update_one(
+        {"_id": BACKFILL_MARKER_ID},
+        {"$set": {"completed_at": datetime.now(timezone.utc).isoformat(), "tenants": backfilled}}
+    )
+    return backfilled
+
+
+async def verify_tenant(db, tenant_id: str) -> Dict[str, Dict[str, int]]:
+    """Compare the daily rollups with ai_usage_logs; returns {bucket/decision: {stored, actual}} for drifted buckets"""
+    def key(row: dict) -> str:
+        return f"{row['bucket_start']}/{row['decision']}"
+
+    actual: Dict[str, int] = {}
+    async for row in db.ai_usage_logs.aggregate(_backfill_pipeline(tenant_id, "day")):
+        actual[key(row)] = actual.get(key(row), 0) + row["count"]
+    stored: Dict[str, int] = {}
+    async for row in db.ai_usage_rollups.find({"tenant_id": tenant_id, "granularity": "day"}, {"_id": 0}):
+        stored[key(row)] = stored.get(key(row), 0) + row["count"]
+    return {
+        k: {"stored": stored.get(k, 0), "actual": actual.get(k, 0)}
+        for k in sorted(set(actual) | set(stored)) if stored.get(k, 0) != actual.get(k, 0)
+    }
+
+
+# ============== Command line ==============
+
+async def _run(command: str, tenant_id: Optional[str]) -> int:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent.parent / '.env')
+    client = AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    db = client[os.environ.get("DB_NAME", "bizdesk365")]
+    try:
+        tenant_ids = [tenant_id] if tenant_id else await db.ai_usage_logs.distinct("tenant_id")
+
+        drifted = 0
+        for tid in tenant_ids:
+            if command == "backfill":
+                await backfill_tenant(db, tid)
+                continue
+            drift = await verify_tenant(db, tid)
+            if drift:
+                drifted += 1
+                for bucket, values in drift.items():
+                    print(f"{tid}  {bucket}: stored={values['stored']} actual={values['actual']}")
+        action = "backfilled" if command == "backfill" else "checked"
+        print(f"{len(tenant_ids)} tenant(s) {action}, {drifted} with drift")
+        return 1 if drifted else 0
+    finally:
+        client.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Verify or backfill the ai_usage_rollups collection")
+    parser.add_argument("command", choices=["verify", "backfill"])
+    parser.add_argument("--tenant-id", help="limit to one tenant (default: every tenant with usage logs)")
+    args = parser.parse_args(argv)
+    return asyncio.run(_run(args.command, args.tenant_id))
+
+
+if __name__ == "__main__":
+    sys.exit(main())